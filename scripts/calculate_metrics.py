@@ -4,23 +4,23 @@ import json
 from pathlib import Path
 from typing import Dict, List
 
-from pyterrier_nuggetizer.util import load_nuggets
+from pyterrier_nuggetizer.readers import read_answers, read_nuggets
 from pyterrier_nuggetizer import Nuggetizer
 from pyterrier_rag import VLLMBackend
 
 
 def main():
     parser = argparse.ArgumentParser(description='Calculate metrics for nugget assignments')
-    parser.add_argument('--input_file', type=str, help='Path to input TSV file with assignments')
-    parser.add_argument('--nugget_file', type=str, help='Path to input JSONL file with assignments')
+    parser.add_argument('--input_file', type=str, help='Path to input JSONL file with answers (optionally gzipped)')
+    parser.add_argument('--nugget_file', type=str, help='Path to input JSONL file with nuggets (optionally gzipped)')
     parser.add_argument('--output_file', type=str, help='Path to output TSV file')
     parser.add_argument('--model_name_or_path', type=str, default='mistralai/Mistral-7B-Instruct-v0.3', help='Model to use for all operations')
     parser.add_argument('--window_size', type=int, default=10, help='Window size for processing')
     parser.add_argument('--max_nuggets', type=int, default=30, help='Maximum number of nuggets to extract')
     args = parser.parse_args()
 
-    nuggets = load_nuggets(args.nugget_file)
-    answers = load_answers(args.input_file)
+    nuggets = read_nuggets(args.nugget_file)
+    answers = read_answers(args.input_file)
     backend = VLLMBackend(args.model_name_or_path)
     nuggetizer = Nuggetizer(
         backend,
@@ -31,7 +31,7 @@ def main():
     metrics = [nuggetizer.VitalScore, nuggetizer.AllScore, nuggetizer.WeightedScore]
 
     for metric in metrics:
-        vals = metric.iter_calc(answers, nuggets)
+        vals = metric.iter_calc(nuggets, answers)
         print(f"Metric: {metric.NAME}")
         for i in vals:
             print(f"Query ID: {i.query_id}, Value: {i.value}")
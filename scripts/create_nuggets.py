@@ -1,9 +1,11 @@
+import contextlib
 import logging
 import argparse
 
 import pyterrier as pt
 from pyterrier_nuggetizer import Nuggetizer
 from pyterrier_nuggetizer.util import save_nuggets
+from pyterrier_nuggetizer.plan import DryRunBackend
 from pyterrier_rag import VLLMBackend
 
 
@@ -28,6 +30,18 @@ def main():
     parser.add_argument('--model_name_or_path', type=str, default='mistralai/Mistral-7B-Instruct-v0.3', help='Model to use for all operations')
     parser.add_argument('--window_size', type=int, default=10, help='Window size for processing')
     parser.add_argument('--max_nuggets', type=int, default=30, help='Maximum number of nuggets to extract')
+    parser.add_argument('--document_store', type=str, default=None,
+                      help='Blob document store or Terrier index to fetch document text from by docno')
+    parser.add_argument('--chunk_size', type=int, default=None,
+                      help='Stream the run in chunks of at least this many rows, appending nuggets as each chunk is done')
+    parser.add_argument('--service_url', type=str, default=None,
+                      help='Submit the run to a running scripts/serve.py instead of loading the model')
+    parser.add_argument('--profile_dir', type=str, default=None,
+                      help='Write per-stage flame graph stacks and a hot-function summary to this directory')
+    parser.add_argument('--trace_file', type=str, default=None,
+                      help='Append an OpenTelemetry span per LLM call to this JSONL file')
+    parser.add_argument('--plan', action='store_true',
+                      help='Only estimate LLM calls and prompt tokens for the run, without loading the model')
     parser.add_argument('--log_level', type=int, default=0, choices=[0, 1, 2],
                       help='Logging level: 0=warnings only, 1=info, 2=debug')
     args = parser.parse_args()
@@ -35,18 +49,50 @@ def main():
     # Setup logging
     setup_logging(args.log_level)
     logger = logging.getLogger(__name__)
-    run_file = pt.io.read_results(args.input_file)
+    run_file = pt.io.read_results(args.input_file) if not args.chunk_size else None
+
+    if args.chunk_size and (args.service_url or args.plan):
+        parser.error("--chunk_size cannot be combined with --service_url or --plan")
+
+    if args.service_url and not args.plan:
+        from pyterrier_nuggetizer.service import NuggetServiceClient
+        logger.info(f"Submitting to {args.service_url}")
+
+        def progress(event):
+            logger.info(f"{event['event']} {event.get('done', '')}/{event.get('total', '')}")
+
+        nuggets = NuggetServiceClient(args.service_url).run("create", run_file, progress=progress)
+        save_nuggets(nuggets, args.output_file)
+        logger.info("Processing complete")
+        return
 
     # Initialize nuggetizer with all configurations
     logger.info("Initializing Nuggetizer")
-    backend = VLLMBackend(args.model_name_or_path)
+    if args.plan:
+        backend = DryRunBackend(args.model_name_or_path)
+    else:
+        backend = VLLMBackend(args.model_name_or_path)
     nuggetizer = Nuggetizer(
         backend,
         window_size=args.window_size,
-        max_nuggets=args.max_nuggets
+        max_nuggets=args.max_nuggets,
+        document_store=args.document_store,
     )
 
-    nuggets = nuggetizer(run_file)
+    if args.plan:
+        print(nuggetizer.plan(run_file).to_string(index=False))
+        return
+
+    with contextlib.ExitStack() as stack:
+        if args.profile_dir:
+            stack.enter_context(nuggetizer.profile(args.profile_dir))
+        if args.trace_file:
+            stack.enter_context(nuggetizer.trace(args.trace_file))
+        if args.chunk_size:
+            summary = nuggetizer.transform_chunked(args.input_file, args.output_file, chunk_size=args.chunk_size)
+            logger.info(f"Processing complete: {summary}")
+            return
+        nuggets = nuggetizer(run_file)
     save_nuggets(nuggets, args.output_file)
 
     logger.info("Processing complete")
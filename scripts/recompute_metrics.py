@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import glob
+import json
+import argparse
+from pathlib import Path
+from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from pyterrier_nuggetizer.metrics import calculate_nugget_scores_frame, calculate_global_metrics_frame, METRIC_NAMES
+from pyterrier_nuggetizer.readers import iter_assignments
+from pyterrier_nuggetizer.significance import metric_matrix, paired_tests
+
+
+def score_file(input_file: str, output_dir: Optional[str] = None) -> Tuple[str, List[dict]]:
+    """Compute per-qid and overall metrics for one judged assignment file, without any LLM calls."""
+    chunks = [
+        calculate_nugget_scores_frame(chunk)
+        for chunk in iter_assignments(input_file, chunk_size=50_000)
+    ]
+    scores = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=["qid"] + METRIC_NAMES)
+    overall = calculate_global_metrics_frame(scores)
+    records = scores.to_dict(orient="records") + overall.to_dict(orient="records")
+    if output_dir is not None:
+        with open(Path(output_dir) / Path(input_file).name, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return input_file, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute nugget metrics from judged assignment files, without an LLM')
+    parser.add_argument('--input_files', type=str, nargs='+', required=True,
+                        help='Assignment JSONL files (optionally gzipped) or glob patterns, one run per file')
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='Directory to write per-run metrics JSONL files, in the format of data/metrics')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes')
+    parser.add_argument('--compare', type=str, default=None, choices=METRIC_NAMES,
+                        help='Run paired significance tests between all runs on this metric')
+    parser.add_argument('--n_resamples', type=int, default=10000, help='Resamples for the significance tests')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the significance tests')
+    args = parser.parse_args()
+
+    files: List[str] = sorted({f for pattern in args.input_files for f in (glob.glob(pattern) or [pattern])})
+    if args.output_dir is not None:
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(score_file, files, [args.output_dir] * len(files)))
+    else:
+        results = [score_file(f, args.output_dir) for f in files]
+
+    summary = pd.DataFrame([{"run": Path(f).name, **records[-1]} for f, records in results]).drop(columns=["qid"])
+    print(summary.to_string(index=False))
+
+    if args.compare is not None and len(results) > 1:
+        scores = pd.DataFrame([{"run": Path(f).name, **r} for f, records in results for r in records])
+        matrix = metric_matrix(scores, args.compare, system="run")
+        tests = paired_tests(matrix, n_resamples=args.n_resamples, seed=args.seed)
+        print(f"\nPaired tests on {args.compare} over {matrix.shape[1]} common queries")
+        print(tests.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import logging
+import argparse
+
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer._types import NuggetAssignMode
+from pyterrier_nuggetizer.service import MicroBatcher, NuggetService, NuggetServiceServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve create/score/assign/evaluate jobs from one warm model')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8100, help='Port to bind')
+    parser.add_argument('--model_name_or_path', type=str, default='mistralai/Mistral-7B-Instruct-v0.3', help='Model to use for all operations')
+    parser.add_argument('--window_size', type=int, default=10, help='Window size for processing')
+    parser.add_argument('--max_nuggets', type=int, default=30, help='Maximum number of nuggets to extract')
+    parser.add_argument('--assigner_mode', type=str, default='support_grade_2', choices=['support_grade_2', 'support_grade_3'],
+                      help='Assignment labels to judge with')
+    parser.add_argument('--max_batch_size', type=int, default=64, help='Most prompts per backend call')
+    parser.add_argument('--max_wait_ms', type=float, default=20.0, help='Longest a prompt waits for its batch to fill')
+    parser.add_argument('--max_jobs', type=int, default=4, help='Jobs run at once, later jobs are queued')
+    parser.add_argument('--max_parallel_queries', type=int, default=64, help='Queries processed at once across jobs')
+    parser.add_argument('--dry_run', action='store_true', help='Serve with a stand-in backend instead of loading the model')
+    parser.add_argument('--log_level', type=int, default=1, choices=[0, 1, 2],
+                      help='Logging level: 0=warnings only, 1=info, 2=debug')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=[logging.WARNING, logging.INFO, logging.DEBUG][args.log_level],
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if args.dry_run:
+        from pyterrier_nuggetizer.plan import DryRunBackend
+        backend = DryRunBackend(args.model_name_or_path)
+    else:
+        from pyterrier_rag import VLLMBackend
+        backend = VLLMBackend(args.model_name_or_path)
+    batcher = MicroBatcher(backend, max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+    nuggetizer = Nuggetizer(
+        batcher,
+        assigner_mode=NuggetAssignMode(args.assigner_mode),
+        window_size=args.window_size,
+        max_nuggets=args.max_nuggets,
+    )
+    service = NuggetService(nuggetizer, max_jobs=args.max_jobs, max_parallel_queries=args.max_parallel_queries)
+    server = NuggetServiceServer(service, host=args.host, port=args.port)
+    print(f"Serving {args.model_name_or_path} on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        batcher.close()
+        print(dict(batcher.stats))
+
+
+if __name__ == '__main__':
+    main()
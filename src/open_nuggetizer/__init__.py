@@ -1,7 +1,15 @@
-from pyterrier_nuggetizer.nuggetizer import Nuggetizer
-from pyterrier_nuggetizer import measure as measure
-from pyterrier_nuggetizer import prompts
+import importlib
 
 __version__ = '0.0.1'
 
 __all__ = ["Nuggetizer", "measure", "prompts"]
+
+
+def __getattr__(name: str):
+    # imported lazily so that lightweight modules (e.g. metrics, readers) can be used without PyTerrier
+    if name == "Nuggetizer":
+        from pyterrier_nuggetizer.nuggetizer import Nuggetizer
+        return Nuggetizer
+    if name in ("measure", "prompts"):
+        return importlib.import_module(f"pyterrier_nuggetizer.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
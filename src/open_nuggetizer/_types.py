@@ -1,4 +1,5 @@
 from enum import Enum
+import numpy as np
 
 
 # class NuggetMode(Enum):
@@ -14,3 +15,23 @@ from enum import Enum
 class NuggetAssignMode(Enum):
     SUPPORT_GRADE_2 = "support_grade_2"
     SUPPORT_GRADE_3 = "support_grade_3"
+
+    @property
+    def grades(self) -> int:
+        return 2 if self is NuggetAssignMode.SUPPORT_GRADE_2 else 3
+
+    @classmethod
+    def finest(cls, modes=None) -> "NuggetAssignMode":
+        """The mode with the most grades among ``modes`` (all modes if None)."""
+        return max(modes if modes is not None else cls, key=lambda mode: mode.grades)
+
+    def derive(self, assignment: np.ndarray, source: "NuggetAssignMode") -> np.ndarray:
+        """
+        Map assignments judged in ``source`` mode onto this (coarser or equal) mode, without new judgements:
+        with two grades, partial_support (1) becomes not_support (0). Missing labels (-1) are kept.
+        """
+        assert source.grades >= self.grades, f"cannot derive {self.value} from coarser {source.value}"
+        assignment = np.asarray(assignment)
+        if self.grades == 2 and source.grades == 3:
+            return np.where(assignment == 1, 0, assignment).astype(assignment.dtype)
+        return assignment
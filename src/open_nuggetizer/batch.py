@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from pyterrier_nuggetizer.index import MISSING_LABEL, NuggetQrelsIndex
+
+
+def _labels(values: Any, n: int) -> np.ndarray:
+    if values is None:
+        return np.full(n, MISSING_LABEL, dtype=np.int8)
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce") \
+        .fillna(MISSING_LABEL).to_numpy(dtype=np.int8)
+
+
+@dataclass
+class NuggetBatch:
+    """
+    Columnar nuggets of many queries or answers, passed between stages instead of lists of row dicts.
+
+    Rows are grouped, one group per query (or per answer, when judging a run): the nuggets of group ``g``
+    occupy ``offsets[g]:offsets[g + 1]``. Query and answer strings are stored once per group, qids are
+    dictionary-encoded, and importance and assignment labels are int8 (-1 where missing). Convert to
+    pandas with ``to_frame`` only at the edges.
+
+    Attributes:
+        qids (List[str]): The distinct qids.
+        qid_codes (np.ndarray): Per group, the position of its qid in ``qids``.
+        queries (List[str]): Per group, the query text.
+        answers (List[str], optional): Per group, the answer text, if the groups are answers.
+        offsets (np.ndarray): Group boundaries, of length number of groups + 1.
+        nugget_ids (List[str]): Per row, the nugget id.
+        nuggets (List[str]): Per row, the nugget text.
+        importance (np.ndarray): Per row, the importance label.
+        assignment (np.ndarray): Per row, the assignment label.
+        extra (Dict[str, List]): Other per-group columns, e.g. run_id.
+    """
+    qids: List[str]
+    qid_codes: np.ndarray
+    queries: List[str]
+    answers: Optional[List[str]]
+    offsets: np.ndarray
+    nugget_ids: List[str]
+    nuggets: List[str]
+    importance: np.ndarray
+    assignment: np.ndarray
+    extra: Dict[str, List[Any]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.nugget_ids)
+
+    @property
+    def num_groups(self) -> int:
+        return len(self.offsets) - 1
+
+    def span(self, group: int) -> slice:
+        return slice(int(self.offsets[group]), int(self.offsets[group + 1]))
+
+    def qid(self, group: int) -> str:
+        return self.qids[self.qid_codes[group]]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.num_groups))
+
+    @classmethod
+    def from_run(
+        cls,
+        run: pd.DataFrame,
+        qrels: NuggetQrelsIndex,
+        query_field: str = "query",
+        answer_field: str = "qanswer",
+    ) -> "NuggetBatch":
+        """
+        One group per answer of ``run`` holding the nuggets of its topic, without materialising the cross product.
+        Answers whose topic has no nuggets are dropped; the remaining run columns are kept per group.
+        """
+        run = run[run["qid"].astype(str).isin(list(qrels.codes))] if len(run) else run
+        topic = np.array([qrels.codes[str(q)] for q in run["qid"]], dtype=np.int64)
+        starts, stops = qrels.offsets[topic], qrels.offsets[topic + 1]
+        sizes = stops - starts
+        positions = np.repeat(starts - np.concatenate([[0], np.cumsum(sizes)[:-1]]), sizes) + np.arange(sizes.sum()) \
+            if len(sizes) else np.zeros(0, dtype=np.int64)
+
+        qids, qid_codes = cls._encode(run["qid"])
+        extra = {c: run[c].tolist() for c in run.columns if c not in ("qid", query_field, answer_field)}
+        return cls(
+            qids=qids,
+            qid_codes=qid_codes,
+            queries=run[query_field].tolist() if query_field in run.columns else [None] * len(run),
+            answers=run[answer_field].tolist(),
+            offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            nugget_ids=qrels.take_nugget_ids(positions),
+            nuggets=qrels.nuggets.take(positions),
+            importance=qrels.importance[positions].astype(np.int8),
+            assignment=np.full(len(positions), MISSING_LABEL, dtype=np.int8),
+            extra=extra,
+        )
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame: pd.DataFrame,
+        query_field: str = "query",
+        answer_field: str = "qanswer",
+        nugget_field: str = "nugget",
+        importance_field: str = "importance",
+        assignment_field: str = "assignment",
+    ) -> "NuggetBatch":
+        """
+        Group the rows of a nugget DataFrame into consecutive runs of the same qid (and answer, if present).
+        """
+        n = len(frame)
+        has_answer = answer_field in frame.columns
+        keys = frame["qid"].astype(str)
+        if has_answer:
+            keys = keys + "\x00" + frame[answer_field].astype(str)
+        boundaries = np.flatnonzero(keys.to_numpy()[1:] != keys.to_numpy()[:-1]) + 1 if n else np.zeros(0, int)
+        offsets = np.concatenate([[0], boundaries, [n]]).astype(np.int64) if n else np.zeros(1, dtype=np.int64)
+        first = offsets[:-1]
+        heads = frame.iloc[first]
+        qids, qid_codes = cls._encode(heads["qid"])
+        produced = {"qid", query_field, answer_field, f"{nugget_field}_id", nugget_field,
+                    importance_field, assignment_field}
+        return cls(
+            qids=qids,
+            qid_codes=qid_codes,
+            queries=heads[query_field].tolist() if query_field in frame.columns else [None] * len(first),
+            answers=heads[answer_field].tolist() if has_answer else None,
+            offsets=offsets,
+            nugget_ids=frame[f"{nugget_field}_id"].tolist(),
+            nuggets=frame[nugget_field].tolist(),
+            importance=_labels(frame[importance_field] if importance_field in frame.columns else None, n),
+            assignment=_labels(frame[assignment_field] if assignment_field in frame.columns else None, n),
+            extra={c: heads[c].tolist() for c in frame.columns if c not in produced},
+        )
+
+    @staticmethod
+    def _encode(qids: pd.Series):
+        codes, uniques = pd.factorize(qids.astype(str), sort=False)
+        return list(uniques), codes.astype(np.int32)
+
+    def take(self, groups: Sequence[int]) -> "NuggetBatch":
+        """A batch holding only the given groups."""
+        groups = np.asarray(groups, dtype=np.int64)
+        starts, stops = self.offsets[groups], self.offsets[groups + 1]
+        sizes = stops - starts
+        positions = np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)]) if len(groups) \
+            else np.zeros(0, dtype=np.int64)
+        return NuggetBatch(
+            qids=self.qids,
+            qid_codes=self.qid_codes[groups],
+            queries=[self.queries[g] for g in groups],
+            answers=[self.answers[g] for g in groups] if self.answers is not None else None,
+            offsets=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            nugget_ids=[self.nugget_ids[p] for p in positions],
+            nuggets=[self.nuggets[p] for p in positions],
+            importance=self.importance[positions],
+            assignment=self.assignment[positions],
+            extra={c: [values[g] for g in groups] for c, values in self.extra.items()},
+        )
+
+    def with_assignment(self, assignment: np.ndarray) -> "NuggetBatch":
+        assert len(assignment) == len(self), "assignment must have one label per nugget"
+        return replace(self, assignment=np.asarray(assignment, dtype=np.int8))
+
+    def as_dict_of_dict(self) -> Dict[str, Dict[str, int]]:
+        """
+        Assignments as ``{qid: {nugget_id: assignment}}``, the run format used by the measure provider.
+        """
+        result: Dict[str, Dict[str, int]] = {}
+        for group in self:
+            span = self.span(group)
+            topic = result.setdefault(self.qid(group), {})
+            topic.update(zip(self.nugget_ids[span], self.assignment[span].tolist()))
+        return result
+
+    def to_frame(
+        self,
+        query_field: str = "query",
+        answer_field: str = "qanswer",
+        nugget_field: str = "nugget",
+        importance_field: str = "importance",
+        assignment_field: str = "assignment",
+    ) -> pd.DataFrame:
+        """
+        One row per nugget, repeating the per-group columns.
+        """
+        sizes = np.diff(self.offsets)
+
+        def repeat(values: List[Any]) -> np.ndarray:
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return np.repeat(array, sizes)
+
+        columns = {c: repeat(values) for c, values in self.extra.items()}
+        columns["qid"] = np.repeat(np.asarray(self.qids, dtype=object)[self.qid_codes], sizes) \
+            if self.num_groups else np.empty(0, dtype=object)
+        columns[query_field] = repeat(self.queries)
+        if self.answers is not None:
+            columns[answer_field] = repeat(self.answers)
+        columns[f"{nugget_field}_id"] = self.nugget_ids
+        columns[nugget_field] = self.nuggets
+        columns[importance_field] = self.importance.astype(np.int64)
+        if (self.assignment != MISSING_LABEL).any() or len(self) == 0:
+            columns[assignment_field] = self.assignment.astype(np.int64)
+        return pd.DataFrame(columns)
+
+
+__all__ = ["MISSING_LABEL", "NuggetBatch"]
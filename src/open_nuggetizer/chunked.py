@@ -0,0 +1,211 @@
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+import pandas as pd
+
+from pyterrier_nuggetizer.readers import iter_chunks
+from pyterrier_nuggetizer.store import _pyarrow
+from pyterrier_nuggetizer.util import save_nuggets
+
+RUN_FORMATS = ("trec", "jsonl", "parquet")
+OUTPUT_FORMATS = ("tsv", "jsonl", "parquet")
+TREC_RUN_COLUMNS = ["qid", "Q0", "docno", "rank", "score", "name"]
+
+
+def _suffixes(path: Union[str, os.PathLike]) -> List[str]:
+    return [s for s in Path(path).suffixes if s != ".gz"]
+
+
+def infer_format(path: Union[str, os.PathLike], formats=RUN_FORMATS, default: str = "trec") -> str:
+    """
+    The format of a run or output file from its extension (ignoring ``.gz``): parquet, jsonl, or ``default``.
+    """
+    suffixes = _suffixes(path)
+    suffix = suffixes[-1] if suffixes else ""
+    if suffix == ".parquet" and "parquet" in formats:
+        return "parquet"
+    if suffix in (".jsonl", ".json") and "jsonl" in formats:
+        return "jsonl"
+    return default
+
+
+def qid_chunks(frames: Iterable[pd.DataFrame], chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Regroup a stream of frames, whose rows are contiguous by qid, into chunks of whole queries.
+
+    Args:
+        frames (Iterable[pd.DataFrame]): Frames with a qid column, in any sizes.
+        chunk_size (int, optional): Minimum rows per chunk; chunks only break between queries. If None, each
+            chunk holds a single query.
+
+    Yields:
+        pd.DataFrame: The rows of one or more consecutive queries.
+
+    Raises:
+        ValueError: If a qid reappears after the rows of another qid.
+    """
+    assert chunk_size is None or chunk_size > 0, "chunk_size must be greater than 0"
+    seen: Set[str] = set()
+    buffer: List[pd.DataFrame] = []
+    buffered = 0
+    for frame in frames:
+        if not len(frame):
+            continue
+        frame = frame.assign(qid=frame["qid"].astype(str))
+        qids = pd.unique(frame["qid"])
+        if buffer and buffer[-1]["qid"].iloc[-1] == qids[0]:
+            qids = qids[1:]
+        for qid in qids:
+            if qid in seen:
+                raise ValueError(f"input must be contiguous by qid, but qid {qid} reappears")
+            seen.add(qid)
+        buffer.append(frame)
+        buffered += len(frame)
+        if chunk_size is not None and buffered < chunk_size:
+            continue
+        # emit every complete query, holding back the last one as it may continue in the next frame
+        pending = pd.concat(buffer, ignore_index=True)
+        complete = pending["qid"].ne(pending["qid"].iloc[-1])
+        if chunk_size is not None and complete.sum() < chunk_size:
+            buffer = [pending]
+            continue
+        done = pending[complete]
+        if chunk_size is None:
+            for _, group in done.groupby("qid", sort=False):
+                yield group.reset_index(drop=True)
+        else:
+            yield done.reset_index(drop=True)
+        buffer = [pending[~complete].reset_index(drop=True)]
+        buffered = len(buffer[0])
+    if buffered:
+        pending = pd.concat(buffer, ignore_index=True)
+        if chunk_size is None:
+            for _, group in pending.groupby("qid", sort=False):
+                yield group.reset_index(drop=True)
+        else:
+            yield pending
+
+
+def iter_run_chunks(
+    file: Union[str, os.PathLike],
+    chunk_size: Optional[int] = 10_000,
+    format: Optional[str] = None,
+    to_rows: Optional[Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a run as chunks of whole queries, reading no more than about ``chunk_size`` rows at a time.
+
+    Args:
+        file (str): A TREC run (qid Q0 docno rank score name), JSONL or Parquet file; text files may be gzipped.
+            Rows must be contiguous by qid, as in any run sorted by qid.
+        chunk_size (int, optional): Minimum rows per chunk; chunks only break between queries. If None, each
+            chunk holds a single query.
+        format (str, optional): trec, jsonl or parquet, inferred from the file extension if None.
+        to_rows (Callable, optional): For JSONL, converts one record into rows, e.g. ``readers.answer_rows`` for a
+            TREC RAG answer file. Defaults to one row per record.
+
+    Yields:
+        pd.DataFrame: The rows of one or more consecutive queries.
+    """
+    format = format or infer_format(file)
+    assert format in RUN_FORMATS, f"format must be one of {RUN_FORMATS}"
+    read_size = chunk_size or 10_000
+    if format == "trec":
+        frames = pd.read_csv(
+            file, sep=r"\s+", header=None, names=TREC_RUN_COLUMNS, usecols=["qid", "docno", "rank", "score", "name"],
+            dtype={"qid": str, "docno": str}, chunksize=read_size,
+        )
+    elif format == "jsonl":
+        frames = iter_chunks(str(file), to_rows or (lambda record: [record]), read_size)
+    else:
+        _pyarrow()
+        import pyarrow.parquet as pq
+        frames = (batch.to_pandas() for batch in pq.ParquetFile(file).iter_batches(batch_size=read_size))
+    return qid_chunks(frames, chunk_size)
+
+
+class ChunkWriter:
+    """
+    Appends chunks of results to a file as they are produced, so results never need to be held in memory.
+
+    Parameters:
+        file (str): Path to the output file, overwritten if it exists.
+        format (str, optional): tsv (the ``save_nuggets`` layout), jsonl or parquet, inferred from the file
+            extension if None (tsv unless .jsonl or .parquet). As tsv keeps only the qid, nugget_id, nugget,
+            importance and assignment columns, it refuses chunks whose rows it could not tell apart: those
+            with a run_id column, or with several answers per query.
+
+    Attributes:
+        chunks (int): Chunks written.
+        rows (int): Rows written.
+    """
+
+    def __init__(self, file: Union[str, os.PathLike], format: Optional[str] = None):
+        self.file = file
+        self.format = format or infer_format(file, OUTPUT_FORMATS, default="tsv")
+        assert self.format in OUTPUT_FORMATS, f"format must be one of {OUTPUT_FORMATS}"
+        self.chunks = 0
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._file = None
+        if self.format == "parquet":
+            _pyarrow()
+        else:
+            self._file = open(file, "w", encoding="utf-8")
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(str(self.file), self._schema)
+            else:
+                table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        elif self.format == "jsonl":
+            if len(frame):
+                self._file.write(frame.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+        else:
+            self._check_tsv(frame)
+            save_nuggets(frame.copy(), self._file)
+        if self._file is not None:
+            self._file.flush()
+        self.chunks += 1
+        self.rows += len(frame)
+
+    @staticmethod
+    def _check_tsv(frame: pd.DataFrame) -> None:
+        if "run_id" in frame.columns:
+            raise ValueError("tsv output drops run_id, so runs could not be told apart; write jsonl or parquet")
+        if {"qid", "nugget_id"} <= set(frame.columns) and frame.duplicated(["qid", "nugget_id"]).any():
+            raise ValueError(
+                "tsv output drops answers, so several answers per query could not be told apart; write jsonl or parquet"
+            )
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+__all__ = [
+    "RUN_FORMATS",
+    "OUTPUT_FORMATS",
+    "TREC_RUN_COLUMNS",
+    "infer_format",
+    "qid_chunks",
+    "iter_run_chunks",
+    "ChunkWriter",
+]
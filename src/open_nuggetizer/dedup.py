@@ -0,0 +1,220 @@
+import re
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have in is it its of on or should that the this to was "
+    "were will with about".split()
+)
+
+
+@dataclass
+class DedupStats:
+    documents: int
+    removed_exact: int
+    removed_near: int
+    tokens: int
+    removed_tokens: int
+
+    @property
+    def removed(self) -> int:
+        return self.removed_exact + self.removed_near
+
+
+def normalise_text(text: str) -> str:
+    """
+    Lowercase a string, strip punctuation and collapse whitespace.
+
+    Args:
+        text (str): The input string.
+
+    Returns:
+        str: The normalised string.
+    """
+    text = re.sub(r"[^\w\s]", " ", str(text).lower())
+    return " ".join(text.split())
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """
+    Hashed word shingles of a normalised string.
+
+    Args:
+        text (str): The input string.
+        size (int): Number of words per shingle.
+
+    Returns:
+        Set[int]: The 32-bit hashes of each shingle.
+    """
+    tokens = normalise_text(text).split()
+    if len(tokens) <= size:
+        return {_hash(" ".join(tokens))} if tokens else set()
+    return {_hash(" ".join(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures over hashed shingles, estimating Jaccard similarity between documents.
+
+    Parameters:
+        num_perm (int): Number of hash permutations in each signature.
+        seed (int): Seed for the permutation coefficients.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        assert num_perm > 0, "num_perm must be greater than 0"
+        self.num_perm = num_perm
+        self.seed = seed
+        coefficients = [_hash(f"{seed}_{i}") for i in range(2 * num_perm)]
+        self.a = [c % (_MERSENNE_PRIME - 1) + 1 for c in coefficients[:num_perm]]
+        self.b = [c % _MERSENNE_PRIME for c in coefficients[num_perm:]]
+
+    def signature(self, hashes: Set[int]) -> Tuple[int, ...]:
+        if not hashes:
+            return tuple([_MAX_HASH] * self.num_perm)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in zip(self.a, self.b)
+        )
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(left, right)) / len(left)
+
+
+def dedup_documents(
+    documents: List[str],
+    near_duplicate_threshold: Optional[float] = None,
+    shingle_size: int = 5,
+    num_perm: int = 64,
+) -> Tuple[List[int], DedupStats]:
+    """
+    Drop exact and (optionally) near-duplicate documents, keeping the first occurrence of each.
+
+    Exact duplicates are found by hashing the normalised text. Near-duplicates are found by comparing
+    MinHash signatures of word shingles against the documents kept so far.
+
+    Args:
+        documents (List[str]): Document texts, in rank order.
+        near_duplicate_threshold (float, optional): Estimated Jaccard similarity above which a document is
+            considered a near-duplicate. If None, only exact duplicates are removed.
+        shingle_size (int): Number of words per shingle.
+        num_perm (int): Number of MinHash permutations.
+
+    Returns:
+        Tuple[List[int], DedupStats]: Indices of the documents to keep and statistics on what was removed.
+    """
+    assert near_duplicate_threshold is None or 0.0 < near_duplicate_threshold <= 1.0, \
+        "near_duplicate_threshold must be in (0, 1]"
+    minhash = MinHasher(num_perm) if near_duplicate_threshold is not None else None
+
+    keep: List[int] = []
+    seen: Set[str] = set()
+    signatures: List[Tuple[int, ...]] = []
+    removed_exact, removed_near, tokens, removed_tokens = 0, 0, 0, 0
+
+    for i, document in enumerate(documents):
+        n_tokens = len(str(document).split())
+        tokens += n_tokens
+        digest = hashlib.sha1(normalise_text(document).encode("utf-8")).hexdigest()
+        if digest in seen:
+            removed_exact += 1
+            removed_tokens += n_tokens
+            continue
+        seen.add(digest)
+        if minhash is not None:
+            signature = minhash.signature(shingles(document, shingle_size))
+            if any(minhash.similarity(signature, other) >= near_duplicate_threshold for other in signatures):
+                removed_near += 1
+                removed_tokens += n_tokens
+                continue
+            signatures.append(signature)
+        keep.append(i)
+
+    return keep, DedupStats(
+        documents=len(documents),
+        removed_exact=removed_exact,
+        removed_near=removed_near,
+        tokens=tokens,
+        removed_tokens=removed_tokens,
+    )
+
+
+def _terms(text: str) -> Set[str]:
+    terms = set()
+    for token in normalise_text(text).split():
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.add(token)
+    return terms
+
+
+def nugget_similarity(left: str, right: str) -> float:
+    """
+    Jaccard similarity between the normalised, stopped terms of two nuggets.
+
+    Args:
+        left (str): The first nugget.
+        right (str): The second nugget.
+
+    Returns:
+        float: Similarity in [0, 1].
+    """
+    return _jaccard(_terms(left), _terms(right))
+
+
+def _jaccard(left: Set[str], right: Set[str]) -> float:
+    union = left | right
+    return len(left & right) / len(union) if union else 1.0
+
+
+def cluster_nuggets(nuggets: List[str], threshold: float = 0.5) -> List[List[int]]:
+    """
+    Greedily cluster near-duplicate nuggets.
+
+    Nuggets are visited in order; each joins the first cluster whose representative (its first member)
+    is at least ``threshold`` similar, otherwise it starts a new cluster. As the creator orders nuggets by
+    importance, the representative of each cluster is its most important member.
+
+    Args:
+        nuggets (List[str]): Nugget texts, in order of importance.
+        threshold (float): Minimum similarity for two nuggets to be merged.
+
+    Returns:
+        List[List[int]]: Clusters of nugget indices, the first index of each being the representative.
+    """
+    assert 0.0 < threshold <= 1.0, "threshold must be in (0, 1]"
+    clusters: List[List[int]] = []
+    representatives: List[Set[str]] = []
+    for i, nugget in enumerate(nuggets):
+        terms = _terms(nugget)
+        for cluster, other in zip(clusters, representatives):
+            # the same measure as nugget_similarity, over terms computed once per nugget
+            if _jaccard(terms, other) >= threshold:
+                cluster.append(i)
+                break
+        else:
+            clusters.append([i])
+            representatives.append(terms)
+    return clusters
+
+
+__all__ = [
+    "DedupStats",
+    "MinHasher",
+    "normalise_text",
+    "shingles",
+    "dedup_documents",
+    "nugget_similarity",
+    "cluster_nuggets",
+]
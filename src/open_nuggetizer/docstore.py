@@ -0,0 +1,184 @@
+import json
+import bisect
+from pathlib import Path
+from typing import Any, Iterable, List, Mapping, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from pyterrier_nuggetizer.index import StringTable
+
+
+class DocumentStore:
+    """
+    Maps docnos to document text, so the creator can fetch the text of each window just in time
+    rather than needing every document's text in its input frame.
+    """
+
+    def get(self, docnos: Sequence[str]) -> List[str]:
+        """
+        The text of each of ``docnos``, in order. Raises ``KeyError`` for an unknown docno.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class DictDocumentStore(DocumentStore):
+    """
+    A document store over an in-memory mapping of docno to text.
+
+    Parameters:
+        documents (Mapping[str, str] | pd.DataFrame): The texts by docno, or a frame with docno and text columns.
+        text_field (str): The text column, if ``documents`` is a frame.
+    """
+
+    def __init__(self, documents: Union[Mapping[str, str], pd.DataFrame], text_field: str = "text"):
+        if isinstance(documents, pd.DataFrame):
+            documents = dict(zip(documents["docno"].astype(str), documents[text_field]))
+        self.documents = documents
+
+    def get(self, docnos: Sequence[str]) -> List[str]:
+        return [self.documents[str(docno)] for docno in docnos]
+
+
+class MetaIndexDocumentStore(DocumentStore):
+    """
+    A document store over the meta index of a Terrier index, looking documents up by their docno.
+
+    Parameters:
+        index (Any): A Terrier index, or an index reference or path to open with ``pt.IndexFactory``.
+        text_field (str): The meta index field holding the text.
+    """
+
+    def __init__(self, index: Any, text_field: str = "text"):
+        import pyterrier as pt
+        if not hasattr(index, "getMetaIndex"):
+            index = pt.IndexFactory.of(index)
+        self.index = index
+        self.meta = index.getMetaIndex()
+        self.text_field = text_field
+
+    def get(self, docnos: Sequence[str]) -> List[str]:
+        texts = []
+        for docno in docnos:
+            docid = self.meta.getDocument("docno", str(docno))
+            if docid < 0:
+                raise KeyError(docno)
+            texts.append(self.meta.getItem(self.text_field, docid))
+        return texts
+
+
+class BlobDocumentStore(DocumentStore):
+    """
+    A read-only document store in a local directory, with docnos and texts kept as memory-mapped
+    ``StringTable`` files sorted by docno, so opening a store reads no text and each lookup is a binary search.
+
+    Parameters:
+        path (str | Path): Directory written by ``BlobDocumentStore.build``.
+        mmap (bool): Whether to memory-map the tables rather than load them.
+    """
+
+    def __init__(self, path: Union[str, Path], mmap: bool = True):
+        self.path = Path(path)
+        meta = json.loads((self.path / "docstore.json").read_text())
+        assert meta.get("type") == "blob", f"{path} is not a blob document store"
+        self.docnos = StringTable.load(self.path, "docnos", mmap)
+        self.texts = StringTable.load(self.path, "texts", mmap)
+
+    @classmethod
+    def build(
+        cls,
+        documents: Union[Mapping[str, str], pd.DataFrame, Iterable[Tuple[str, str]]],
+        path: Union[str, Path],
+        text_field: str = "text",
+    ) -> "BlobDocumentStore":
+        """
+        Write a store of ``documents`` (a mapping, a frame with docno and text columns, or (docno, text) pairs)
+        to the directory ``path`` and open it.
+        """
+        if isinstance(documents, pd.DataFrame):
+            documents = zip(documents["docno"].astype(str), documents[text_field])
+        elif isinstance(documents, Mapping):
+            documents = documents.items()
+        pairs = sorted((str(docno), text) for docno, text in dict(documents).items())
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        StringTable.from_list([docno for docno, _ in pairs]).save(path, "docnos")
+        StringTable.from_list([text for _, text in pairs]).save(path, "texts")
+        (path / "docstore.json").write_text(json.dumps({"type": "blob", "documents": len(pairs)}))
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.docnos)
+
+    def _position(self, docno: str) -> int:
+        i = bisect.bisect_left(self.docnos, docno)
+        if i == len(self.docnos) or self.docnos[i] != docno:
+            raise KeyError(docno)
+        return i
+
+    def get(self, docnos: Sequence[str]) -> List[str]:
+        return self.texts.take(np.array([self._position(str(docno)) for docno in docnos], dtype=np.int64))
+
+
+class LazyDocuments:
+    """
+    The documents of one query as docnos, whose text is fetched from a store only when a window is sliced,
+    and not kept afterwards.
+
+    Parameters:
+        docnos (List[str]): The docnos, in rank order.
+        store (DocumentStore): The store to fetch text from.
+    """
+
+    def __init__(self, docnos: List[str], store: DocumentStore):
+        self.docnos = docnos
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.docnos)
+
+    def __getitem__(self, positions: slice) -> List[str]:
+        assert isinstance(positions, slice), "LazyDocuments can only be sliced"
+        return self.store.get(self.docnos[positions])
+
+    def unique(self) -> "LazyDocuments":
+        """
+        The documents without repeated docnos, keeping the first (highest ranked) occurrence.
+        """
+        return LazyDocuments(list(dict.fromkeys(self.docnos)), self.store)
+
+
+def as_document_store(documents: Any) -> DocumentStore:
+    """
+    A ``DocumentStore`` from a store, a mapping or frame of texts by docno, a Terrier index, or the path of
+    a blob store or Terrier index.
+    """
+    if isinstance(documents, DocumentStore):
+        return documents
+    if isinstance(documents, (str, Path)):
+        if (Path(documents) / "docstore.json").exists():
+            return BlobDocumentStore(documents)
+        return MetaIndexDocumentStore(str(documents))
+    if isinstance(documents, (Mapping, pd.DataFrame)):
+        return DictDocumentStore(documents)
+    if hasattr(documents, "getMetaIndex"):
+        return MetaIndexDocumentStore(documents)
+    raise TypeError(f"Cannot make a document store from {type(documents).__name__}")
+
+
+__all__ = [
+    "DocumentStore",
+    "DictDocumentStore",
+    "MetaIndexDocumentStore",
+    "BlobDocumentStore",
+    "LazyDocuments",
+    "as_document_store",
+]
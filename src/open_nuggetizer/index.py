@@ -0,0 +1,253 @@
+import copy
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+QrelsLike = Union[pd.DataFrame, Dict[str, Dict[str, Any]]]
+
+MISSING_LABEL = -1
+
+
+class StringTable:
+    """
+    Immutable strings stored as a single UTF-8 buffer and an offsets array, so a table can be saved with
+    ``np.save`` and memory-mapped read-only by many processes.
+
+    Parameters:
+        data (np.ndarray): The concatenated UTF-8 bytes, as uint8.
+        offsets (np.ndarray): String boundaries, of length number of strings + 1.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, values: Iterable[Any]) -> "StringTable":
+        encoded = [str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+    def take(self, positions: Union[slice, Sequence[int], np.ndarray]) -> List[str]:
+        if isinstance(positions, slice):
+            positions = range(*positions.indices(len(self)))
+        return [self[int(i)] for i in positions]
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+    def save(self, path: Path, name: str) -> None:
+        np.save(path / f"{name}.data.npy", self.data)
+        np.save(path / f"{name}.offsets.npy", self.offsets)
+
+    @classmethod
+    def load(cls, path: Path, name: str, mmap: bool = True) -> "StringTable":
+        mode = "r" if mmap else None
+        return cls(np.load(path / f"{name}.data.npy", mmap_mode=mode), np.load(path / f"{name}.offsets.npy", mmap_mode=mode))
+
+
+def _group(qids: pd.Series):
+    """Factorize qids in order of first appearance; returns the qid table, a stable grouping order and offsets."""
+    codes, uniques = pd.factorize(qids.astype(str), sort=False)
+    order = np.argsort(codes, kind="stable")
+    offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(uniques)), out=offsets[1:])
+    return list(uniques), order, offsets
+
+
+def _label_array(values: pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors="coerce").fillna(MISSING_LABEL).to_numpy(dtype=np.int8)
+
+
+class _TopicIndex:
+    arrays: Sequence[str] = ()
+    tables: Sequence[str] = ()
+
+    def _init_topics(self, qids: List[str], offsets: np.ndarray) -> None:
+        self.qids = list(qids)
+        self.offsets = offsets
+        self.codes: Dict[str, int] = {qid: i for i, qid in enumerate(self.qids)}
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1]) if len(self.offsets) else 0
+
+    def __contains__(self, qid: Any) -> bool:
+        return str(qid) in self.codes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.qids)
+
+    def span(self, qid: Any) -> slice:
+        """The positions of the rows of ``qid`` in the flat columns, empty if the topic is unknown."""
+        code = self.codes.get(str(qid))
+        if code is None:
+            return slice(0, 0)
+        return slice(int(self.offsets[code]), int(self.offsets[code + 1]))
+
+    @property
+    def nugget_ids(self) -> List[str]:
+        return self.take_nugget_ids(slice(0, len(self)))
+
+    def take_nugget_ids(self, positions) -> List[str]:
+        return self.nugget_id_table.take(self.nugget_id_codes[positions])
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save the index as a directory of ``.npy`` files that ``load`` can memory-map read-only, so worker
+        processes share one copy of the pages.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        StringTable.from_list(self.qids).save(path, "qids")
+        np.save(path / "offsets.npy", self.offsets)
+        for name in self.arrays:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        for name in self.tables:
+            getattr(self, name).save(path, name)
+        (path / "index.json").write_text(json.dumps({"type": type(self).__name__, "rows": len(self)}))
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True):
+        path = Path(path)
+        meta = json.loads((path / "index.json").read_text())
+        if meta["type"] != cls.__name__:
+            raise ValueError(f"{path} holds a {meta['type']}, not a {cls.__name__}")
+        index = cls.__new__(cls)
+        mode = "r" if mmap else None
+        index._init_topics(StringTable.load(path, "qids", mmap=False).tolist(), np.load(path / "offsets.npy", mmap_mode=mode))
+        for name in cls.arrays:
+            setattr(index, name, np.load(path / f"{name}.npy", mmap_mode=mode))
+        for name in cls.tables:
+            setattr(index, name, StringTable.load(path, name, mmap=mmap))
+        return index
+
+
+class NuggetQrelsIndex(_TopicIndex):
+    """
+    Nugget qrels grouped by qid, so the nuggets of a topic can be looked up without merging them
+    against every answer of a run.
+
+    Topics are integer-coded in order of first appearance; the nuggets of topic ``c`` occupy
+    ``offsets[c]:offsets[c + 1]`` of the flat columns. Nugget ids are interned (``nugget_id_codes`` into
+    ``nugget_id_table``), nugget texts are kept in a ``StringTable`` and importance in an int8 array.
+    The index is built in one vectorised pass and can be saved and memory-mapped with ``save``/``load``.
+
+    Parameters:
+        qrels (pd.DataFrame | dict): Either a DataFrame with qid, nugget_id, nugget and importance columns,
+            or a dict-of-dict ``{qid: {nugget_id: (nugget, importance)}}`` as used by the measure provider.
+    """
+    arrays = ("nugget_id_codes", "importance")
+    tables = ("nugget_id_table", "nuggets")
+
+    def __init__(self, qrels: QrelsLike):
+        if isinstance(qrels, dict):
+            qrels = pd.DataFrame(
+                [(qid, nugget_id, nugget, importance)
+                 for qid, topic in qrels.items()
+                 for nugget_id, (nugget, importance) in topic.items()],
+                columns=["qid", "nugget_id", "nugget", "importance"],
+            )
+        missing = [c for c in ["qid", "nugget_id", "nugget"] if c not in qrels.columns]
+        if missing:
+            raise ValueError(f"qrels DataFrame missing columns: {missing} (found {list(qrels.columns)})")
+        qids, order, offsets = _group(qrels["qid"])
+        self._init_topics(qids, offsets)
+        codes, table = pd.factorize(qrels["nugget_id"].astype(str).to_numpy()[order], sort=False)
+        self.nugget_id_codes = codes.astype(np.int32)
+        self.nugget_id_table = StringTable.from_list(table)
+        self.nuggets = StringTable.from_list(qrels["nugget"].to_numpy(dtype=object)[order])
+        importance = qrels["importance"] if "importance" in qrels.columns else pd.Series(MISSING_LABEL, index=qrels.index)
+        self.importance = _label_array(importance)[order]
+
+    def rows(self, qid: Any) -> List[Dict[str, Any]]:
+        """The nuggets of ``qid`` as nugget_id, nugget and importance records."""
+        span = self.span(qid)
+        return [
+            {"nugget_id": nugget_id, "nugget": nugget, "importance": int(importance)}
+            for nugget_id, nugget, importance in zip(
+                self.take_nugget_ids(span), self.nuggets.take(span), self.importance[span]
+            )
+        ]
+
+    def lookup_importance(self, qids: Sequence[Any], nugget_ids: Sequence[Any]) -> np.ndarray:
+        """The importance of each (qid, nugget_id) pair, -1 where the nugget is not in the qrels."""
+        keys = pd.MultiIndex.from_arrays([
+            np.repeat(np.asarray(self.qids, dtype=object), np.diff(self.offsets)), self.nugget_ids,
+        ])
+        positions = keys.get_indexer(pd.MultiIndex.from_arrays([
+            pd.Index(qids).astype(str), pd.Index(nugget_ids).astype(str),
+        ]))
+        return np.where(positions >= 0, self.importance[positions], MISSING_LABEL).astype(np.int8)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The qrels as a DataFrame with qid, nugget_id, nugget and importance columns."""
+        return pd.DataFrame({
+            "qid": np.repeat(np.asarray(self.qids, dtype=object), np.diff(self.offsets)),
+            "nugget_id": self.nugget_ids,
+            "nugget": self.nuggets.tolist(),
+            "importance": np.asarray(self.importance, dtype=np.int64),
+        })
+
+
+class NuggetRunIndex(_TopicIndex):
+    """
+    Assignments of a run grouped by qid, in the layout of ``NuggetQrelsIndex``, with the importance of
+    each nugget aligned from the qrels. As with the measure provider's dict-of-dict run format, a nugget
+    assigned several times for a topic keeps its first position and its last assignment.
+
+    Parameters:
+        run (pd.DataFrame): Assigned nuggets with qid (or query_id), nugget_id and assignment columns.
+        qrels (NuggetQrelsIndex, optional): Qrels to align importance from, -1 if None.
+    """
+    arrays = ("nugget_id_codes", "assignment", "importance")
+    tables = ("nugget_id_table",)
+
+    def __init__(self, run: pd.DataFrame, qrels: Optional[NuggetQrelsIndex] = None):
+        qid = run["qid"] if "qid" in run.columns else run["query_id"]
+        frame = pd.DataFrame({
+            "qid": qid.astype(str).to_numpy(),
+            "nugget_id": run["nugget_id"].astype(str).to_numpy(),
+            "assignment": _label_array(run["assignment"]),
+        }).groupby(["qid", "nugget_id"], sort=False, as_index=False)["assignment"].last()
+        qids, order, offsets = _group(frame["qid"])
+        self._init_topics(qids, offsets)
+        nugget_ids = frame["nugget_id"].to_numpy()[order]
+        codes, table = pd.factorize(nugget_ids, sort=False)
+        self.nugget_id_codes = codes.astype(np.int32)
+        self.nugget_id_table = StringTable.from_list(table)
+        self.assignment = frame["assignment"].to_numpy()[order]
+        self.importance = qrels.lookup_importance(frame["qid"].to_numpy()[order], nugget_ids) \
+            if qrels is not None else np.full(len(frame), MISSING_LABEL, dtype=np.int8)
+
+    def with_assignment(self, assignment: np.ndarray) -> "NuggetRunIndex":
+        """A copy of the index with other assignment labels, e.g. derived for a coarser assignment mode."""
+        assert len(assignment) == len(self.assignment), "assignment must have one label per nugget"
+        index = copy.copy(self)
+        index.assignment = np.asarray(assignment)
+        return index
+
+    @classmethod
+    def from_batch(cls, batch, qrels: Optional[NuggetQrelsIndex] = None) -> "NuggetRunIndex":
+        """Index the assignments of a ``NuggetBatch``."""
+        sizes = np.diff(batch.offsets)
+        return cls(pd.DataFrame({
+            "qid": np.repeat(np.asarray(batch.qids, dtype=object)[batch.qid_codes], sizes)
+                if batch.num_groups else np.empty(0, dtype=object),
+            "nugget_id": batch.nugget_ids,
+            "assignment": batch.assignment,
+        }), qrels)
+
+
+__all__ = ["MISSING_LABEL", "StringTable", "NuggetQrelsIndex", "NuggetRunIndex"]
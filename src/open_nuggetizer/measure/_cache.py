@@ -0,0 +1,75 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Hashable, Optional, Sequence
+import pandas as pd
+
+
+def fingerprint_frame(frame: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> str:
+    """
+    A content hash of ``frame`` (restricted to ``columns`` where present), independent of its index.
+    """
+    if columns is not None:
+        frame = frame[[c for c in columns if c in frame.columns]]
+    hashes = pd.util.hash_pandas_object(frame.astype(str), index=False).to_numpy()
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(",".join(map(str, frame.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AssignmentCache:
+    """
+    Least-recently-used cache of assigned runs, so repeated evaluations of the same run against the same
+    qrels (different measures, ``calc_aggregate`` followed by ``iter_calc``, ``pt.Experiment``) only pay for
+    the LLM assignment once.
+
+    Parameters:
+        max_entries (int): Number of assigned runs kept.
+        stats (Counter, optional): Counter receiving cache_hits and cache_misses.
+    """
+
+    def __init__(self, max_entries: int = 16, stats: Optional[Counter] = None):
+        assert max_entries > 0, "max_entries must be greater than 0"
+        self.max_entries = max_entries
+        self.stats = stats if stats is not None else Counter()
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+        The cached value for ``key``, or None without computing it.
+        """
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return self.entries[key]
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return self.entries[key]
+        value = compute()
+        with self.lock:
+            self.stats["cache_misses"] += 1
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+__all__ = ["fingerprint_frame", "AssignmentCache"]
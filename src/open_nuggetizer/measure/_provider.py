@@ -1,67 +1,129 @@
-from typing import Iterator, List, Tuple
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
 from ir_measures import providers, Metric
 from ir_measures.providers.base import Any
 from pyterrier_nuggetizer.measure._measures import _AllScore, _VitalScore, _WeightedScore
-from pyterrier_nuggetizer.measure._util import NuggetQrelsConverter, RAGRunConverter
+from pyterrier_nuggetizer.measure._util import NuggetQrelsConverter
+from pyterrier_nuggetizer.measure._cache import fingerprint_frame
+from pyterrier_nuggetizer.index import NuggetRunIndex
+from pyterrier_nuggetizer._types import NuggetAssignMode
+from pyterrier_nuggetizer.sampling import ApproxEvaluation, estimate_metrics, inclusion_weights
 
 
 class NuggetScoreEvaluator(providers.Evaluator):
     def __init__(self, nuggetizer_instance, measures, qrels, invocations):
-        super().__init__(measures, set(qrels.keys()))
+        with nuggetizer_instance._section("conversion"):
+            self.index = NuggetQrelsConverter(qrels).as_index()
+            self.qrels_fingerprint = fingerprint_frame(self.index.to_frame())
+        super().__init__(measures, set(self.index.qids))
         self.nuggetizer_instance = nuggetizer_instance
         self.qrels = qrels
         self.invocations = invocations
-
-    def _unweighted(self, nuggets, partial_rel, strict, partial_weight):
-        full_support = [n for n in nuggets if n[1] > partial_rel]
-        partial_support = [n for n in nuggets if 0 < n[1] <= partial_rel]
-        if not len(full_support) > 0:
+        # with approx_fraction, the sample estimates and confidence intervals of the last evaluated run
+        self.approximation: Optional[ApproxEvaluation] = None
+
+    def _assign(self, run) -> NuggetRunIndex:
+        nuggetizer = self.nuggetizer_instance
+        mode = nuggetizer.assigner_mode
+        fingerprint = fingerprint_frame(run, ["qid", nuggetizer.query_field, nuggetizer.answer_field])
+
+        def key(judged: NuggetAssignMode) -> tuple:
+            return (
+                fingerprint,
+                self.qrels_fingerprint,
+                judged,
+                nuggetizer.assigner_window_size,
+                nuggetizer.approx_fraction,
+                nuggetizer.approx_seed,
+            )
+
+        if not nuggetizer.rejudge_assign_modes and key(mode) not in nuggetizer.assignment_cache:
+            # a finer judgement of the same run, e.g. from evaluating in grade 3 before, serves this mode too
+            for finer in sorted(NuggetAssignMode, key=lambda m: m.grades, reverse=True):
+                if finer.grades <= mode.grades:
+                    continue
+                index = nuggetizer.assignment_cache.peek(key(finer))
+                if index is not None:
+                    nuggetizer.stats["evaluator"]["derived"] += len(index)
+                    return index.with_assignment(mode.derive(index.assignment, finer))
+        return nuggetizer.assignment_cache.get(
+            key(mode), lambda: NuggetRunIndex.from_batch(nuggetizer._assign_run_batch(run, self.index), self.index)
+        )
+
+    def _unweighted(self, support, weights, partial_rel, strict, partial_weight):
+        full_support = float(weights[support > partial_rel].sum())
+        if not full_support > 0:
             return 0.0
 
-        value = len(full_support)
+        value = full_support
         if not strict:
-            value += partial_weight * len(partial_support)
-            
-        return value / len(nuggets)
+            value += partial_weight * float(weights[(support > 0) & (support <= partial_rel)].sum())
+
+        return value / float(weights.sum())
 
-    def _weighted(self, nuggets, rel, partial_rel, strict, partial_weight):
-        vital_nuggets = [n for n in nuggets if n[1] > rel]
-        okay_nuggets = [n for n in nuggets if 0 < n[1] <= rel]
+    def _weighted(self, support, weights, rel, partial_rel, strict, partial_weight):
+        vital = support > rel
+        okay = (support > 0) & (support <= rel)
 
-        vital_score = self._unweighted(vital_nuggets, partial_rel, strict, partial_weight)
-        okay_score = self._unweighted(okay_nuggets, partial_rel, strict, partial_weight)
+        vital_score = self._unweighted(support[vital], weights[vital], partial_rel, strict, partial_weight)
+        okay_score = self._unweighted(support[okay], weights[okay], partial_rel, strict, partial_weight)
 
-        denominator = len(vital_nuggets) + 0.5 * len(okay_nuggets)
+        denominator = float(weights[vital].sum()) + 0.5 * float(weights[okay].sum())
         if denominator == 0:
             return 0.0
         return (vital_score + 0.5 * okay_score) / denominator
 
+    def _weights(self, run: NuggetRunIndex) -> np.ndarray:
+        """
+        Per judged nugget, the number of qrels nuggets it stands for: 1 when judging every nugget, and the
+        inverse inclusion probability of its stratum when judging an ``approx_fraction`` sample, so that
+        oversampled small strata do not bias the scores.
+        """
+        if self.nuggetizer_instance.approx_fraction is None:
+            return np.ones(len(run))
+        judged = pd.DataFrame({
+            "qid": np.repeat(np.asarray(run.qids, dtype=object), np.diff(run.offsets)),
+            "importance": np.asarray(run.importance, dtype=np.int64),
+            "assignment": np.asarray(run.assignment, dtype=np.int64),
+        })
+        population = self.index.to_frame()
+        per_query, estimates = estimate_metrics(judged, population)
+        self.approximation = ApproxEvaluation(judged, per_query, estimates, len(judged), len(population))
+        return inclusion_weights(judged, population)
+
     def iter_calc(self, run) -> Iterator['Metric']:
-        run = self.nuggetizer_instance._iter_assign_to_run(run, self.qrels)
-        run = run.rename(columns={'qid': 'query_id'})
-        run = RAGRunConverter(run).as_dict_of_dict()
+        # computed eagerly so that profiling attributes the work to the evaluator, not to the consumer
+        with self.nuggetizer_instance._section("evaluator"):
+            metrics = list(self._iter_calc(self._assign(run)))
+        yield from metrics
+
+    def _iter_calc(self, run: NuggetRunIndex) -> Iterator['Metric']:
+        weights = self._weights(run)
         for measure, rel, partial_rel, strict, partial_weight, weighted in self.invocations:
-            for qid, _nuggets in run.items():
-                qrels = self.qrels.get(qid, {})
-                if len(_nuggets) < 1:
+            for qid in run.qids:
+                span = run.span(qid)
+                support = np.asarray(run.assignment[span])
+                weight = weights[span]
+                if len(support) < 1:
                     continue
 
-                nuggets = [(nugget_id, support, qrels.get(nugget_id, 0)) for nugget_id, support in _nuggets.items()]
-
                 if strict:
-                    nuggets = [n for n in nuggets if n[2][1] >= rel]
+                    # nuggets missing from the qrels have importance -1 and are dropped
+                    keep = np.asarray(run.importance[span]) >= rel
+                    support, weight = support[keep], weight[keep]
 
-                if len(nuggets) < 1:
+                if len(support) < 1:
                     continue
 
                 if weighted:
                     yield Metric(query_id=qid,
                                  measure=measure,
-                                 value=self._weighted(nuggets, rel, partial_rel, strict, partial_weight))
+                                 value=self._weighted(support, weight, rel, partial_rel, strict, partial_weight))
                 else:
                     yield Metric(query_id=qid,
                                  measure=measure,
-                                 value=self._unweighted(nuggets, partial_rel, strict, partial_weight))
+                                 value=self._unweighted(support, weight, partial_rel, strict, partial_weight))
 
 
 class NuggetEvalProvider(providers.Provider):
@@ -73,7 +135,7 @@ class NuggetEvalProvider(providers.Provider):
        _WeightedScore(rel=Any(), partial_rel=Any(), partial_weight=Any()),
     ]
 
-    def __init__(self, nuggetizer_instance):
+    def __init__(self, nuggetizer_instance=None):
         super().__init__()
         self.nuggetizer_instance = nuggetizer_instance
 
@@ -97,6 +159,27 @@ class NuggetEvalProvider(providers.Provider):
         return invocations
 
     def _evaluator(self, measures, qrels) -> providers.Evaluator:
-        qrels = NuggetQrelsConverter(qrels).as_dict_of_dict()
+        if self.nuggetizer_instance is None:
+            raise ValueError("No Nuggetizer to assign nuggets with, access a measure through a Nuggetizer first")
         invocations = self._build_invocations(measures)
         return NuggetScoreEvaluator(self.nuggetizer_instance, measures, qrels, invocations)
+
+
+_default_provider = None
+
+
+def register_default_provider(nuggetizer_instance) -> NuggetEvalProvider:
+    """
+    Route nugget measures evaluated through ``ir_measures`` (and so ``pt.Experiment``) to ``nuggetizer_instance``.
+
+    A single provider is added to ``ir_measures.DefaultPipeline`` however many Nuggetizers are created; it
+    serves the Nuggetizer whose measures were accessed most recently. Use ``Nuggetizer.provider`` directly
+    to evaluate with a specific instance.
+    """
+    global _default_provider
+    if _default_provider is None:
+        from ir_measures import DefaultPipeline
+        _default_provider = NuggetEvalProvider(nuggetizer_instance)
+        DefaultPipeline.providers.append(_default_provider)
+    _default_provider.nuggetizer_instance = nuggetizer_instance
+    return _default_provider
@@ -14,6 +14,10 @@ if False: # this is to allow type-checking for pandas
     import pandas
 
 
+def _is_index(qrels):
+    return type(qrels).__name__ == 'NuggetQrelsIndex'
+
+
 class Qrel(NamedTuple):
     qid: str
     nugget_id: str
@@ -50,6 +54,8 @@ class NuggetQrelsConverter:
         error = None
         if isinstance(self.qrels, dict):
             result = 'dict_of_dict'
+        elif _is_index(self.qrels):
+            result = 'index'
         elif hasattr(self.qrels, 'itertuples'):
             cols = self.qrels.columns
             missing_cols = [f for f in Qrel._fields if f not in cols and f not in Qrel._field_defaults]
@@ -100,6 +106,8 @@ class NuggetQrelsConverter:
             for qid, docs in self.qrels.items():
                 for nugget_id, (nugget, importance) in docs.items():
                     yield Qrel(qid=qid, nugget_id=nugget_id, nugget=nugget, importance=importance)
+        if t == 'index':
+            yield from (Qrel(qrel.qid, qrel.nugget_id, qrel.nugget, qrel.importance) for qrel in self.qrels.to_frame().itertuples())
         if t == 'pd_dataframe':
             if 'iteration' in self.qrels.columns:
                 yield from (Qrel(qrel.qid, qrel.nugget_id, qrel.nugget, qrel.importance, qrel.iteration) for qrel in self.qrels.itertuples())
@@ -118,6 +126,21 @@ class NuggetQrelsConverter:
             pd = ir_measures.lazylibs.pandas()
             return pd.DataFrame(self.as_namedtuple_iter())
 
+    def as_index(self):
+        """
+        The qrels as a ``NuggetQrelsIndex``: integer-coded topics and interned nugget ids in flat arrays,
+        built in one pass and shareable read-only between processes via ``save``/``load``.
+        """
+        from pyterrier_nuggetizer.index import NuggetQrelsIndex
+        t, err = self.predict_type()
+        if t == 'index':
+            return self.qrels
+        if t == 'dict_of_dict':
+            return NuggetQrelsIndex(self.qrels)
+        if t == 'UNKNOWN':
+            raise ValueError(f'unknown qrels format: {err}')
+        return NuggetQrelsIndex(self.as_pd_dataframe())
+
     @contextlib.contextmanager
     def as_tmp_file(self):
         with tempfile.NamedTemporaryFile(mode='w+t') as f:
@@ -210,6 +233,24 @@ class RAGRunConverter:
             pd = ir_measures.lazylibs.pandas()
             return pd.DataFrame(self.as_namedtuple_iter())
 
+    def as_index(self, qrels=None):
+        """
+        The assignments as a ``NuggetRunIndex``, with importance aligned from ``qrels`` (a ``NuggetQrelsIndex``)
+        if given. As with ``as_dict_of_dict``, a nugget assigned several times for a query keeps its last assignment.
+        """
+        from pyterrier_nuggetizer.index import NuggetRunIndex
+        t, err = self.predict_type()
+        if t == 'UNKNOWN':
+            raise ValueError(f'unknown run format: {err}')
+        pd = ir_measures.lazylibs.pandas()
+        if t == 'dict_of_dict':
+            frame = pd.DataFrame(
+                [(query_id, nugget_id, assignment) for query_id, docs in self.run.items() for nugget_id, assignment in docs.items()],
+                columns=['query_id', 'nugget_id', 'assignment'])
+        else:
+            frame = self.as_pd_dataframe()
+        return NuggetRunIndex(frame, qrels)
+
     @contextlib.contextmanager
     def as_tmp_file(self):
         with tempfile.NamedTemporaryFile(mode='w+t') as f:
@@ -1,6 +1,7 @@
-from typing import List, Dict
-from dataclasses import dataclass
+from typing import List, Dict, Sequence
+from dataclasses import dataclass, fields
 from statistics import mean
+import pandas as pd
 
 
 @dataclass
@@ -94,3 +95,80 @@ def calculate_global_metrics(records: List[Dict]) -> Dict[str, float]:
         "strict_all_score": mean(m.strict_all_score for m in metrics_list),
         "all_score": mean(m.all_score for m in metrics_list),
     }
+
+
+METRIC_NAMES: List[str] = [f.name for f in fields(NuggetMetrics) if f.name != "qid"]
+
+
+def _codes(values: pd.Series, labels: Dict[str, int], default: int) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(values):
+        return values.map(lambda x: labels.get(x, default) if isinstance(x, str) else x).fillna(default).astype(int)
+    return values.fillna(default).astype(int)
+
+
+def calculate_nugget_scores_frame(nuggets: pd.DataFrame, by: Sequence[str] = ("qid",)) -> pd.DataFrame:
+    """
+    Vectorised equivalent of ``calculate_nugget_scores`` over many responses at once.
+
+    Args:
+        nuggets (pd.DataFrame): One row per judged nugget, with the ``by`` columns and 'importance' and
+            'assignment' columns, either as labels (vital/okay, support/partial_support/not_support) or as the
+            integer codes used by ``Nuggetizer`` (importance 1/0, assignment 2/1/0).
+        by (Sequence[str]): Columns identifying a response, e.g. ('run_id', 'qid').
+
+    Returns:
+        pd.DataFrame: The ``by`` columns followed by one column per metric, one row per response.
+    """
+    by = list(by)
+    importance = _codes(nuggets["importance"], {"vital": 1, "okay": 0}, -1)
+    assignment = _codes(nuggets["assignment"], {"support": 2, "partial_support": 1}, 0)
+    vital, okay = importance == 1, importance == 0
+    full, partial = assignment == 2, assignment == 1
+
+    counts = pd.DataFrame({
+        "all": 1,
+        "vital": vital,
+        "okay": okay,
+        "full": full,
+        "partial": partial,
+        "vital_full": vital & full,
+        "vital_partial": vital & partial,
+        "okay_full": okay & full,
+        "okay_partial": okay & partial,
+    }, index=nuggets.index).astype(float)
+    for column in by:
+        counts[column] = nuggets[column].values
+    c = counts.groupby(by, sort=False).sum()
+
+    def ratio(numerator, denominator):
+        return (numerator / denominator.where(denominator > 0)).fillna(0.0)
+
+    weights = c["vital"] + 0.5 * c["okay"]
+    scores = pd.DataFrame({
+        "strict_vital_score": ratio(c["vital_full"], c["vital"]),
+        "vital_score": ratio(c["vital_full"] + 0.5 * c["vital_partial"], c["vital"]),
+        "strict_weighted_score": ratio(c["vital_full"] + 0.5 * c["okay_full"], weights),
+        "weighted_score": ratio(
+            c["vital_full"] + 0.5 * c["okay_full"] + 0.5 * c["vital_partial"] + 0.25 * c["okay_partial"], weights
+        ),
+        "strict_all_score": ratio(c["full"], c["all"]),
+        "all_score": ratio(c["full"] + 0.5 * c["partial"], c["all"]),
+    })
+    return scores.reset_index()
+
+
+def calculate_global_metrics_frame(scores: pd.DataFrame, by: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Mean of per-response scores from ``calculate_nugget_scores_frame``, optionally per group (e.g. per run_id).
+
+    Returns:
+        pd.DataFrame: One row per group with qid 'all'.
+    """
+    by = list(by)
+    # statistics.mean is exact, which keeps results identical to calculate_global_metrics
+    if by:
+        means = scores.groupby(by, sort=False)[METRIC_NAMES].agg(lambda x: mean(x.tolist())).reset_index()
+    else:
+        means = pd.DataFrame([{name: mean(scores[name].tolist()) for name in METRIC_NAMES}])
+    means.insert(len(by), "qid", "all")
+    return means
@@ -0,0 +1,346 @@
+import re
+import ast
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+@dataclass
+class MockServerConfig:
+    """
+    Behaviour of the stand-in server.
+
+    Parameters:
+        latency_distribution (str): One of constant, uniform, exponential or lognormal.
+        latency_mean (float): Mean service time per request, in seconds.
+        latency_spread (float): Half-width for uniform, or standard deviation of the log for lognormal.
+        max_concurrency (int, optional): Requests beyond this many in flight are rejected with a 429.
+        max_requests_per_second (float, optional): Token bucket rate above which requests are rejected with a 429.
+        error_rate (float): Probability of replying with a 500 error.
+        malformed_rate (float): Probability of replying with output that does not parse as a list.
+        seed (int, optional): Seed for the random number generator.
+        model (str): Model name reported by the server.
+    """
+    latency_distribution: str = "constant"
+    latency_mean: float = 0.0
+    latency_spread: float = 0.0
+    max_concurrency: Optional[int] = None
+    max_requests_per_second: Optional[float] = None
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: Optional[int] = None
+    model: str = "mock-nuggetizer"
+
+    def __post_init__(self):
+        assert self.latency_distribution in LATENCY_DISTRIBUTIONS, \
+            f"latency_distribution must be one of {LATENCY_DISTRIBUTIONS}"
+        assert 0.0 <= self.error_rate <= 1.0, "error_rate must be in [0, 1]"
+        assert 0.0 <= self.malformed_rate <= 1.0, "malformed_rate must be in [0, 1]"
+
+
+def _extract_prompt_list(pattern: str, text: str) -> List[Any]:
+    match = re.search(pattern + r"\s*(\[.*?\])\s*\n", text, re.DOTALL)
+    if not match:
+        return []
+    try:
+        return list(ast.literal_eval(match.group(1)))
+    except (ValueError, SyntaxError):
+        return []
+
+
+def respond(prompt: str, rng: random.Random) -> str:
+    """
+    Produce a well-formed reply to a nuggetizer prompt.
+
+    Args:
+        prompt (str): The rendered creator, scorer or assigner prompt.
+        rng (random.Random): Source of randomness for labels.
+
+    Returns:
+        str: A Pythonic list of nuggets, (nugget, label) pairs or labels.
+    """
+    if "Updated Nugget List:" in prompt or "Updated Labelled Nugget List:" in prompt:
+        nuggets = [n[0] if isinstance(n, tuple) else n for n in _extract_prompt_list("Initial Nugget List:", prompt)]
+        limit = re.search(r"at most (\d+) nuggets", prompt)
+        limit = int(limit.group(1)) if limit else 30
+        context = prompt.split("Context:", 1)[-1]
+        for document in re.findall(r"^\[\d+\] (.*)$", context, re.MULTILINE):
+            digest = hashlib.md5(document.encode("utf-8")).hexdigest()[:8]
+            words = re.sub(r"[^\w\s]", " ", document).split()[:6]
+            nuggets.append(" ".join(words + [digest]))
+        nuggets = nuggets[:limit]
+        if "Updated Labelled Nugget List:" in prompt:
+            return str([(n, rng.choice(["vital", "okay"])) for n in nuggets])
+        return str(nuggets)
+    count = re.search(r"label each of the (\d+) nuggets", prompt)
+    count = int(count.group(1)) if count else 0
+    if "vital or okay" in prompt:
+        labels = ["vital", "okay"]
+    elif "partial_support" in prompt:
+        labels = ["support", "partial_support", "not_support"]
+    elif "not_support" in prompt:
+        labels = ["support", "not_support"]
+    else:
+        return "[]"
+    return str([rng.choice(labels) for _ in range(count)])
+
+
+def malformed(reply: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return "Sure! Here is the list you asked for: " + reply.strip("[]")
+    return reply[: max(1, len(reply) // 2)]
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """
+    A local HTTP server speaking the OpenAI chat/completions and completions protocols, replying to
+    nuggetizer prompts with well-formed nugget and label lists.
+
+    Intended for load-testing a ``Nuggetizer`` end to end, e.g. through ``pyterrier_rag.backend.OpenAIBackend``
+    with ``base_url=server.base_url``, without a GPU or network.
+
+    Parameters:
+        config (MockServerConfig, optional): Latency, throughput and failure behaviour.
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 for any free port.
+
+    Attributes:
+        stats (Counter): Counts of requests, replies, errors, rejections and malformed outputs.
+    """
+    daemon_threads = True
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _MockHandler)
+        self.config = config or MockServerConfig()
+        self.rng = random.Random(self.config.seed)
+        self.rng_lock = threading.Lock()
+        self.bucket = _TokenBucket(self.config.max_requests_per_second) if self.config.max_requests_per_second else None
+        self.stats: Counter = Counter()
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self._thread = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _sample_latency(self) -> float:
+        cfg = self.config
+        with self.rng_lock:
+            if cfg.latency_distribution == "uniform":
+                value = self.rng.uniform(cfg.latency_mean - cfg.latency_spread, cfg.latency_mean + cfg.latency_spread)
+            elif cfg.latency_distribution == "exponential":
+                value = self.rng.expovariate(1.0 / cfg.latency_mean) if cfg.latency_mean > 0 else 0.0
+            elif cfg.latency_distribution == "lognormal":
+                value = cfg.latency_mean * self.rng.lognormvariate(-cfg.latency_spread ** 2 / 2, cfg.latency_spread)
+            else:
+                value = cfg.latency_mean
+        return max(0.0, value)
+
+    def count(self, key: str, n: int = 1) -> int:
+        with self.lock:
+            self.stats[key] += n
+            return self.stats[key]
+
+    def _roll(self, rate: float) -> bool:
+        with self.rng_lock:
+            return self.rng.random() < rate
+
+    def complete(self, prompts: List[str]) -> Tuple[int, List[str]]:
+        """
+        Produce replies for a batch of prompts, applying the configured failures.
+
+        Returns:
+            Tuple[int, List[str]]: The HTTP status and, on success, a reply per prompt.
+        """
+        if self.bucket is not None and not self.bucket.take():
+            self.count("rate_limited")
+            return 429, []
+        with self.lock:
+            if self.config.max_concurrency is not None and self.in_flight >= self.config.max_concurrency:
+                self.stats["rate_limited"] += 1
+                return 429, []
+            self.in_flight += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        try:
+            time.sleep(self._sample_latency())
+            if self._roll(self.config.error_rate):
+                self.count("errors")
+                return 500, []
+            replies = []
+            for prompt in prompts:
+                with self.rng_lock:
+                    reply = respond(prompt, self.rng)
+                if self._roll(self.config.malformed_rate):
+                    with self.rng_lock:
+                        reply = malformed(reply, self.rng)
+                    self.count("malformed")
+                replies.append(reply)
+            self.count("completions", len(replies))
+            return 200, replies
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    server: MockOpenAIServer
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(format % args)
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int) -> None:
+        kind, message = {
+            429: ("rate_limit_exceeded", "Rate limit reached"),
+            500: ("server_error", "The server had an error while processing your request"),
+        }.get(status, ("invalid_request_error", "Invalid request"))
+        self._send(status, {"error": {"message": message, "type": kind, "code": status}},
+                   headers={"Retry-After": "1"} if status == 429 else None)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            model = self.server.config.model
+            return self._send(200, {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "mock"}]})
+        self._error(404)
+
+    def do_POST(self):
+        request_id = self.server.count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._error(400)
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            messages = request.get("messages", [])
+            prompts = ["\n".join(_content(m) for m in messages)]
+            chat = True
+        elif path.endswith("/completions"):
+            prompts = request.get("prompt", "")
+            prompts = [prompts] if isinstance(prompts, str) else list(prompts)
+            chat = False
+        else:
+            return self._error(404)
+
+        status, replies = self.server.complete(prompts)
+        if status != 200:
+            return self._error(status)
+
+        prompt_tokens = sum(len(p) // 4 for p in prompts)
+        completion_tokens = sum(len(r) // 4 for r in replies)
+        if chat:
+            choices = [{"index": 0, "message": {"role": "assistant", "content": replies[0]}, "finish_reason": "stop"}]
+        else:
+            choices = [
+                {"index": i, "text": reply, "logprobs": None, "finish_reason": "stop"}
+                for i, reply in enumerate(replies)
+            ]
+        self._send(200, {
+            "id": f"mock-{request_id}",
+            "object": "chat.completion" if chat else "text_completion",
+            "created": int(time.time()),
+            "model": request.get("model", self.server.config.model),
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def _content(message: Dict[str, Any]) -> str:
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run an OpenAI-compatible stand-in server for load-testing the nuggetizer')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind')
+    parser.add_argument('--latency_distribution', type=str, default='constant', choices=LATENCY_DISTRIBUTIONS)
+    parser.add_argument('--latency_mean', type=float, default=0.0, help='Mean service time in seconds')
+    parser.add_argument('--latency_spread', type=float, default=0.0, help='Spread of the latency distribution')
+    parser.add_argument('--max_concurrency', type=int, default=None, help='Reject requests beyond this many in flight')
+    parser.add_argument('--max_requests_per_second', type=float, default=None, help='Reject requests above this rate')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Probability of a 500 error')
+    parser.add_argument('--malformed_rate', type=float, default=0.0, help='Probability of malformed output')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    args = parser.parse_args()
+
+    config = MockServerConfig(**{k: v for k, v in vars(args).items() if k not in ('host', 'port')})
+    server = MockOpenAIServer(config, host=args.host, port=args.port)
+    print(f"Serving on {server.base_url} with {asdict(config)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(server.stats))
+
+
+if __name__ == '__main__':
+    main()
+
+
+__all__ = ["MockServerConfig", "MockOpenAIServer", "respond"]
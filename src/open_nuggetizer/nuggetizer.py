@@ -1,22 +1,57 @@
-from typing import Optional, Iterable, List, Set, Dict, Any
+from typing import Optional, Iterable, Iterator, List, Set, Dict, Any, Union
+from collections import Counter, defaultdict
+import os
+import copy
+import sys
+import time
 import logging
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 
 import pyterrier as pt
 import pyterrier_alpha as pta
 from pyterrier_rag.prompt import PromptTransformer
+import numpy as np
 import pandas as pd
 
 from pyterrier_nuggetizer.measure._ir_measures import measure_factory
+from pyterrier_nuggetizer.measure._cache import AssignmentCache
 from pyterrier_nuggetizer._types import NuggetAssignMode
 from pyterrier_nuggetizer.prompts import (
-    CREATOR_PROMPT_STRING,
-    SCORER_PROMPT_STRING,
-    ASSIGNER_GRADE_2_PROMPT_STRING,
-    ASSIGNER_GRADE_3_PROMPT_STRING,
-    make_callable_template,
+    CREATOR_PROMPT_SOURCE,
+    CREATOR_IMPORTANCE_PROMPT_SOURCE,
+    SCORER_PROMPT_SOURCE,
+    ASSIGNER_GRADE_2_PROMPT_SOURCE,
+    ASSIGNER_GRADE_3_PROMPT_SOURCE,
+    compile_template,
+    format_context,
 )
 from pyterrier_nuggetizer.measure._measures import _AllScore, _VitalScore, _WeightedScore
 from pyterrier_nuggetizer.util import iter_windows, extract_list
+from pyterrier_nuggetizer.dedup import dedup_documents, cluster_nuggets, normalise_text
+from pyterrier_nuggetizer.chunked import ChunkWriter, iter_run_chunks, qid_chunks
+from pyterrier_nuggetizer.docstore import DocumentStore, LazyDocuments, as_document_store
+from pyterrier_nuggetizer.index import NuggetQrelsIndex
+from pyterrier_nuggetizer.batch import NuggetBatch
+from pyterrier_nuggetizer.plan import PLACEHOLDER_NUGGET, StagePlan, count_tokens
+from pyterrier_nuggetizer.scheduler import Scheduler, estimate_tokens
+from pyterrier_nuggetizer.retry import RetryPolicy, HedgePolicy, ResilientCaller
+from pyterrier_nuggetizer.profiling import BACKEND_SECTION, Profiler
+from pyterrier_nuggetizer.tracing import NOOP_SPAN, Tracer, current_span, prompt_hash, record
+from pyterrier_nuggetizer.sampling import (
+    ApproxEvaluation,
+    allocation,
+    estimate_metrics,
+    sample_order,
+    stratified_sample,
+    stratum_sizes,
+)
+
+def _copy_template(conversation_template: Optional[Any]) -> Optional[Any]:
+    # PromptTransformer sets its system message on the template, so every prompt gets its own copy
+    return conversation_template.copy() if conversation_template is not None else None
+
 
 class Nuggetizer(pt.Transformer):
     """
@@ -32,12 +67,39 @@ class Nuggetizer(pt.Transformer):
         scorer_window_size (int, optional): Size of the nugget scoring window.
         assigner_window_size (int, optional): Size of the nugget assignment window.
         max_nuggets (int, optional): Maximum number of nuggets to generate.
+        creator_importance (bool, optional): Whether the final creator window also labels nugget importance,
+            skipping the scorer for queries where every nugget received a label.
+        speculative_creator (bool, optional): Whether to send each creator window together with the next one,
+            guessing that the first leaves the nugget list unchanged, and keep the second when the guess holds.
+        dedup_documents (bool, optional): Whether to drop duplicate documents before creator windows are formed.
+        near_duplicate_threshold (float, optional): MinHash similarity above which documents are also dropped
+            as near-duplicates. Setting it implies dedup_documents.
+        nugget_dedup_threshold (float, optional): Lexical similarity above which created nuggets are merged
+            before scoring and assignment. If None, nuggets are not deduplicated.
         query_field (str, optional): Name of the query field in input DataFrame.
         document_field (str, optional): Name of the document field in input DataFrame.
         answer_field (str, optional): Name of the answer field in input DataFrame.
         nugget_field (str, optional): Name of the nugget field in output DataFrame.
         importance_field (str, optional): Name of the score field in output DataFrame.
         assignment_field (str, optional): Name of the assignment field in output DataFrame.
+        scheduler (Scheduler, optional): Rate limiter and concurrency controller wrapped around backend calls,
+            which may be shared with other Nuggetizer instances using the same endpoint.
+        retry_policy (RetryPolicy, optional): Retries with jittered backoff for transient backend errors.
+        hedge_policy (HedgePolicy, optional): Hedged duplicate requests for calls slower than a latency percentile.
+        approx_fraction (float, optional): If set, the measure provider only judges this fraction of each topic's
+            nuggets, sampled proportionally per importance label and weighted by their inverse inclusion
+            probability, giving approximate scores at a fraction of the cost. Confidence intervals of the last
+            evaluated run are kept in the evaluator's ``approximation``.
+        approx_seed (int, optional): Seed for the approximate evaluation samples.
+        profiler (Profiler, optional): Profiler attributing time to each stage, see also ``profile``.
+        tracer (Tracer, optional): Tracer recording a span per backend call, see also ``trace``.
+        rejudge_assign_modes (bool, optional): Whether evaluation and ``assign_modes`` judge each assignment mode
+            with its own prompt. By default ``assign_modes`` judges answers once in the finest requested mode and
+            derives coarser modes from those labels, and evaluation reuses a cached finer judgement of the same
+            run where there is one. Evaluation otherwise always judges in ``assigner_mode``.
+        document_store (DocumentStore, optional): Store to fetch document text from by docno, allowing creator input
+            without a text column. Text is fetched per window and not kept. Also accepts a mapping or frame of
+            texts by docno, a Terrier index, or the path of a ``BlobDocumentStore``.
         verbose (bool, optional): Whether to enable verbose logging.
     """
 
@@ -53,12 +115,26 @@ class Nuggetizer(pt.Transformer):
         scorer_window_size: Optional[int] = 10,
         assigner_window_size: Optional[int] = 10,
         max_nuggets: Optional[int] = 30,
+        creator_importance: Optional[bool] = False,
+        speculative_creator: Optional[bool] = False,
+        dedup_documents: Optional[bool] = False,
+        near_duplicate_threshold: Optional[float] = None,
+        nugget_dedup_threshold: Optional[float] = None,
         query_field: Optional[str] = "query",
         document_field: Optional[str] = "text",
         answer_field: Optional[str] = "qanswer",
         nugget_field: Optional[str] = "nugget",
         importance_field: Optional[str] = "importance",
         assignment_field: Optional[str] = "assignment",
+        scheduler: Optional[Scheduler] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        approx_fraction: Optional[float] = None,
+        approx_seed: Optional[int] = None,
+        profiler: Optional[Profiler] = None,
+        tracer: Optional[Tracer] = None,
+        rejudge_assign_modes: Optional[bool] = False,
+        document_store: Optional[Union[DocumentStore, Any]] = None,
         verbose: Optional[bool] = False,
     ):
         from pyterrier_rag.prompt import PromptTransformer
@@ -76,6 +152,11 @@ class Nuggetizer(pt.Transformer):
         assert assigner_window_size is None or isinstance(
             assigner_window_size, int
         ), "assigner_window_size must be an integer"
+        assert near_duplicate_threshold is None or 0.0 < near_duplicate_threshold <= 1.0, \
+            "near_duplicate_threshold must be in (0, 1]"
+        assert nugget_dedup_threshold is None or 0.0 < nugget_dedup_threshold <= 1.0, \
+            "nugget_dedup_threshold must be in (0, 1]"
+        assert approx_fraction is None or 0.0 < approx_fraction <= 1.0, "approx_fraction must be in (0, 1]"
 
         self.backend = backend
         self.assigner_mode = assigner_mode
@@ -85,15 +166,30 @@ class Nuggetizer(pt.Transformer):
         self.scorer_window_size = scorer_window_size
         self.assigner_window_size = assigner_window_size
         self.max_nuggets = max_nuggets
+        self.creator_importance = creator_importance
+        self.speculative_creator = speculative_creator
+        self.dedup_documents = dedup_documents or near_duplicate_threshold is not None
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.nugget_dedup_threshold = nugget_dedup_threshold
         self.query_field = query_field
         self.document_field = document_field
         self.answer_field = answer_field
         self.nugget_field = nugget_field
         self.importance_field = importance_field
         self.assignment_field = assignment_field
+        self.scheduler = scheduler
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.approx_fraction = approx_fraction
+        self.approx_seed = approx_seed
+        self.profiler = profiler
+        self.tracer = tracer
+        self.rejudge_assign_modes = rejudge_assign_modes
+        self.document_store = as_document_store(document_store) if document_store is not None else None
         self.verbose = verbose
 
         self.provider = None
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
 
         self.__post_init__()
 
@@ -103,48 +199,371 @@ class Nuggetizer(pt.Transformer):
             self.scorer_window_size = self.window_size
             self.assigner_window_size = self.window_size
 
+        self.assignment_cache = AssignmentCache(stats=self.stats["evaluator"])
+
+        self._stages: Dict[Any, pt.Transformer] = {}
+        self._stages_lock = threading.Lock()
+
+        self.caller = None
+        if self.retry_policy is not None or self.hedge_policy is not None:
+            self.caller = ResilientCaller(self.retry_policy, self.hedge_policy, self.stats)
+
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO if self.verbose else logging.WARNING)
 
-    def make_provider(self):
-        if self.provider:
-            return
-        from pyterrier_nuggetizer.measure._provider import NuggetEvalProvider
-        self.provider = NuggetEvalProvider(self)
+    def close(self) -> None:
+        """
+        Release the threads held for hedged backend calls. The Nuggetizer can still be used afterwards,
+        but calls are no longer hedged.
+        """
+        if self.caller is not None:
+            self.caller.close()
 
-        from ir_measures import DefaultPipeline
-        DefaultPipeline.providers.append(self.provider)
+    def make_provider(self):
+        from pyterrier_nuggetizer.measure._provider import NuggetEvalProvider, register_default_provider
+        if self.provider is None:
+            self.provider = NuggetEvalProvider(self)
+        register_default_provider(self)
 
     def __repr__(self):
         return f"Nuggetizer(backend={self.backend}, assigner_mode={self.assigner_mode}, window_size={self.window_size}, max_nuggets={self.max_nuggets})"
 
-    def generate(self, inp: Iterable[str]):
-        return self.backend.generate(inp)
+    def generate(self, inp: Iterable[str], stage: Optional[str] = None):
+        span = current_span() if self.tracer is not None else None
+        if span is not None:
+            span.set("nuggetizer.prompt_hash", [prompt_hash(prompt) for prompt in inp])
+            span.set("nuggetizer.prompt_tokens", estimate_tokens(inp))
+        with self._section(BACKEND_SECTION):
+            if self.caller is not None:
+                outputs = self.caller.call(self._generate, inp, stage=stage)
+            else:
+                outputs = self._generate(inp, stage=stage)
+        if span is not None:
+            span.set("nuggetizer.output_tokens", estimate_tokens([str(getattr(o, "text", o)) for o in outputs]))
+        return outputs
+
+    def _section(self, name: str):
+        if self.profiler is None and self.tracer is None:
+            return contextlib.nullcontext()
+        stack = contextlib.ExitStack()
+        if self.profiler is not None:
+            stack.enter_context(self.profiler.section(name, sys._getframe(1)))
+        if self.tracer is not None and name != BACKEND_SECTION:
+            stack.enter_context(self.tracer.span(f"nuggetizer.{name}"))
+        return stack
+
+    def _span(self, name: str, **attributes):
+        """
+        A tracing span ``nuggetizer.<name>`` with ``nuggetizer.``-prefixed attributes, or a no-op span.
+        """
+        if self.tracer is None:
+            return contextlib.nullcontext(NOOP_SPAN)
+        return self.tracer.span(f"nuggetizer.{name}", **{f"nuggetizer.{k}": v for k, v in attributes.items()})
+
+    @contextlib.contextmanager
+    def trace(self, path: Optional[str] = None) -> Iterator[Tracer]:
+        """
+        Trace every backend call made within the block as a span, nested under per-query, per-stage and per-run
+        spans.
+
+        Parameters:
+            path (str, optional): JSONL file to append OpenTelemetry (OTLP/JSON) spans to. If None, spans are
+                kept in memory, in ``Tracer.spans``.
+
+        Yields:
+            Tracer: The tracer.
+        """
+        previous = self.tracer
+        tracer = Tracer(path)
+        self.tracer = tracer
+        try:
+            yield tracer
+        finally:
+            self.tracer = previous
+            tracer.close()
+
+    @contextlib.contextmanager
+    def profile(
+        self,
+        output_dir: Optional[str] = None,
+        mode: str = "sampling",
+        interval: float = 0.005,
+        top: int = 20,
+    ) -> Iterator[Profiler]:
+        """
+        Profile the stages run within the block.
+
+        Parameters:
+            output_dir (str, optional): Directory receiving per-stage collapsed stacks (or ``.prof`` files) and a
+                summary of stage times and hot functions when the block exits.
+            mode (str): sampling (low overhead, flame graphs) or deterministic (``cProfile``).
+            interval (float): Seconds between samples, in sampling mode.
+            top (int): Number of hot functions listed per stage in the summary.
+
+        Yields:
+            Profiler: The profiler, for ``stage_times()`` and ``hot_functions()``.
+        """
+        previous = self.profiler
+        profiler = Profiler(mode, interval).start()
+        self.profiler = profiler
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            self.profiler = previous
+            if output_dir is not None:
+                written = profiler.write(output_dir, top)
+                self.logger.info(f"Wrote profiles to {', '.join(map(str, written))}")
+
+    def _generate(self, inp: Iterable[str], stage: Optional[str] = None):
+        if self.scheduler is not None:
+            return self.scheduler.submit(self._call_backend, inp, stage=stage)
+        return self._call_backend(inp)
+
+    def _call_backend(self, inp: Iterable[str]):
+        if self.tracer is None:
+            return self.backend.generate(inp)
+        started = time.perf_counter()
+        try:
+            return self.backend.generate(inp)
+        finally:
+            record("nuggetizer.service_seconds", time.perf_counter() - started)
+
+    def _with_backend(self, backend) -> "Nuggetizer":
+        """
+        A shallow copy of this Nuggetizer calling ``backend``, sharing its settings, stats and caches but with
+        stages of its own, so the copy can route calls elsewhere without affecting concurrent users of this one.
+        """
+        nuggetizer = copy.copy(self)
+        nuggetizer.backend = backend
+        nuggetizer._stages = {}
+        nuggetizer._stages_lock = threading.Lock()
+        return nuggetizer
+
+    def _stage_config(self) -> tuple:
+        return (
+            self.assigner_mode, self.creator_window_size, self.scorer_window_size, self.assigner_window_size,
+            self.max_nuggets, self.creator_importance, self.speculative_creator, self.nugget_dedup_threshold,
+            id(self.conversation_template), id(self.document_store), self.query_field, self.document_field, self.answer_field,
+            self.nugget_field, self.importance_field, self.assignment_field, self.verbose,
+        )
+
+    def _stage(self, cls, **overrides):
+        """
+        The stage of type ``cls`` (with constructor ``overrides``, e.g. an assigner ``mode``), built once and
+        reused until a setting it depends on changes.
+        Stages keep no per-call state, so one instance can be shared across threads.
+        """
+        config = self._stage_config()
+        key = (cls, tuple(sorted(overrides.items())), config)
+        stage = self._stages.get(key)
+        if stage is None:
+            with self._stages_lock:
+                stage = self._stages.get(key)
+                if stage is None:
+                    self._stages = {k: v for k, v in self._stages.items() if k[0] is not cls or k[2] == config}
+                    stage = self._stages[key] = cls(self, **overrides)
+        return stage
+
+    @property
+    def creator(self) -> "NuggetCreator":
+        return self._stage(NuggetCreator)
+
+    @property
+    def deduplicator(self) -> "NuggetDeduplicator":
+        return self._stage(NuggetDeduplicator)
+
+    @property
+    def scorer(self) -> "NuggetScorer":
+        return self._stage(NuggetScorer)
+
+    @property
+    def assigner(self) -> "NuggetAssigner":
+        return self._stage(NuggetAssigner)
 
     def create(self, inp: pd.DataFrame) -> pd.DataFrame:
-        return NuggetCreator(self)(inp)
+        with self._section("creator"):
+            return self.creator(inp)
+
+    def deduplicate(self, inp: pd.DataFrame) -> pd.DataFrame:
+        with self._section("deduplicator"):
+            return self.deduplicator(inp)
 
     def score(self, inp: pd.DataFrame) -> pd.DataFrame:
-        return NuggetScorer(self)(inp)
+        with self._section("scorer"):
+            return self.scorer(inp)
 
     def assign(self, inp: pd.DataFrame) -> pd.DataFrame:
-        return NuggetAssigner(self)(inp)
+        with self._section("assigner"):
+            return self.assigner(inp)
+
+    def assign_approx(
+        self,
+        inp: pd.DataFrame,
+        fraction: float = 0.1,
+        min_per_stratum: int = 1,
+        target_half_width: Optional[float] = None,
+        metric: str = "vital_score",
+        step: Optional[float] = None,
+        alpha: float = 0.05,
+        seed: Optional[int] = None,
+    ) -> ApproxEvaluation:
+        """
+        Estimate nugget metrics by assigning only a stratified sample of the nuggets of each query.
+
+        Nuggets are sampled per query and importance label. If ``target_half_width`` is given, further
+        nuggets are sampled ``step`` at a time until the confidence interval on ``metric`` is at most that
+        half-width, or every nugget has been assigned.
+
+        Parameters:
+            inp (pd.DataFrame): The input that would be passed to ``assign``.
+            fraction (float): Fraction of the nuggets of each stratum to assign initially.
+            min_per_stratum (int): Minimum nuggets assigned from every non-empty stratum.
+            target_half_width (float, optional): Desired confidence interval half-width on ``metric``.
+            metric (str): The metric whose interval is checked against ``target_half_width``.
+            step (float, optional): Fraction added per round when sampling more, defaults to ``fraction``.
+            alpha (float): Significance level, giving (1 - alpha) intervals.
+            seed (int, optional): Seed for reproducible samples.
+
+        Returns:
+            ApproxEvaluation: The assigned sample, per-query and overall estimates with confidence intervals.
+        """
+        assert len(inp) > 0, "inp must not be empty"
+        assert target_half_width is None or target_half_width > 0, "target_half_width must be greater than 0"
+        inp = inp.reset_index(drop=True)
+        step = step or fraction
+        rank = sample_order(inp, importance_field=self.importance_field, seed=seed)
+        sizes = stratum_sizes(inp, importance_field=self.importance_field)
+
+        assigned = []
+        taken = 0
+        while True:
+            size = allocation(sizes, min(fraction, 1.0), min_per_stratum)
+            batch = inp[(rank >= taken) & (rank < size)]
+            if len(batch):
+                assigned.append(self.assign(batch))
+            judged = pd.concat(assigned, ignore_index=True)
+            per_query, estimates = estimate_metrics(
+                judged, inp, importance_field=self.importance_field,
+                assignment_field=self.assignment_field, alpha=alpha,
+            )
+            result = ApproxEvaluation(judged, per_query, estimates, len(judged), len(inp))
+            self.logger.info(
+                f"Assigned {result.judged} of {result.total} nuggets, {metric} half-width {result.half_width(metric):.4f}"
+            )
+            if target_half_width is None or result.half_width(metric) <= target_half_width \
+                    or result.judged >= result.total:
+                return result
+            taken = size
+            fraction += step
 
     def transform(self, inp: pd.DataFrame) -> pd.DataFrame:
+        with self._span("run", rows=len(inp)):
+            return self._transform(inp)
+
+    def _transform(self, inp: pd.DataFrame) -> pd.DataFrame:
         columns = inp.columns
-        if any([x not in columns for x in [self.query_field, self.document_field]]):
+        documents = self.document_field in columns or (self.document_store is not None and "docno" in columns)
+        if self.query_field not in columns or not documents:
             raise ValueError(
                 f"DataFrame appears to be malformatted, minimum expected columns [{self.query_field}, {self.document_field}], got {columns}"
             )
 
         if self.nugget_field not in columns:
             inp = self.create(inp)
-            return self.score(inp)
+            if self.nugget_dedup_threshold is not None:
+                inp = self.deduplicate(inp)
+            if self.creator_importance:
+                out = self._score_unlabelled(inp)
+            else:
+                out = self.score(inp)
+            members = f"{self.nugget_field}_members"
+            if members in inp.columns:
+                # scorer output lacks the members of the nuggets it scored, even when creator-labelled rows keep them
+                id_field = f"{self.nugget_field}_id"
+                lookup = dict(zip(zip(inp["qid"], inp[id_field]), inp[members]))
+                out[members] = [lookup.get(key) for key in zip(out["qid"], out[id_field])]
+            return out
         if self.answer_field in columns:
             return self.assign(inp)
         else:
             return self.score(inp)
 
+    def plan(self, inp: pd.DataFrame, encoding: str = "cl100k_base") -> pd.DataFrame:
+        """
+        Estimate the cost of transforming ``inp`` without calling the backend.
+
+        Prompts are rendered over the same windows the stages would use. Where nuggets do not exist yet,
+        each creator window after the first and the scorer assume ``max_nuggets`` placeholder nuggets,
+        so creation estimates are an upper bound.
+
+        Parameters:
+            inp (pd.DataFrame): The input that would be passed to ``transform``.
+            encoding (str): The tiktoken encoding used to count prompt tokens.
+
+        Returns:
+            pd.DataFrame: Per stage and in total, the number of queries, ``generate`` calls, the serial depth
+            (longest chain of calls sent one after another, for one query or, when assigning, one answer) and
+            the estimated prompt tokens.
+        """
+        columns = inp.columns
+        plans = []
+        if self.nugget_field not in columns:
+            creator = self.creator
+            plan = StagePlan("creator")
+            nuggets = []
+            for qid, group in inp.groupby("qid", sort=False):
+                group = group.to_dict(orient="records")
+                calls, depth, tokens = creator.plan_by_query(group, encoding)
+                plan.add(calls, depth, tokens)
+                nuggets.extend({
+                    "qid": qid,
+                    self.query_field: group[0][self.query_field],
+                    f"{self.nugget_field}_id": f"{qid}_{i+1}",
+                    self.nugget_field: PLACEHOLDER_NUGGET,
+                } for i in range(self.max_nuggets if calls else 0))
+            plans.append(plan)
+            if not self.creator_importance:
+                plans.append(self._plan_stage(self.scorer, "scorer", pd.DataFrame(nuggets), encoding))
+        elif self.answer_field in columns:
+            plans.append(self._plan_stage(self.assigner, "assigner", inp, encoding))
+        else:
+            plans.append(self._plan_stage(self.scorer, "scorer", inp, encoding))
+
+        total = StagePlan(
+            "total",
+            queries=max((plan.queries for plan in plans), default=0),
+            calls=sum(plan.calls for plan in plans),
+            serial_depth=sum(plan.serial_depth for plan in plans),
+            prompt_tokens=sum(plan.prompt_tokens for plan in plans),
+        )
+        return pd.DataFrame([vars(plan) for plan in plans + [total]])
+
+    def _plan_stage(self, stage, name: str, inp: pd.DataFrame, encoding: str) -> StagePlan:
+        plan = StagePlan(name)
+        if len(inp) == 0:
+            return plan
+        for _, group in inp.groupby("qid", sort=False):
+            plan.add(*stage.plan_by_query(group.to_dict(orient="records"), encoding))
+        return plan
+
+    def _score_unlabelled(self, inp: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score only the queries for which the creator did not label every nugget.
+        """
+        if self.importance_field not in inp.columns:
+            return self.score(inp)
+        missing = inp.loc[inp[self.importance_field].isna(), "qid"].unique()
+        if len(missing) == 0:
+            return inp
+        self.logger.info(f"Scoring {len(missing)} queries without creator importance labels")
+        unlabelled = inp["qid"].isin(missing)
+        scored = self.score(inp[unlabelled].drop(columns=[self.importance_field]))
+        order = {qid: i for i, qid in enumerate(inp["qid"].unique())}
+        out = pd.concat([inp[~unlabelled], scored], ignore_index=True)
+        out = out.sort_values("qid", key=lambda x: x.map(order), kind="stable")
+        return out.reset_index(drop=True)
+
     def __getattr__(self, attr: str):
         measure = measure_factory(attr, self)
         if measure is not None:
@@ -152,34 +571,211 @@ class Nuggetizer(pt.Transformer):
         return self.__getattribute__(attr)
 
     def _iter_assign_to_run(self, run: pd.DataFrame, qrels: Iterable) -> Iterable:
-        qrels_df = []
-        for qid, nuggets in qrels.items():
-            for nugget_id, (nugget, importance) in nuggets.items():
-                qrels_df.append(
-                    {
-                        "qid": qid,
-                        "nugget_id": nugget_id,
-                        "nugget": nugget,
-                        "importance": importance,
-                    }
+        return self._to_frame(self._assign_run_batch(run, qrels))
+
+    def _assign_run_batch(
+        self, run: pd.DataFrame, qrels: Iterable, mode: Optional[NuggetAssignMode] = None
+    ) -> NuggetBatch:
+        with self._section("conversion"):
+            index = qrels if isinstance(qrels, NuggetQrelsIndex) else NuggetQrelsIndex(qrels)
+            if self.approx_fraction is not None:
+                sample = stratified_sample(index.to_frame(), self.approx_fraction, seed=self.approx_seed)
+                index = NuggetQrelsIndex(sample)
+            batch = NuggetBatch.from_run(run, index, self.query_field, self.answer_field)
+        return self.assign_batch(batch, mode)
+
+    def assign_batch(self, batch: NuggetBatch, mode: Optional[NuggetAssignMode] = None) -> NuggetBatch:
+        """
+        Assign the nuggets of every group (answer) of a columnar batch.
+
+        Parameters:
+            batch (NuggetBatch): Nuggets grouped per answer, e.g. from ``NuggetBatch.from_run``.
+            mode (NuggetAssignMode, optional): Mode to judge in, defaults to ``assigner_mode``.
+
+        Returns:
+            NuggetBatch: The same batch with its assignment labels filled in.
+        """
+        assert batch.answers is not None, "batch must hold answers to assign nuggets to"
+        assigner = self.assigner if mode is None or mode == self.assigner_mode else self._stage(NuggetAssigner, mode=mode)
+        assignment = batch.assignment.copy()
+        with self._section("assigner"):
+            for group in batch:
+                span = batch.span(group)
+                assignment[span] = assigner.assign_labels(
+                    batch.qid(group), batch.queries[group], batch.answers[group], batch.nuggets[span]
                 )
-        qrels_df = pd.DataFrame(qrels_df)
-        run = run.merge(qrels_df, on=["qid", "qid"], how="left")
-        return self.assign(run)
-              
-    def assign_to_run(self, run: pd.DataFrame, qrels: pd.DataFrame) -> pd.DataFrame:
+        return batch.with_assignment(assignment)
+
+    def _to_frame(self, batch: NuggetBatch) -> pd.DataFrame:
+        with self._section("conversion"):
+            return batch.to_frame(
+                self.query_field, self.answer_field, self.nugget_field, self.importance_field, self.assignment_field,
+            )
+
+    def iter_assign_to_run(
+        self, run: pd.DataFrame, qrels: Union[pd.DataFrame, NuggetQrelsIndex]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily assign the nuggets of each answer's topic to that answer.
+
+        Only the nuggets of one (qid, answer) pair are materialised at a time, rather than every answer
+        crossed with every nugget of its topic.
+
+        Parameters:
+            run (pd.DataFrame): The run DataFrame, with qid, query and answer columns.
+            qrels (pd.DataFrame | NuggetQrelsIndex): The qrels, or an index built from them.
+
+        Yields:
+            List[Dict[str, Any]]: The assigned nuggets of one answer, with the answer's other run columns.
+        """
+        with self._section("conversion"):
+            index = qrels if isinstance(qrels, NuggetQrelsIndex) else NuggetQrelsIndex(qrels)
+            batch = NuggetBatch.from_run(run, index, self.query_field, self.answer_field)
+        for group in batch:
+            yield self._to_frame(self.assign_batch(batch.take([group]))).to_dict(orient="records")
+
+    def assign_to_run(self, run: pd.DataFrame, qrels: Union[pd.DataFrame, NuggetQrelsIndex]) -> pd.DataFrame:
         """
         Assign nuggets to a run based on the provided qrels.
 
         Parameters:
             run (pd.DataFrame): The run DataFrame.
-            qrels (pd.DataFrame): The qrels DataFrame.
+            qrels (pd.DataFrame | NuggetQrelsIndex): The qrels DataFrame, or an index built from it.
 
         Returns:
-            pd.DataFrame: The updated run DataFrame with nugget assignments.
+            pd.DataFrame: One row per answer and nugget of its topic, with nugget assignments.
         """
-        run = run.merge(qrels, on=["qid", "qid"], how="left")
-        return self.assign(run)
+        with self._span("run", rows=len(run)):
+            with self._section("conversion"):
+                index = qrels if isinstance(qrels, NuggetQrelsIndex) else NuggetQrelsIndex(qrels)
+                batch = NuggetBatch.from_run(run, index, self.query_field, self.answer_field)
+            return self._to_frame(self.assign_batch(batch))
+
+    def assign_modes(
+        self,
+        run: pd.DataFrame,
+        qrels: Union[pd.DataFrame, NuggetQrelsIndex],
+        modes: Optional[Iterable[NuggetAssignMode]] = None,
+        rejudge: Optional[bool] = None,
+    ) -> pd.DataFrame:
+        """
+        Assign nuggets to a run in several assignment modes at once. Answers are judged once, in the finest of
+        ``modes``, and coarser modes are derived from those labels (partial_support becomes not_support), so
+        reporting both grade-2 and grade-3 variants costs no extra backend calls.
+
+        Parameters:
+            run (pd.DataFrame): The run DataFrame.
+            qrels (pd.DataFrame | NuggetQrelsIndex): The qrels DataFrame, or an index built from it.
+            modes (Iterable[NuggetAssignMode], optional): The modes to report, all if None.
+            rejudge (bool, optional): Judge each coarser mode again with its own prompt, for exact protocol
+                fidelity, defaults to ``rejudge_assign_modes``.
+
+        Returns:
+            pd.DataFrame: As ``assign_to_run``, with the labels of the finest mode in the assignment column and
+            those of each mode in an ``<assignment>_<mode>`` column, e.g. ``assignment_support_grade_2``.
+        """
+        modes = list(modes) if modes is not None else list(NuggetAssignMode)
+        assert modes, "modes must not be empty"
+        rejudge = self.rejudge_assign_modes if rejudge is None else rejudge
+        finest = NuggetAssignMode.finest(modes)
+        with self._span("run", rows=len(run)):
+            with self._section("conversion"):
+                index = qrels if isinstance(qrels, NuggetQrelsIndex) else NuggetQrelsIndex(qrels)
+                batch = NuggetBatch.from_run(run, index, self.query_field, self.answer_field)
+            judged = self.assign_batch(batch, finest)
+            out = self._to_frame(judged)
+            for mode in modes:
+                if mode == finest:
+                    assignment = judged.assignment
+                elif rejudge:
+                    assignment = self.assign_batch(batch, mode).assignment
+                else:
+                    assignment = mode.derive(judged.assignment, finest)
+                    self.stats["assigner"]["derived"] += len(assignment)
+                out[f"{self.assignment_field}_{mode.value}"] = assignment.astype(np.int64)
+        return out
+
+    def transform_chunked(
+        self,
+        source: Union[str, Iterable[pd.DataFrame]],
+        output: Union[str, ChunkWriter],
+        qrels: Optional[Union[str, pd.DataFrame, NuggetQrelsIndex]] = None,
+        topics: Optional[pd.DataFrame] = None,
+        chunk_size: Optional[int] = 10_000,
+        format: Optional[str] = None,
+        max_parallel_queries: int = 8,
+        max_batch_size: int = 32,
+        max_wait: float = 0.02,
+    ) -> Dict[str, int]:
+        """
+        Transform a run larger than memory, one chunk of whole queries at a time, appending each chunk's
+        results to ``output`` as soon as it is done.
+
+        Without ``qrels`` each chunk goes through ``transform`` (creating, scoring or assigning depending on its
+        columns); with ``qrels`` its answers are assigned the nuggets of their topic, as in ``assign_to_run``.
+        With ``max_parallel_queries`` above 1, the queries of a chunk run concurrently and the backend is wrapped
+        in a ``MicroBatcher``, so windows of different queries share backend calls.
+
+        Parameters:
+            source (str | Iterable[pd.DataFrame]): A TREC run, JSONL or Parquet file contiguous by qid (see
+                ``chunked.iter_run_chunks``), or frames of whole queries.
+            output (str | ChunkWriter): Output file (tsv, jsonl or parquet, by extension) or writer. Assignments
+                of runs with a run_id column, or with several answers per query, need jsonl or parquet.
+            qrels (str | pd.DataFrame | NuggetQrelsIndex, optional): Nugget qrels, or the directory of a saved
+                ``NuggetQrelsIndex``, which is memory-mapped.
+            topics (pd.DataFrame, optional): qid and query columns, joined to chunks that lack queries (e.g. TREC runs).
+            chunk_size (int, optional): Minimum rows per chunk, which bounds memory; None for one query per chunk.
+            format (str, optional): Format of ``source``, inferred from its extension if None.
+            max_parallel_queries (int): Queries of a chunk processed at once.
+            max_batch_size (int): Most prompts per merged backend call, with parallel queries.
+            max_wait (float): Seconds to wait for a merged backend call to fill, with parallel queries.
+
+        Returns:
+            Dict[str, int]: The number of chunks, queries and rows written.
+        """
+        from pyterrier_nuggetizer.service import MicroBatcher
+        assert max_parallel_queries > 0, "max_parallel_queries must be greater than 0"
+        chunks = iter_run_chunks(source, chunk_size, format) if isinstance(source, (str, os.PathLike)) \
+            else qid_chunks(source, chunk_size)
+        if isinstance(qrels, (str, os.PathLike)):
+            qrels = NuggetQrelsIndex.load(qrels)
+        elif qrels is not None and not isinstance(qrels, NuggetQrelsIndex):
+            qrels = NuggetQrelsIndex(qrels)
+        writer = output if isinstance(output, ChunkWriter) else ChunkWriter(output)
+        # calls are batched through a copy, so other users of this instance keep calling the backend directly
+        nuggetizer = self
+        pool = None
+        if max_parallel_queries > 1:
+            if not isinstance(self.backend, MicroBatcher):
+                nuggetizer = self._with_backend(
+                    MicroBatcher(self.backend, max_batch_size=max_batch_size, max_wait=max_wait)
+                )
+            pool = ThreadPoolExecutor(max_parallel_queries, thread_name_prefix="nugget-chunk")
+
+        def run(frame: pd.DataFrame) -> pd.DataFrame:
+            return nuggetizer.transform(frame) if qrels is None else nuggetizer.assign_to_run(frame, qrels)
+
+        queries = 0
+        try:
+            for chunk in chunks:
+                if topics is not None and self.query_field not in chunk.columns:
+                    chunk = chunk.merge(topics[["qid", self.query_field]].astype({"qid": str}), on="qid", how="left")
+                groups = [group for _, group in chunk.groupby("qid", sort=False)]
+                queries += len(groups)
+                if pool is None or len(groups) == 1:
+                    results = run(chunk)
+                else:
+                    results = pd.concat(list(pool.map(run, groups)), ignore_index=True)
+                writer.write(results)
+                self.logger.info(f"Wrote chunk {writer.chunks} ({queries} queries, {writer.rows} rows)")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if nuggetizer is not self:
+                nuggetizer.backend.close()
+            if writer is not output:
+                writer.close()
+        return {"chunks": writer.chunks, "queries": queries, "rows": writer.rows}
 
 
 class NuggetCreator(pt.Transformer):
@@ -218,14 +814,14 @@ class NuggetCreator(pt.Transformer):
         self.window_size = (
             window_size if window_size else nuggetizer.creator_window_size
         )
-        if self.nuggetizer.conversation_template is not None:
-            self.conversation_template = self.nuggetizer.conversation_template
-        else:
-            self.conversation_template = None
+        self.conversation_template = nuggetizer.conversation_template
         self.query_field = nuggetizer.query_field
         self.document_field = nuggetizer.document_field
         self.nugget_field = nuggetizer.nugget_field
         self.max_nuggets = nuggetizer.max_nuggets
+        self.importance_field = nuggetizer.importance_field
+        self.with_importance = nuggetizer.creator_importance
+        self.speculative = nuggetizer.speculative_creator
         self.verbose = verbose if verbose is not None else nuggetizer.verbose
 
 
@@ -233,9 +829,9 @@ class NuggetCreator(pt.Transformer):
 
     def __post_init__(self):
         self.prompt = PromptTransformer(
-            instruction=make_callable_template(CREATOR_PROMPT_STRING),
+            instruction=compile_template(CREATOR_PROMPT_SOURCE),
             system_message=self.system_message,
-            conversation_template=self.conversation_template,
+            conversation_template=_copy_template(self.conversation_template),
             #model_name_or_path=self.nuggetizer.backend.model_name_or_path,
             answer_extraction=extract_list,
             output_field=self.nugget_field,
@@ -246,6 +842,19 @@ class NuggetCreator(pt.Transformer):
                 "max_nuggets",
             ],
         )
+        self.importance_prompt = PromptTransformer(
+            instruction=compile_template(CREATOR_IMPORTANCE_PROMPT_SOURCE),
+            system_message=self.system_message,
+            conversation_template=_copy_template(self.conversation_template),
+            answer_extraction=extract_list,
+            output_field=self.nugget_field,
+            input_fields=[
+                "query",
+                "context",
+                "nuggets",
+                "max_nuggets",
+            ],
+        )
 
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO if self.verbose else logging.WARNING)
@@ -258,32 +867,27 @@ class NuggetCreator(pt.Transformer):
         inp = list(inp)
         qid = inp[0].get("qid", None)
         query = inp[0][self.query_field]
-        documents = [i[self.document_field] for i in inp]
-
-        nuggets: List[str] = []
-
-        for start, end, _ in iter_windows(
-            len(documents), self.window_size, self.window_size, verbose=self.verbose
-        ):
-            current_documents = documents[start:end]
-            context_string = "\n".join(
-                [f"[{i+1}] {doc}" for i, doc in enumerate(current_documents)]
-            )
-            context = {
-                "query": query,
-                "context": context_string,
-                "nuggets": nuggets,
-                "max_nuggets": self.max_nuggets,
-            }
-            prompt = [self.prompt.create_prompt(context)]
-            output = self.nuggetizer.generate(prompt)[0].text
-            nuggets = self.prompt.answer_extraction(output)[:self.max_nuggets]
+        documents = self._documents(inp)
+        with self.nuggetizer._span("query", stage="creator", qid=qid, documents=len(documents)):
+            if self.nuggetizer.dedup_documents:
+                documents = self._dedup(qid, documents)
+            nuggets, importance = self._create(qid, query, documents)
 
         if len(nuggets) == 0:
             logging.warning("No Nuggets Generated")
         else:
             logging.info(f"Generated {len(nuggets)} nuggets for query {query}")
 
+        if self.with_importance:
+            return [
+                {
+                    "qid": qid,
+                    self.query_field: query,
+                    f"{self.nugget_field}_id": f"{qid}_{i+1}",
+                    self.nugget_field: nugget,
+                    self.importance_field: important,
+                } for i, (nugget, important) in enumerate(zip(nuggets, importance))
+            ]
         return [
             {
                 "qid": qid,
@@ -293,6 +897,202 @@ class NuggetCreator(pt.Transformer):
             } for i, nugget in enumerate(nuggets)
         ]
 
+    def _create(self, qid: Any, query: str, documents: List[str]):
+        nuggets: List[str] = []
+        importance: List[Optional[int]] = []
+
+        windows = list(iter_windows(
+            len(documents), self.window_size, self.window_size, verbose=self.verbose
+        ))
+        counter = self.nuggetizer.stats["creator"]
+        k = 0
+        while k < len(windows):
+            speculate = self.speculative and k + 1 < len(windows)
+            with self.nuggetizer._span("generate", stage="creator", qid=qid, window=k) as span:
+                prompts = [self._window_prompt(query, documents, windows, k, nuggets)]
+                if speculate:
+                    # guess that window k leaves the list unchanged and start window k + 1 alongside it
+                    prompts.append(self._window_prompt(query, documents, windows, k + 1, nuggets))
+                outputs = self.nuggetizer.generate(prompts, stage="creator")
+                updated, labels = self._parse_window(windows, k, outputs[0].text)
+                span.set("nuggetizer.parse", "ok" if updated else "empty")
+                if speculate and self._unchanged(nuggets, updated):
+                    counter["speculative_hits"] += 1
+                    span.set("nuggetizer.speculation", "hit")
+                    nuggets, importance = self._parse_window(windows, k + 1, outputs[1].text)
+                    k += 2
+                    continue
+                if speculate:
+                    counter["speculative_misses"] += 1
+                    span.set("nuggetizer.speculation", "miss")
+                nuggets, importance = updated, labels
+                k += 1
+        return nuggets, importance
+
+    def plan_by_query(self, inp: List[dict], encoding: str = "cl100k_base"):
+        """
+        Render the prompts of one query without calling the backend.
+
+        With speculation, the calls and tokens assume every guess misses, and so are an upper bound.
+
+        Returns:
+            Tuple[int, int, int]: The number of calls, the serial depth and the estimated prompt tokens.
+        """
+        query = inp[0][self.query_field]
+        documents = self._documents(inp)
+        if self.nuggetizer.dedup_documents:
+            documents = self._dedup(inp[0].get("qid", None), documents, record=False)
+        windows = list(iter_windows(len(documents), self.window_size, self.window_size))
+        placeholder = [PLACEHOLDER_NUGGET] * self.max_nuggets
+        tokens = 0
+        for k in range(len(windows)):
+            rendered = count_tokens(self._window_prompt(query, documents, windows, k, placeholder if k else []), encoding)
+            tokens += 2 * rendered if self.speculative and k else rendered
+        speculative = max(len(windows) - 1, 0) if self.speculative else 0
+        return len(windows) + speculative, len(windows), tokens
+
+    def _documents(self, inp: List[dict]) -> Union[List[str], LazyDocuments]:
+        """
+        The texts of the documents of one query or, given only docnos, a view fetching them from the document store.
+        """
+        if self.document_field in inp[0] or self.nuggetizer.document_store is None:
+            return [i[self.document_field] for i in inp]
+        return LazyDocuments([str(i["docno"]) for i in inp], self.nuggetizer.document_store)
+
+    def _window_prompt(self, query: str, documents: List[str], windows: List, k: int, nuggets: List[str]):
+        start, end, _ = windows[k]
+        prompt = self.importance_prompt if k == len(windows) - 1 and self.with_importance else self.prompt
+        return prompt.create_prompt(self._context(query, documents[start:end], nuggets))
+
+    def _parse_window(self, windows: List, k: int, output: str):
+        """
+        The nuggets (and, for a labelled final window, their importance) produced by window ``k``.
+        """
+        if k == len(windows) - 1 and self.with_importance:
+            return self._split_labelled(self.importance_prompt.answer_extraction(output)[:self.max_nuggets])
+        nuggets = self.prompt.answer_extraction(output)[:self.max_nuggets]
+        return nuggets, [None] * len(nuggets)
+
+    @staticmethod
+    def _unchanged(before: List[str], after: List[str]) -> bool:
+        """
+        Whether a window left the nugget list as it was, ignoring case, punctuation and whitespace.
+        """
+        return [normalise_text(n) for n in before] == [normalise_text(n) for n in after]
+
+    def _context(self, query: str, documents: List[str], nuggets: List[str]) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "context": format_context(documents),
+            "nuggets": nuggets,
+            "max_nuggets": self.max_nuggets,
+        }
+
+    def _dedup(self, qid: Any, documents: List[str], record: bool = True) -> List[str]:
+        if isinstance(documents, LazyDocuments):
+            # text is only fetched per window, so documents fetched by docno are only deduplicated by docno
+            unique = documents.unique()
+            if record:
+                counter = self.nuggetizer.stats["creator"]
+                counter["documents"] += len(documents)
+                counter["documents_removed"] += len(documents) - len(unique)
+            return unique
+        keep, stats = dedup_documents(documents, self.nuggetizer.near_duplicate_threshold)
+        if not record:
+            return [documents[i] for i in keep]
+        counter = self.nuggetizer.stats["creator"]
+        counter["documents"] += stats.documents
+        counter["documents_removed"] += stats.removed
+        counter["tokens"] += stats.tokens
+        counter["tokens_removed"] += stats.removed_tokens
+        if stats.removed:
+            self.logger.info(
+                f"Removed {stats.removed_exact} duplicate and {stats.removed_near} near-duplicate documents "
+                f"({stats.removed_tokens} of {stats.tokens} tokens) for query {qid}"
+            )
+        return [documents[i] for i in keep]
+
+    def _split_labelled(self, items: List[Any]):
+        """
+        Split (nugget, label) pairs from the final window into nuggets and importance scores.
+        Items without a recognised label are given an importance of None so they can be scored later.
+        """
+        nuggets, importance = [], []
+        for item in items:
+            if isinstance(item, (tuple, list)) and len(item) == 2:
+                nugget, label = item
+                importance.append(NuggetScorer.mapping.get(str(label).strip().lower()))
+            else:
+                nugget = item[0] if isinstance(item, (tuple, list)) and item else item
+                importance.append(None)
+            nuggets.append(str(nugget))
+        return nuggets, importance
+
+
+class NuggetDeduplicator(pt.Transformer):
+    """
+    Component that merges near-duplicate nuggets of each query using a cheap lexical similarity.
+
+    The first (most important) nugget of each cluster is kept, and the ids of every nugget merged into it
+    are recorded in the ``<nugget_field>_members`` column so results can be mapped back to the originals.
+
+    Parameters:
+        nuggetizer (Nuggetizer): Parent nuggetizer instance
+        threshold (float, optional): Override for the similarity threshold
+        verbose (bool, optional): Override for verbose logging
+    """
+
+    def __init__(
+        self,
+        nuggetizer: Nuggetizer,
+        threshold: Optional[float] = None,
+        verbose: bool = None,
+    ):
+        assert nuggetizer is not None, "nuggetizer must be provided"
+        assert isinstance(
+            nuggetizer, Nuggetizer
+        ), "nuggetizer must be an instance of Nuggetizer"
+
+        self.nuggetizer = nuggetizer
+        self.threshold = threshold if threshold else (nuggetizer.nugget_dedup_threshold or 0.5)
+        self.query_field = nuggetizer.query_field
+        self.nugget_field = nuggetizer.nugget_field
+        self.importance_field = nuggetizer.importance_field
+        self.verbose = verbose if verbose is not None else nuggetizer.verbose
+
+        self.__post_init__()
+
+    def __post_init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.INFO if self.verbose else logging.WARNING)
+
+    @pta.transform.by_query(add_ranks=False)
+    def transform_iter(self, inp: Iterable[dict]) -> Iterable[dict]:
+        return self.transform_by_query(inp)
+
+    def transform_by_query(self, inp: Iterable[dict]) -> Iterable[dict]:
+        inp = list(inp)
+        qid = inp[0].get("qid", None)
+        nuggets = [i[self.nugget_field] for i in inp]
+        clusters = cluster_nuggets(nuggets, self.threshold)
+
+        counter = self.nuggetizer.stats["deduplicator"]
+        counter["nuggets"] += len(nuggets)
+        counter["nuggets_removed"] += len(nuggets) - len(clusters)
+        if len(clusters) < len(nuggets):
+            self.logger.info(f"Merged {len(nuggets)} nuggets into {len(clusters)} for query {qid}")
+
+        output = []
+        for cluster in clusters:
+            row = dict(inp[cluster[0]])
+            row[f"{self.nugget_field}_members"] = [inp[i][f"{self.nugget_field}_id"] for i in cluster]
+            if self.importance_field in row:
+                importance = [inp[i][self.importance_field] for i in cluster]
+                importance = [x for x in importance if x is not None and x == x]
+                row[self.importance_field] = max(importance) if importance else None
+            output.append(row)
+        return output
+
 
 class NuggetScorer(pt.Transformer):
     """
@@ -339,10 +1139,7 @@ class NuggetScorer(pt.Transformer):
 
         self.nuggetizer = nuggetizer
         self.window_size = window_size if window_size else nuggetizer.scorer_window_size
-        if self.nuggetizer.conversation_template is not None:
-            self.conversation_template = self.nuggetizer.conversation_template
-        else:
-            self.conversation_template = None
+        self.conversation_template = nuggetizer.conversation_template
         self.max_nuggets = max_nuggets if max_nuggets else nuggetizer.max_nuggets
         self.query_field = nuggetizer.query_field
         self.nugget_field = nuggetizer.nugget_field
@@ -354,9 +1151,9 @@ class NuggetScorer(pt.Transformer):
 
     def __post_init__(self):
         self.prompt = PromptTransformer(
-            instruction=make_callable_template(SCORER_PROMPT_STRING),
+            instruction=compile_template(SCORER_PROMPT_SOURCE),
             system_message=self.system_message,
-            conversation_template=self.conversation_template,
+            conversation_template=_copy_template(self.conversation_template),
             #model_name_or_path=self.nuggetizer.backend.model_name_or_path,
             answer_extraction=extract_list,
             output_field=self.importance_field,
@@ -378,17 +1175,21 @@ class NuggetScorer(pt.Transformer):
 
         importance_scores: List[str] = []
 
-        for start, end, _ in iter_windows(
-            len(nuggets), self.window_size, self.window_size, verbose=self.verbose
-        ):
-            current_nuggets = nuggets[start:end]
-            context = {
-                "query": query,
-                "nuggets": current_nuggets,
-            }
-            prompt = [self.prompt.create_prompt(context)]
-            output = self.nuggetizer.generate(prompt)[0].text
-            importance_scores.extend(self.prompt.answer_extraction(output))
+        with self.nuggetizer._span("query", stage="scorer", qid=qid, nuggets=len(nuggets)):
+            for k, (start, end, _) in enumerate(iter_windows(
+                len(nuggets), self.window_size, self.window_size, verbose=self.verbose
+            )):
+                current_nuggets = nuggets[start:end]
+                context = {
+                    "query": query,
+                    "nuggets": current_nuggets,
+                }
+                with self.nuggetizer._span("generate", stage="scorer", qid=qid, window=k) as span:
+                    prompt = [self.prompt.create_prompt(context)]
+                    output = self.nuggetizer.generate(prompt, stage="scorer")[0].text
+                    labels = self.prompt.answer_extraction(output)
+                    span.set("nuggetizer.parse", "ok" if len(labels) == len(current_nuggets) else "malformed")
+                importance_scores.extend(labels)
         importance_scores = [self.mapping.get(x.lower(), 0) for x in importance_scores]
 
         return [
@@ -401,6 +1202,23 @@ class NuggetScorer(pt.Transformer):
             } for idx, nugget, importance_score in zip(nugget_ids, nuggets, importance_scores)
         ]
 
+    def plan_by_query(self, inp: List[dict], encoding: str = "cl100k_base"):
+        """
+        Render the prompts of one query without calling the backend.
+
+        Returns:
+            Tuple[int, int, int]: The number of calls, the serial depth and the estimated prompt tokens.
+        """
+        query = inp[0][self.query_field]
+        nuggets = [i[self.nugget_field] for i in inp]
+        windows = list(iter_windows(len(nuggets), self.window_size, self.window_size))
+        tokens = sum(
+            count_tokens(self.prompt.create_prompt({"query": query, "nuggets": nuggets[start:end]}), encoding)
+            for start, end, _ in windows
+        )
+        # windows are sent one after another
+        return len(windows), len(windows), tokens
+
 
 class NuggetAssigner(pt.Transformer):
     """
@@ -439,10 +1257,7 @@ class NuggetAssigner(pt.Transformer):
         self.nuggetizer = nuggetizer
         self.mode = mode if mode else nuggetizer.assigner_mode
         self.window_size = window_size if window_size else nuggetizer.assigner_window_size
-        if self.nuggetizer.conversation_template is not None:
-            self.conversation_template = self.nuggetizer.conversation_template
-        else:
-            self.conversation_template = None
+        self.conversation_template = nuggetizer.conversation_template
         self.query_field = nuggetizer.query_field
         self.nugget_field = nuggetizer.nugget_field
         self.importance_field = nuggetizer.importance_field
@@ -455,14 +1270,14 @@ class NuggetAssigner(pt.Transformer):
 
     def __post_init__(self):
         instruction = (
-            ASSIGNER_GRADE_2_PROMPT_STRING
+            ASSIGNER_GRADE_2_PROMPT_SOURCE
             if self.mode == NuggetAssignMode.SUPPORT_GRADE_2
-            else ASSIGNER_GRADE_3_PROMPT_STRING
+            else ASSIGNER_GRADE_3_PROMPT_SOURCE
         )
         self.prompt = PromptTransformer(
-            instruction=make_callable_template(instruction),
+            instruction=compile_template(instruction),
             system_message=self.system_message,
-            conversation_template=self.conversation_template,
+            conversation_template=_copy_template(self.conversation_template),
             #model_name_or_path=self.nuggetizer.backend.model_name_or_path,
             answer_extraction=extract_list,
             output_field=self.assignment_field,
@@ -490,29 +1305,39 @@ class NuggetAssigner(pt.Transformer):
 
     def transform_by_query(self, inp: Iterable[dict]) -> Iterable[dict]:
         inp = list(inp)
+        output = []
+        with self.nuggetizer._span("query", stage="assigner", qid=inp[0].get("qid", None)):
+            for rows in self._by_answer(inp):
+                output.extend(self.assign_answer(rows))
+        return output
+
+    def _by_answer(self, inp: List[dict]) -> List[List[dict]]:
+        """
+        Split the rows of a query into the nuggets of each answer, as a run merged with qrels holds
+        every answer of the query crossed with its nuggets.
+        """
+        groups: List[List[dict]] = []
+        seen: Set[Any] = set()
+        for row in inp:
+            nugget_id = row.get(f"{self.nugget_field}_id")
+            if not groups or row[self.answer_field] != groups[-1][0][self.answer_field] or nugget_id in seen:
+                groups.append([])
+                seen = set()
+            groups[-1].append(row)
+            seen.add(nugget_id)
+        return groups
+
+    def assign_answer(self, inp: List[dict]) -> List[dict]:
+        """
+        Assign the nuggets in ``inp``, which must all belong to the same query and answer.
+        """
         qid = inp[0].get("qid", None)
         query = inp[0][self.query_field]
         qanswer = inp[0][self.answer_field]
         nugget_ids = [i[f"{self.nugget_field}_id"] for i in inp]
         nuggets = [i[self.nugget_field] for i in inp]
         importance = [i[self.importance_field] for i in inp]
-
-        assignments: List[str] = []
-
-        for start, end, _ in iter_windows(
-            len(nuggets), self.window_size, self.window_size, verbose=self.verbose
-        ):
-            current_nuggets = nuggets[start:end]
-            context = {
-                "query": query,
-                "nuggets": current_nuggets,
-                "context": qanswer,
-            }
-            prompt = [self.prompt.create_prompt(context)]
-            output = self.nuggetizer.generate(prompt)[0].text
-            assignments.extend(self.prompt.answer_extraction(output))
-        assignments = [self.mapping.get(x.lower(), 0) for x in assignments]
-        print("Assignments:", assignments)
+        assignments = self.assign_labels(qid, query, qanswer, nuggets)
         return [
             {
                 "qid": qid,
@@ -525,5 +1350,61 @@ class NuggetAssigner(pt.Transformer):
             } for idx, nugget, important, assignment in zip(nugget_ids, nuggets, importance, assignments)
         ]
 
+    def assign_labels(self, qid: Any, query: str, qanswer: str, nuggets: List[str]) -> List[int]:
+        """
+        The assignment label of each of ``nuggets`` for one answer.
+        """
+        # windows are visited last to first, so labels are placed by position
+        assignments: List[int] = [0] * len(nuggets)
+
+        with self.nuggetizer._span("answer", stage="assigner", qid=qid, nuggets=len(nuggets)):
+            for k, (start, end, _) in enumerate(iter_windows(
+                len(nuggets), self.window_size, self.window_size, verbose=self.verbose
+            )):
+                current_nuggets = nuggets[start:end]
+                context = {
+                    "query": query,
+                    "nuggets": current_nuggets,
+                    "context": qanswer,
+                }
+                with self.nuggetizer._span("generate", stage="assigner", qid=qid, window=k) as span:
+                    prompt = [self.prompt.create_prompt(context)]
+                    output = self.nuggetizer.generate(prompt, stage="assigner")[0].text
+                    labels = self.prompt.answer_extraction(output)
+                    span.set("nuggetizer.parse", "ok" if len(labels) == len(current_nuggets) else "malformed")
+                if len(labels) != len(current_nuggets):
+                    self.nuggetizer.stats["assigner"]["malformed"] += 1
+                    self.logger.warning(
+                        f"Expected {len(current_nuggets)} assignments for query {qid}, got {len(labels)}"
+                    )
+                for i, label in enumerate(labels[:len(current_nuggets)]):
+                    assignments[start + i] = self.mapping.get(str(label).lower(), 0)
+        return assignments
+
+    def plan_by_query(self, inp: List[dict], encoding: str = "cl100k_base"):
+        """
+        Render the prompts of one query without calling the backend.
+
+        Returns:
+            Tuple[int, int, int]: The number of calls, the serial depth and the estimated prompt tokens.
+        """
+        calls, depth, tokens = 0, 0, 0
+        for rows in self._by_answer(inp):
+            query = rows[0][self.query_field]
+            qanswer = rows[0][self.answer_field]
+            nuggets = [i[self.nugget_field] for i in rows]
+            windows = list(iter_windows(len(nuggets), self.window_size, self.window_size))
+            calls += len(windows)
+            # the windows of an answer are sent one after another
+            depth = max(depth, len(windows))
+            tokens += sum(
+                count_tokens(
+                    self.prompt.create_prompt({"query": query, "nuggets": nuggets[start:end], "context": qanswer}),
+                    encoding,
+                )
+                for start, end, _ in windows
+            )
+        return calls, depth, tokens
+
 
-__all__ = ["Nuggetizer", "NuggetCreator", "NuggetScorer", "NuggetAssigner"]
+__all__ = ["Nuggetizer", "NuggetCreator", "NuggetDeduplicator", "NuggetScorer", "NuggetAssigner"]
@@ -0,0 +1,68 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Union
+
+PLACEHOLDER_NUGGET = "placeholder nugget of roughly average length for estimates"
+
+_encodings: Dict[str, Any] = {}
+
+
+def count_tokens(prompt: Union[str, List[dict]], encoding: str = "cl100k_base") -> int:
+    """
+    Estimate the number of tokens in a prompt using tiktoken.
+
+    Falls back to a four-characters-per-token estimate if tiktoken or the encoding is unavailable.
+
+    Args:
+        prompt (Union[str, List[dict]]): A prompt string or a list of chat messages.
+        encoding (str): Name of the tiktoken encoding.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    if isinstance(prompt, list):
+        return sum(count_tokens(message.get("content", ""), encoding) for message in prompt)
+    if encoding not in _encodings:
+        try:
+            import tiktoken
+            _encodings[encoding] = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"tiktoken encoding {encoding} unavailable ({e}), estimating tokens")
+            _encodings[encoding] = None
+    tokenizer = _encodings[encoding]
+    if tokenizer is None:
+        return (len(prompt) + 3) // 4
+    return len(tokenizer.encode(prompt, disallowed_special=()))
+
+
+@dataclass
+class StagePlan:
+    stage: str
+    queries: int = 0
+    calls: int = 0
+    serial_depth: int = 0
+    prompt_tokens: int = 0
+
+    def add(self, calls: int, serial_depth: int, prompt_tokens: int) -> None:
+        self.queries += 1
+        self.calls += calls
+        self.serial_depth = max(self.serial_depth, serial_depth)
+        self.prompt_tokens += prompt_tokens
+
+
+class DryRunBackend:
+    """
+    Backend placeholder for planning a run without loading a model; any attempt to generate raises.
+    """
+
+    def __init__(self, model_name_or_path: str = "dry-run"):
+        self.model_name_or_path = model_name_or_path
+
+    def generate(self, inp):
+        raise RuntimeError("DryRunBackend cannot generate, use Nuggetizer.plan to size a run")
+
+    def __repr__(self):
+        return f"DryRunBackend({self.model_name_or_path!r})"
+
+
+__all__ = ["PLACEHOLDER_NUGGET", "count_tokens", "StagePlan", "DryRunBackend"]
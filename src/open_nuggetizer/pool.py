@@ -0,0 +1,193 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from math import ceil
+from typing import Any, Dict, List, Optional, Sequence
+
+from pyterrier_nuggetizer.retry import is_transient
+
+
+@dataclass
+class ReplicaStats:
+    calls: int = 0
+    prompts: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Prompts completed per busy second."""
+        return self.prompts / self.busy_seconds if self.busy_seconds else 0.0
+
+
+class _Replica:
+    def __init__(self, index: int, backend: Any):
+        self.index = index
+        self.backend = backend
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.stats = ReplicaStats()
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+
+class BackendPool:
+    """
+    A drop-in ``backend`` that spreads each batch of prompts across several replicas with the same
+    ``generate`` signature, e.g. one ``OpenAIBackend`` per vLLM server.
+
+    Each batch is split into chunks, and each chunk goes to the healthy replica with the fewest outstanding
+    prompts. A replica failing ``max_failures`` times in a row is skipped for ``cooldown`` seconds, and
+    chunks that fail are re-sent to another replica. Only transient errors (see ``retry.is_transient``) count
+    as failures; other errors, such as a prompt exceeding the context length, are raised at once.
+
+    Parameters:
+        backends (Sequence): The replicas.
+        max_failures (int): Consecutive failures after which a replica is considered unhealthy.
+        cooldown (float): Seconds an unhealthy replica is skipped before being tried again.
+        chunk_size (int, optional): Maximum prompts sent to a replica per call, defaults to an even split.
+        max_workers (int, optional): Threads used to call replicas concurrently.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Any],
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        chunk_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ):
+        assert len(backends) > 0, "at least one backend must be provided"
+        assert all(hasattr(b, "generate") for b in backends), "backends must have a generate method"
+        assert chunk_size is None or chunk_size > 0, "chunk_size must be greater than 0"
+        self.replicas = [_Replica(i, backend) for i, backend in enumerate(backends)]
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or 4 * len(backends))
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def backends(self) -> List[Any]:
+        return [replica.backend for replica in self.replicas]
+
+    def __getattr__(self, attr: str):
+        # expose attributes such as model_name_or_path of the first replica
+        if attr == "replicas":
+            raise AttributeError(attr)
+        return getattr(self.replicas[0].backend, attr)
+
+    def __repr__(self):
+        return f"BackendPool({self.backends})"
+
+    def _select(self, size: int, exclude: Sequence[_Replica] = ()) -> Optional[_Replica]:
+        with self.lock:
+            now = time.monotonic()
+            candidates = [r for r in self.replicas if r not in exclude]
+            if not candidates:
+                return None
+            healthy = [r for r in candidates if r.healthy(now)]
+            if healthy:
+                replica = min(healthy, key=lambda r: (r.outstanding, r.index))
+            else:
+                # every replica is cooling down, probe the one that recovers first
+                replica = min(candidates, key=lambda r: r.unhealthy_until)
+            replica.outstanding += size
+            return replica
+
+    def _run(self, prompts: List[Any], kwargs: Dict[str, Any], replica: Optional[_Replica] = None) -> List[Any]:
+        tried: List[_Replica] = []
+        error: Optional[Exception] = None
+        while True:
+            if replica is None:
+                replica = self._select(len(prompts), exclude=tried)
+            if replica is None:
+                raise error
+            start = time.monotonic()
+            try:
+                output = replica.backend.generate(prompts, **kwargs)
+            except Exception as e:
+                transient = is_transient(e)
+                with self.lock:
+                    replica.outstanding -= len(prompts)
+                    replica.stats.errors += 1
+                    replica.stats.busy_seconds += time.monotonic() - start
+                if not transient:
+                    # a bad request would fail on every replica, and says nothing about this one's health
+                    raise
+                error = e
+                tried.append(replica)
+                with self.lock:
+                    replica.consecutive_failures += 1
+                    if replica.consecutive_failures >= self.max_failures:
+                        replica.unhealthy_until = time.monotonic() + self.cooldown
+                        self.logger.warning(f"Backend replica {replica.index} unhealthy for {self.cooldown}s: {e}")
+                replica = None
+                continue
+            with self.lock:
+                replica.outstanding -= len(prompts)
+                replica.consecutive_failures = 0
+                replica.unhealthy_until = 0.0
+                replica.stats.calls += 1
+                replica.stats.prompts += len(prompts)
+                replica.stats.busy_seconds += time.monotonic() - start
+            return list(output)
+
+    def generate(self, inps: List[Any], **kwargs) -> List[Any]:
+        """
+        Generate outputs for ``inps``, in order, using the replicas concurrently.
+        """
+        inps = list(inps)
+        if not inps:
+            return []
+        with self.lock:
+            now = time.monotonic()
+            n_healthy = max(1, sum(r.healthy(now) for r in self.replicas))
+        chunk_size = self.chunk_size or ceil(len(inps) / n_healthy)
+        chunks = [inps[i:i + chunk_size] for i in range(0, len(inps), chunk_size)]
+        if len(chunks) == 1:
+            return self._run(chunks[0], kwargs)
+        # reserve a replica for every chunk up front so the split does not depend on thread timing
+        replicas = [self._select(len(chunk)) for chunk in chunks]
+        futures = [self.executor.submit(self._run, chunk, kwargs, replica) for chunk, replica in zip(chunks, replicas)]
+        return [output for future in futures for output in future.result()]
+
+    def close(self) -> None:
+        """
+        Shut down the threads calling replicas concurrently.
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def replica_stats(self) -> List[Dict[str, Any]]:
+        """
+        Per-replica calls, prompts, errors, busy time, throughput and health.
+        """
+        now = time.monotonic()
+        with self.lock:
+            return [
+                {
+                    "replica": replica.index,
+                    "backend": repr(replica.backend),
+                    "calls": replica.stats.calls,
+                    "prompts": replica.stats.prompts,
+                    "errors": replica.stats.errors,
+                    "busy_seconds": replica.stats.busy_seconds,
+                    "throughput": replica.stats.throughput,
+                    "outstanding": replica.outstanding,
+                    "healthy": replica.healthy(now),
+                } for replica in self.replicas
+            ]
+
+
+__all__ = ["ReplicaStats", "BackendPool"]
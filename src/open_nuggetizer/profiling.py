@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+from pathlib import Path
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+
+PROFILE_MODES = ("sampling", "deterministic")
+
+BACKEND_SECTION = "backend"
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """
+    Opt-in profiler for the stages of a ``Nuggetizer``.
+
+    Code is attributed to named sections (``creator``, ``scorer``, ``assigner``, ``evaluator``, ``conversion``,
+    and ``backend`` around calls to the backend), which nest per thread. Every section records its wall time.
+    In ``sampling`` mode a background thread samples the stacks of threads inside a section every ``interval``
+    seconds, giving collapsed stacks per stage that flame graph tools (flamegraph.pl, speedscope) read
+    directly. In ``deterministic`` mode each stage runs under ``cProfile`` instead, giving exact call counts
+    at a higher overhead.
+
+    Parameters:
+        mode (str): sampling or deterministic.
+        interval (float): Seconds between samples, in sampling mode.
+
+    Attributes:
+        samples (Dict[str, Counter]): Per stage, sample counts per collapsed stack.
+        wall (Dict[str, List[float]]): Per section path (e.g. 'assigner;backend'), calls and seconds.
+    """
+
+    def __init__(self, mode: str = "sampling", interval: float = 0.005):
+        assert mode in PROFILE_MODES, f"mode must be one of {PROFILE_MODES}"
+        assert interval > 0, "interval must be greater than 0"
+        self.mode = mode
+        self.interval = interval
+        self.samples: Dict[str, Counter] = defaultdict(Counter)
+        self.wall: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        self.lock = threading.Lock()
+
+        self._active: Dict[int, List[Tuple[str, object]]] = {}
+        self._profiles: Dict[str, List[cProfile.Profile]] = defaultdict(list)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> "Profiler":
+        self._stopped.clear()
+        if self.mode == "sampling" and self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, name="nugget-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @contextlib.contextmanager
+    def section(self, name: str, caller=None) -> Iterator[None]:
+        """
+        Attribute the enclosed code, on the current thread, to section ``name``.
+        ``caller`` is the frame that entered the ``with`` block, found on the stack if not given.
+        """
+        tid = threading.get_ident()
+        caller = caller if caller is not None else sys._getframe(2)
+        with self.lock:
+            stack = self._active.setdefault(tid, [])
+            stack.append((name, caller))
+            path = ";".join(n for n, _ in stack)
+            outermost = len(stack) == 1
+        profile = None
+        if self.mode == "deterministic" and outermost and not self._stopped.is_set():
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:   # another profiler is active on this thread
+                profile = None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            with self.lock:
+                stack.pop()
+                if not stack:
+                    del self._active[tid]
+                self.wall[path][0] += 1
+                self.wall[path][1] += elapsed
+                if profile is not None:
+                    self._profiles[name].append(profile)
+
+    def _sample_loop(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                active = {tid: list(stack) for tid, stack in self._active.items()}
+            for tid, stack in active.items():
+                frame = frames.get(tid)
+                if frame is None or not stack:
+                    continue
+                stage, root = stack[0]
+                entered = {id(f): name for name, f in stack[1:]}
+                names = []
+                # walk from the leaf up to the frame that entered the stage, marking where nested sections begin
+                while frame is not None and frame is not root:
+                    if id(frame) in entered:
+                        names.append(f"[{entered[id(frame)]}]")
+                    names.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                names.append(_frame_name(root.f_code))
+                names.append(f"[{stage}]")
+                key = ";".join(reversed(names))
+                with self.lock:
+                    self.samples[stage][key] += 1
+
+    def stage_times(self) -> pd.DataFrame:
+        """
+        Wall time per section path, with the share of each stage spent waiting on the backend.
+
+        Returns:
+            pd.DataFrame: section, calls, seconds and, for stages, backend_seconds and cpu_seconds.
+        """
+        with self.lock:
+            wall = {path: list(value) for path, value in self.wall.items()}
+        rows = []
+        for path, (calls, seconds) in wall.items():
+            row = {"section": path, "calls": int(calls), "seconds": seconds}
+            if ";" not in path:
+                backend = sum(s for p, (_, s) in wall.items()
+                              if p.startswith(path + ";") and p.split(";")[-1] == BACKEND_SECTION
+                              and BACKEND_SECTION not in p.split(";")[1:-1])
+                row["backend_seconds"] = backend
+                row["cpu_seconds"] = seconds - backend
+            rows.append(row)
+        return pd.DataFrame(rows, columns=["section", "calls", "seconds", "backend_seconds", "cpu_seconds"])
+
+    def hot_functions(self, top: int = 20) -> pd.DataFrame:
+        """
+        The functions with the most self time in each stage.
+
+        Returns:
+            pd.DataFrame: stage, function, self_seconds and total_seconds, the top ``top`` per stage.
+        """
+        rows = []
+        if self.mode == "sampling":
+            with self.lock:
+                samples = {stage: Counter(counter) for stage, counter in self.samples.items()}
+            for stage, counter in samples.items():
+                own, total = Counter(), Counter()
+                for key, count in counter.items():
+                    frames = [f for f in key.split(";") if not f.startswith("[")]
+                    if frames:
+                        own[frames[-1]] += count
+                    for name in set(frames):
+                        total[name] += count
+                for name, count in own.most_common(top):
+                    rows.append({"stage": stage, "function": name,
+                                 "self_seconds": count * self.interval, "total_seconds": total[name] * self.interval})
+        else:
+            for stage in list(self._profiles):
+                stats = self.stats(stage)
+                if stats is None:
+                    continue
+                entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+                for (filename, line, name), (_, _, tottime, cumtime, _) in entries:
+                    rows.append({"stage": stage, "function": f"{name} ({os.path.basename(filename)}:{line})",
+                                 "self_seconds": tottime, "total_seconds": cumtime})
+        return pd.DataFrame(rows, columns=["stage", "function", "self_seconds", "total_seconds"])
+
+    def stats(self, stage: str) -> Optional[pstats.Stats]:
+        """
+        The merged ``cProfile`` statistics of ``stage``, in deterministic mode.
+        """
+        with self.lock:
+            profiles = list(self._profiles.get(stage, []))
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def write(self, output_dir: Union[str, Path], top: int = 20) -> List[Path]:
+        """
+        Write ``<stage>.collapsed`` stacks (sampling) or ``<stage>.prof`` statistics (deterministic) per stage,
+        and a ``summary.txt`` of stage times and the ``top`` hot functions of each stage.
+
+        Returns:
+            List[Path]: The files written.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        written = []
+        if self.mode == "sampling":
+            with self.lock:
+                samples = {stage: Counter(counter) for stage, counter in self.samples.items()}
+            for stage, counter in samples.items():
+                path = output_dir / f"{stage}.collapsed"
+                path.write_text("".join(f"{key} {count}\n" for key, count in sorted(counter.items())))
+                written.append(path)
+        else:
+            for stage in list(self._profiles):
+                stats = self.stats(stage)
+                if stats is not None:
+                    path = output_dir / f"{stage}.prof"
+                    stats.dump_stats(path)
+                    written.append(path)
+        path = output_dir / "summary.txt"
+        with pd.option_context("display.max_colwidth", 120, "display.width", 200):
+            path.write_text(
+                f"Stage times ({self.mode})\n{self.stage_times().to_string(index=False)}\n\n"
+                f"Top {top} functions by self time per stage\n{self.hot_functions(top).to_string(index=False)}\n"
+            )
+        written.append(path)
+        return written
+
+
+__all__ = ["PROFILE_MODES", "BACKEND_SECTION", "Profiler"]
@@ -1,14 +1,41 @@
-from pyterrier_nuggetizer.prompts.assigner import ASSIGNER_GRADE_2_PROMPT_STRING, ASSIGNER_GRADE_3_PROMPT_STRING
-from pyterrier_nuggetizer.prompts.creator import CREATOR_PROMPT_STRING
-from pyterrier_nuggetizer.prompts.scorer import SCORER_PROMPT_STRING
-from pyterrier_nuggetizer.prompts._util import render_prompt, make_callable_template
+from pyterrier_nuggetizer.prompts.assigner import (
+    ASSIGNER_GRADE_2_PROMPT_STRING,
+    ASSIGNER_GRADE_3_PROMPT_STRING,
+    ASSIGNER_GRADE_2_PROMPT_SOURCE,
+    ASSIGNER_GRADE_3_PROMPT_SOURCE,
+)
+from pyterrier_nuggetizer.prompts.creator import (
+    CREATOR_PROMPT_STRING,
+    CREATOR_IMPORTANCE_PROMPT_STRING,
+    CREATOR_PROMPT_SOURCE,
+    CREATOR_IMPORTANCE_PROMPT_SOURCE,
+)
+from pyterrier_nuggetizer.prompts.scorer import SCORER_PROMPT_STRING, SCORER_PROMPT_SOURCE
+from pyterrier_nuggetizer.prompts._util import (
+    render_prompt,
+    make_callable_template,
+    format_list,
+    format_context,
+    CompiledTemplate,
+    compile_template,
+)
 
 
 __all__ = [
     "ASSIGNER_GRADE_2_PROMPT_STRING",
     "ASSIGNER_GRADE_3_PROMPT_STRING",
     "CREATOR_PROMPT_STRING",
+    "CREATOR_IMPORTANCE_PROMPT_STRING",
     "SCORER_PROMPT_STRING",
+    "ASSIGNER_GRADE_2_PROMPT_SOURCE",
+    "ASSIGNER_GRADE_3_PROMPT_SOURCE",
+    "CREATOR_PROMPT_SOURCE",
+    "CREATOR_IMPORTANCE_PROMPT_SOURCE",
+    "SCORER_PROMPT_SOURCE",
     "render_prompt",
     "make_callable_template",
+    "format_list",
+    "format_context",
+    "CompiledTemplate",
+    "compile_template",
 ]
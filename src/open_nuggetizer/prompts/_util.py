@@ -1,5 +1,10 @@
+import re
+from functools import lru_cache
 from jinja2 import Template
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence, Union
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*(\|\s*length\s*)?\}\}")
+
 
 def render_prompt(template: Template, context: Dict[str, Any]) -> str:
     """
@@ -28,4 +33,76 @@ def make_callable_template(template: Template):
     return template_call
 
 
-__all__ = ["render_prompt", "make_callable_template"]
+@lru_cache(maxsize=4096)
+def format_list(items: tuple) -> str:
+    """
+    A list as Jinja renders it, e.g. the nugget list of a window. Cached, as the same windows of
+    nuggets are rendered for every answer of a topic.
+    """
+    return str(list(items))
+
+
+def format_context(documents: Sequence[str]) -> str:
+    """
+    Documents numbered one per line, as passed to the creator. Not cached, so document text fetched
+    for a window is released once its prompt is rendered.
+    """
+    return "\n".join([f"[{i+1}] {doc}" for i, doc in enumerate(documents)])
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        try:
+            return format_list(tuple(value))
+        except TypeError:   # unhashable items
+            return str(list(value))
+    return str(value)
+
+
+class CompiledTemplate:
+    """
+    A prompt template split once into static text and ``{{ var }}`` / ``{{ var|length }}`` slots, so
+    rendering is a string join rather than a Jinja render. Renders the same text as Jinja for the
+    templates in this package; use ``compile_template`` to fall back to Jinja for anything else.
+
+    Parameters:
+        source (str): The template source.
+    """
+
+    def __init__(self, source: str):
+        assert "{%" not in source and "{#" not in source, "only {{ var }} and {{ var|length }} are supported"
+        self.source = source
+        parts = _PLACEHOLDER.split(source)
+        self.literals: List[str] = parts[0::3]
+        self.slots: List[tuple] = [(name, bool(length)) for name, length in zip(parts[1::3], parts[2::3])]
+        assert "{{" not in "".join(self.literals), "only {{ var }} and {{ var|length }} are supported"
+
+    @property
+    def variables(self) -> Sequence[str]:
+        return sorted({name for name, _ in self.slots})
+
+    def __call__(self, **kwargs) -> str:
+        out = [self.literals[0]]
+        for (name, length), literal in zip(self.slots, self.literals[1:]):
+            value = kwargs.get(name, "")
+            out.append(str(len(value)) if length else _format(value))
+            out.append(literal)
+        return "".join(out)
+
+
+def compile_template(template: Union[str, Template]):
+    """
+    A callable rendering ``template``: compiled if it is a source string using only simple slots,
+    otherwise rendered through Jinja.
+    """
+    if isinstance(template, str):
+        try:
+            return CompiledTemplate(template)
+        except AssertionError:
+            template = Template(template)
+    return make_callable_template(template)
+
+
+__all__ = ["render_prompt", "make_callable_template", "format_list", "format_context", "CompiledTemplate", "compile_template"]
@@ -1,8 +1,7 @@
 from jinja2 import Template
 
 
-CREATOR_PROMPT_STRING = Template(
-    """Update the list of atomic nuggets of information (1-12 words), if needed, so they best provide the information required for the query. Leverage only the initial list of nuggets (if exists) and the provided context (this is an iterative process).  Return only the final list of all nuggets in a Pythonic list format (even if no updates). Make sure there is no redundant information. Ensure the updated nugget list has at most {{ max_nuggets }} nuggets (can be less), keeping only the most vital ones. Order them in decreasing order of importance. Prefer nuggets that provide more interesting information.
+CREATOR_PROMPT_SOURCE = """Update the list of atomic nuggets of information (1-12 words), if needed, so they best provide the information required for the query. Leverage only the initial list of nuggets (if exists) and the provided context (this is an iterative process).  Return only the final list of all nuggets in a Pythonic list format (even if no updates). Make sure there is no redundant information. Ensure the updated nugget list has at most {{ max_nuggets }} nuggets (can be less), keeping only the most vital ones. Order them in decreasing order of importance. Prefer nuggets that provide more interesting information.
 
 Search Query: {{ query }}
 Context:
@@ -12,6 +11,18 @@ Initial Nugget List Length: {{ nuggets|length }}
 
 Only update the list of atomic nuggets (if needed, else return as is). Do not explain. Always answer in short nuggets (not questions). List in the form ["a", "b", ...] and a and b are strings with no mention of ".
 Updated Nugget List:"""
-)
+CREATOR_PROMPT_STRING = Template(CREATOR_PROMPT_SOURCE)
 
-__all__ = ["CREATOR_PROMPT_STRING"]
+CREATOR_IMPORTANCE_PROMPT_SOURCE = """Update the list of atomic nuggets of information (1-12 words), if needed, so they best provide the information required for the query. Leverage only the initial list of nuggets (if exists) and the provided context (this is the final step of an iterative process).  Return only the final list of all nuggets in a Pythonic list format (even if no updates). Make sure there is no redundant information. Ensure the updated nugget list has at most {{ max_nuggets }} nuggets (can be less), keeping only the most vital ones. Order them in decreasing order of importance. Prefer nuggets that provide more interesting information. Label each nugget either as vital or okay. Vital nuggets represent concepts that must be present in a “good” answer; on the other hand, okay nuggets contribute worthwhile information about the target but are not essential.
+
+Search Query: {{ query }}
+Context:
+{{ context }}
+Initial Nugget List: {{ nuggets }}
+Initial Nugget List Length: {{ nuggets|length }}
+
+Only update the list of atomic nuggets (if needed, else return as is) and label them. Do not explain. Always answer in short nuggets (not questions). List in the form [("a", "vital"), ("b", "okay"), ...] where a and b are strings with no mention of " and each label is either vital or okay.
+Updated Labelled Nugget List:"""
+CREATOR_IMPORTANCE_PROMPT_STRING = Template(CREATOR_IMPORTANCE_PROMPT_SOURCE)
+
+__all__ = ["CREATOR_PROMPT_STRING", "CREATOR_IMPORTANCE_PROMPT_STRING", "CREATOR_PROMPT_SOURCE", "CREATOR_IMPORTANCE_PROMPT_SOURCE"]
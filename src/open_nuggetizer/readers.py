@@ -0,0 +1,237 @@
+import io
+import ast
+import gzip
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import pandas as pd
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+IMPORTANCE_LABELS: Dict[str, int] = {
+    "vital": 1,
+    "okay": 0,
+}
+
+ASSIGNMENT_LABELS: Dict[str, int] = {
+    "support": 2,
+    "partial_support": 1,
+    "not_support": 0,
+}
+
+# importance labels other than vital/okay (which do occur in judged files) count towards neither
+UNKNOWN_IMPORTANCE = -1
+
+
+def open_text(file: str) -> io.TextIOBase:
+    """
+    Open a text file for reading, transparently decompressing gzip files.
+
+    Args:
+        file (str): Path to the file.
+
+    Returns:
+        io.TextIOBase: The opened file.
+    """
+    with open(file, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(file, "rt", encoding="utf-8")
+    return open(file, "rt", encoding="utf-8")
+
+
+def iter_jsonl(file: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a (optionally gzipped) JSONL file, using orjson when available.
+
+    Args:
+        file (str): Path to the file.
+
+    Yields:
+        Dict[str, Any]: One record per non-empty line.
+    """
+    with open_text(file) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _loads(line)
+
+
+def _label(value: Any, labels: Dict[str, int], default: int) -> int:
+    if isinstance(value, str):
+        return labels.get(value.strip().lower(), default)
+    if value is None:
+        return default
+    return int(value)
+
+
+def _qid(record: Dict[str, Any]) -> str:
+    return str(record["qid"] if "qid" in record else record["topic_id"])
+
+
+def _query(record: Dict[str, Any]) -> Optional[str]:
+    return record.get("query", record.get("topic"))
+
+
+def _answer_text(record: Dict[str, Any]) -> str:
+    if "answer_text" in record:
+        return record["answer_text"]
+    answer = record.get("answer", "")
+    if isinstance(answer, list):
+        return " ".join(sentence["text"] if isinstance(sentence, dict) else str(sentence) for sentence in answer)
+    return str(answer)
+
+
+def _nuggets(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nuggets = record.get("nuggets", [])
+    if isinstance(nuggets, str):
+        # the TREC RAG assignment files store nuggets as a Python literal
+        nuggets = ast.literal_eval(nuggets)
+    return nuggets
+
+
+def answer_rows(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convert a TREC RAG answer record (``{"run_id", "topic_id", "topic", "answer": [{"text", "citations"}]}``)
+    into a run row with qid, query, qanswer and run_id.
+    """
+    return [{
+        "qid": _qid(record),
+        "query": _query(record),
+        "qanswer": _answer_text(record),
+        "run_id": record.get("run_id"),
+    }]
+
+
+def nugget_rows(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convert a TREC RAG nugget record (``{"qid", "query", "nuggets": [{"text", "importance"}]}``) into qrels rows
+    with qid, query, nugget_id, nugget and importance (vital 1, okay 0, otherwise -1).
+    """
+    qid = _qid(record)
+    query = _query(record)
+    return [
+        {
+            "qid": qid,
+            "query": query,
+            "nugget_id": nugget.get("nugget_id", f"{qid}_{i+1}"),
+            "nugget": nugget["text"],
+            "importance": _label(nugget.get("importance"), IMPORTANCE_LABELS, UNKNOWN_IMPORTANCE),
+        } for i, nugget in enumerate(_nuggets(record))
+    ]
+
+
+def assignment_rows(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convert a TREC RAG assignment record (``{"qid", "query", "answer_text", "run_id", "nuggets"}`` with
+    importance and assignment labels per nugget) into assigned rows, as produced by ``Nuggetizer.assign``.
+    Assignments are coded support 2, partial_support 1, and 0 otherwise.
+    """
+    qid = _qid(record)
+    query = _query(record)
+    qanswer = _answer_text(record)
+    run_id = record.get("run_id")
+    return [
+        {
+            "run_id": run_id,
+            "qid": qid,
+            "query": query,
+            "qanswer": qanswer,
+            "nugget_id": nugget.get("nugget_id", f"{qid}_{i+1}"),
+            "nugget": nugget["text"],
+            "importance": _label(nugget.get("importance"), IMPORTANCE_LABELS, UNKNOWN_IMPORTANCE),
+            "assignment": _label(nugget.get("assignment"), ASSIGNMENT_LABELS, 0),
+        } for i, nugget in enumerate(_nuggets(record))
+    ]
+
+
+def iter_chunks(
+    file: str,
+    to_rows: Callable[[Dict[str, Any]], List[Dict[str, Any]]],
+    chunk_size: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a JSONL file as DataFrames of whole queries.
+
+    Args:
+        file (str): Path to the (optionally gzipped) file.
+        to_rows (Callable): Converts one record into rows.
+        chunk_size (int, optional): Minimum rows per chunk; chunks only break between queries. If None, each
+            chunk holds a single query.
+
+    Yields:
+        pd.DataFrame: The rows of one or more consecutive queries.
+    """
+    rows: List[Dict[str, Any]] = []
+    last_qid = None
+    for record in iter_jsonl(file):
+        qid = _qid(record)
+        if rows and qid != last_qid and (chunk_size is None or len(rows) >= chunk_size):
+            yield pd.DataFrame(rows)
+            rows = []
+        rows.extend(to_rows(record))
+        last_qid = qid
+    if rows:
+        yield pd.DataFrame(rows)
+
+
+def iter_answers(file: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    return iter_chunks(file, answer_rows, chunk_size)
+
+
+def iter_nuggets(file: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    return iter_chunks(file, nugget_rows, chunk_size)
+
+
+def iter_assignments(file: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    return iter_chunks(file, assignment_rows, chunk_size)
+
+
+def _read(chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_answers(file: str) -> pd.DataFrame:
+    """
+    Load a TREC RAG answer file as a run DataFrame with qid, query, qanswer and run_id columns.
+    """
+    return _read(iter_answers(file, chunk_size=10_000))
+
+
+def read_nuggets(file: str) -> pd.DataFrame:
+    """
+    Load a TREC RAG nugget file as a qrels DataFrame with qid, query, nugget_id, nugget and importance columns.
+    """
+    return _read(iter_nuggets(file, chunk_size=10_000))
+
+
+def read_assignments(file: str) -> pd.DataFrame:
+    """
+    Load a TREC RAG assignment file as a DataFrame of assigned nuggets.
+    """
+    return _read(iter_assignments(file, chunk_size=10_000))
+
+
+__all__ = [
+    "IMPORTANCE_LABELS",
+    "ASSIGNMENT_LABELS",
+    "UNKNOWN_IMPORTANCE",
+    "open_text",
+    "iter_jsonl",
+    "answer_rows",
+    "nugget_rows",
+    "assignment_rows",
+    "iter_chunks",
+    "iter_answers",
+    "iter_nuggets",
+    "iter_assignments",
+    "read_answers",
+    "read_nuggets",
+    "read_assignments",
+]
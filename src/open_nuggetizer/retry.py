@@ -0,0 +1,187 @@
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from pyterrier_nuggetizer.scheduler import is_overload, status_code
+from pyterrier_nuggetizer.tracing import record
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Whether a backend exception is worth retrying: overloads, timeouts, connection failures and 5xx errors.
+    """
+    if is_overload(exc) or isinstance(exc, ConnectionError):
+        return True
+    code = status_code(exc)
+    if code is not None:
+        return code >= 500
+    name = type(exc).__name__
+    return "Connection" in name or "InternalServer" in name or "ServiceUnavailable" in name
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retry transient backend errors with exponential backoff and full jitter.
+
+    Parameters:
+        max_retries (int): Maximum retries per call.
+        base_delay (float): Backoff before the first retry, in seconds, doubling on each retry.
+        max_delay (float): Upper bound on the backoff, in seconds.
+        jitter (bool): Whether to draw each delay uniformly from [0, backoff].
+        retry_on (Callable, optional): Predicate selecting exceptions to retry, defaults to ``is_transient``.
+    """
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    jitter: bool = True
+    retry_on: Optional[Callable[[BaseException], bool]] = None
+
+    def delay(self, attempt: int, rng: random.Random) -> float:
+        backoff = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return rng.uniform(0, backoff) if self.jitter else backoff
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        return (self.retry_on or is_transient)(exc)
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Send a duplicate request when a call outlives a latency percentile, and take whichever returns first.
+
+    Parameters:
+        percentile (float): Percentile of recent latencies for the stage after which to hedge.
+        min_samples (int): Number of latencies to observe for a stage before hedging.
+        history (int): Number of recent latencies kept per stage.
+        max_workers (int): Threads available for in-flight primary and hedged calls.
+    """
+    percentile: float = 95.0
+    min_samples: int = 20
+    history: int = 1000
+    max_workers: int = 32
+
+
+class LatencyTracker:
+    def __init__(self, history: int = 1000):
+        self.history = history
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, latency: float) -> None:
+        with self.lock:
+            self.latencies.setdefault(stage, deque(maxlen=self.history)).append(latency)
+
+    def count(self, stage: str) -> int:
+        return len(self.latencies.get(stage, ()))
+
+    def percentile(self, stage: str, percentile: float) -> Optional[float]:
+        with self.lock:
+            values = sorted(self.latencies.get(stage, ()))
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, int(round(percentile / 100.0 * (len(values) - 1)))))
+        return values[index]
+
+
+class ResilientCaller:
+    """
+    Applies a ``RetryPolicy`` and ``HedgePolicy`` to backend calls, counting retries and hedges per stage.
+
+    Parameters:
+        retry (RetryPolicy, optional): Retry policy, if None calls are not retried.
+        hedge (HedgePolicy, optional): Hedging policy, if None calls are not hedged.
+        stats (Dict[str, Counter], optional): Per-stage counters to update.
+        seed (int, optional): Seed for the backoff jitter.
+    """
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        stats: Optional[Dict[str, Counter]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.retry = retry
+        self.hedge = hedge
+        self.stats = stats if stats is not None else {}
+        self.rng = random.Random(seed)
+        self.tracker = LatencyTracker(hedge.history if hedge else 1000)
+        self.executor = ThreadPoolExecutor(max_workers=hedge.max_workers) if hedge else None
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def close(self) -> None:
+        """
+        Shut down the hedging threads. A straggling call still in flight finishes in the background.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _count(self, stage: str, key: str) -> None:
+        with self.lock:
+            self.stats.setdefault(stage, Counter())[key] += 1
+
+    def call(self, fn: Callable[..., List[Any]], prompts: List[Any], stage: Optional[str] = None) -> List[Any]:
+        stage = stage or "other"
+        attempt = 0
+        while True:
+            try:
+                return self._hedged(fn, prompts, stage)
+            except Exception as e:
+                if self.retry is None or not self.retry.should_retry(e, attempt):
+                    raise
+                delay = self.retry.delay(attempt, self.rng)
+                attempt += 1
+                self._count(stage, "retries")
+                record("nuggetizer.retries", 1)
+                self.logger.info(f"Retrying {stage} call in {delay:.2f}s after {type(e).__name__}: {e}")
+                time.sleep(delay)
+
+    def _timed(self, fn: Callable[..., List[Any]], prompts: List[Any], stage: str) -> List[Any]:
+        start = time.monotonic()
+        output = fn(prompts, stage=stage)
+        self.tracker.record(stage, time.monotonic() - start)
+        return output
+
+    def _hedged(self, fn: Callable[..., List[Any]], prompts: List[Any], stage: str) -> List[Any]:
+        if self.executor is None or self.tracker.count(stage) < self.hedge.min_samples:
+            return self._timed(fn, prompts, stage)
+        threshold = self.tracker.percentile(stage, self.hedge.percentile)
+        primary = self.executor.submit(contextvars.copy_context().run, self._timed, fn, prompts, stage)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        self._count(stage, "hedges")
+        record("nuggetizer.hedges", 1)
+        hedged = self.executor.submit(contextvars.copy_context().run, self._timed, fn, prompts, stage)
+        pending = {primary, hedged}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self._count(stage, "hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+__all__ = ["is_transient", "RetryPolicy", "HedgePolicy", "LatencyTracker", "ResilientCaller"]
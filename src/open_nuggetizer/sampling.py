@@ -0,0 +1,233 @@
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import List, Sequence
+import numpy as np
+import pandas as pd
+
+from pyterrier_nuggetizer.metrics import METRIC_NAMES
+
+UNKNOWN_STRATUM = -1
+
+
+def _strata(nuggets: pd.DataFrame, by: Sequence[str], importance_field: str) -> pd.DataFrame:
+    strata = nuggets[list(by)].copy()
+    strata["_stratum"] = pd.to_numeric(nuggets[importance_field], errors="coerce").fillna(UNKNOWN_STRATUM).astype(int)
+    return strata
+
+
+def sample_order(
+    nuggets: pd.DataFrame,
+    by: Sequence[str] = ("qid",),
+    importance_field: str = "importance",
+    seed: int = None,
+) -> np.ndarray:
+    """
+    A random rank for every nugget within its stratum (its ``by`` group and importance label).
+
+    Taking the nuggets ranked below n_h in every stratum gives a stratified sample, and a larger
+    sample drawn from the same ranks always contains a smaller one.
+    """
+    rng = np.random.default_rng(seed)
+    strata = _strata(nuggets, by, importance_field).reset_index(drop=True)
+    strata["_key"] = rng.random(len(strata))
+    return strata.groupby(list(by) + ["_stratum"], sort=False)["_key"].rank(method="first").to_numpy() - 1
+
+
+def allocation(sizes: np.ndarray, fraction: float, min_per_stratum: int = 1) -> np.ndarray:
+    """
+    Proportional allocation: ``ceil(fraction * N_h)`` nuggets per stratum, at least ``min_per_stratum``
+    and at most N_h.
+    """
+    assert 0.0 < fraction <= 1.0, "fraction must be in (0, 1]"
+    sizes = np.asarray(sizes)
+    return np.minimum(sizes, np.maximum(min_per_stratum, np.ceil(fraction * sizes))).astype(int)
+
+
+def stratum_sizes(
+    nuggets: pd.DataFrame,
+    by: Sequence[str] = ("qid",),
+    importance_field: str = "importance",
+) -> np.ndarray:
+    """
+    The size N_h of the stratum of every nugget.
+    """
+    strata = _strata(nuggets, by, importance_field)
+    return strata.groupby(list(by) + ["_stratum"], sort=False)["_stratum"].transform("size").to_numpy()
+
+
+def stratified_sample(
+    nuggets: pd.DataFrame,
+    fraction: float,
+    min_per_stratum: int = 1,
+    by: Sequence[str] = ("qid",),
+    importance_field: str = "importance",
+    seed: int = None,
+) -> pd.DataFrame:
+    """
+    Sample nuggets of every ``by`` group, stratified by importance with proportional allocation.
+
+    Rounding up and ``min_per_stratum`` oversample small strata, so plain ratios over the sample are
+    biased; weight each judged nugget by ``inclusion_weights``, or use ``estimate_metrics``.
+
+    Args:
+        nuggets (pd.DataFrame): Nuggets to sample, e.g. a run merged with qrels.
+        fraction (float): Fraction of each stratum to keep.
+        min_per_stratum (int): Minimum nuggets kept from every non-empty stratum.
+        by (Sequence[str]): Columns identifying a group, e.g. ('qid',).
+        importance_field (str): Column holding the importance label.
+        seed (int, optional): Seed for reproducible samples.
+
+    Returns:
+        pd.DataFrame: The sampled rows, in their original order.
+    """
+    if len(nuggets) == 0:
+        return nuggets
+    rank = sample_order(nuggets, by, importance_field, seed)
+    keep = rank < allocation(stratum_sizes(nuggets, by, importance_field), fraction, min_per_stratum)
+    return nuggets[keep]
+
+
+def inclusion_weights(
+    judged: pd.DataFrame,
+    population: pd.DataFrame,
+    by: Sequence[str] = ("qid",),
+    importance_field: str = "importance",
+) -> np.ndarray:
+    """
+    The inverse inclusion probability N_h / n_h of every judged row, where N_h is the size of its stratum
+    in ``population`` and n_h the number of judged rows in it. Rows whose stratum is not in ``population``
+    get a weight of 1.
+    """
+    keys = list(by) + ["_stratum"]
+    sizes = _strata(population, by, importance_field).groupby(keys, sort=False).size().rename("N")
+    strata = _strata(judged, by, importance_field).reset_index(drop=True)
+    judged_sizes = strata.groupby(keys, sort=False)["_stratum"].transform("size")
+    return (strata.join(sizes, on=keys)["N"] / judged_sizes).fillna(1.0).to_numpy(dtype=float)
+
+
+def estimate_metrics(
+    judged: pd.DataFrame,
+    population: pd.DataFrame,
+    by: Sequence[str] = ("qid",),
+    importance_field: str = "importance",
+    assignment_field: str = "assignment",
+    alpha: float = 0.05,
+):
+    """
+    Estimate nugget metrics from a stratified sample of judged nuggets.
+
+    Within every group, each importance stratum contributes its sample mean credit weighted by its
+    size in ``population``. Variances use the finite population correction, so a fully judged
+    stratum contributes no uncertainty; a stratum with a single judged nugget (out of several) is
+    given the maximum variance of a [0, 1] credit. Groups are treated as independent when averaging.
+
+    Args:
+        judged (pd.DataFrame): Judged sample rows, with the ``by``, importance and assignment columns.
+        population (pd.DataFrame): All nugget rows (judged or not), with the ``by`` and importance columns.
+        by (Sequence[str]): Columns identifying a judged answer, e.g. ('qid',).
+        importance_field (str): Column holding the importance (1 vital, 0 okay).
+        assignment_field (str): Column holding the assignment (2 support, 1 partial support, 0 otherwise).
+        alpha (float): Significance level, giving (1 - alpha) intervals.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Per-group estimates (the ``by`` columns followed by one column per
+        metric), and overall estimates with metric, estimate, ci_low, ci_high and half_width columns.
+    """
+    by = list(by)
+    keys = by + ["_stratum"]
+    sizes = _strata(population, by, importance_field).groupby(keys, sort=False).size().rename("N")
+
+    credits = _strata(judged, by, importance_field)
+    assignment = pd.to_numeric(judged[assignment_field], errors="coerce").fillna(0).to_numpy()
+    credits["strict"] = (assignment == 2).astype(float)
+    credits["partial"] = np.where(assignment == 2, 1.0, np.where(assignment == 1, 0.5, 0.0))
+    grouped = credits.groupby(keys, sort=False)[["strict", "partial"]]
+    strata = grouped.mean().join(grouped.var(ddof=1), rsuffix="_var").join(grouped.size().rename("n"))
+    strata = strata.join(sizes, how="left")
+
+    fpc = (1.0 - strata["n"] / strata["N"]).clip(lower=0.0)
+    for credit in ["strict", "partial"]:
+        var = strata[f"{credit}_var"].where(strata["n"] > 1, 0.25)
+        strata[f"{credit}_var"] = (fpc * var / strata["n"]).fillna(0.0)
+
+    units = strata.index.droplevel("_stratum").unique()
+
+    def stratum(label: int) -> pd.DataFrame:
+        level = strata.xs(label, level="_stratum") if label in strata.index.get_level_values("_stratum") \
+            else strata.iloc[0:0].droplevel("_stratum")
+        return level.reindex(units).fillna(0.0)
+
+    total = strata.groupby(level=by, sort=False)["N"].sum().reindex(units)
+    vital, okay = stratum(1), stratum(0)
+    weights = vital["N"] + 0.5 * okay["N"]
+
+    def ratio(numerator, denominator):
+        return (numerator / denominator.where(denominator > 0)).fillna(0.0)
+
+    per_unit = {}
+    for credit, names in [("strict", ("strict_vital_score", "strict_weighted_score", "strict_all_score")),
+                          ("partial", ("vital_score", "weighted_score", "all_score"))]:
+        vital_name, weighted_name, all_name = names
+        mean, var = credit, f"{credit}_var"
+        per_unit[vital_name] = (vital[mean] * (vital["N"] > 0), vital[var])
+        per_unit[weighted_name] = (
+            ratio(vital["N"] * vital[mean] + 0.5 * okay["N"] * okay[mean], weights),
+            ratio(vital["N"] ** 2 * vital[var] + 0.25 * okay["N"] ** 2 * okay[var], weights ** 2),
+        )
+        weighted_sum = (strata["N"] * strata[mean]).groupby(level=by, sort=False).sum().reindex(units)
+        var_sum = (strata["N"] ** 2 * strata[var]).groupby(level=by, sort=False).sum().reindex(units)
+        per_unit[all_name] = (ratio(weighted_sum, total), ratio(var_sum, total ** 2))
+
+    per_query = pd.DataFrame({name: per_unit[name][0] for name in METRIC_NAMES}, index=units).reset_index()
+
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    rows: List[dict] = []
+    for name in METRIC_NAMES:
+        estimate, var = per_unit[name]
+        mean = float(estimate.mean()) if len(estimate) else 0.0
+        half_width = z * float(np.sqrt(var.sum())) / len(var) if len(var) else 0.0
+        rows.append({
+            "metric": name,
+            "estimate": mean,
+            "ci_low": mean - half_width,
+            "ci_high": mean + half_width,
+            "half_width": half_width,
+        })
+    return per_query, pd.DataFrame(rows)
+
+
+@dataclass
+class ApproxEvaluation:
+    """
+    The result of ``Nuggetizer.assign_approx``.
+
+    Attributes:
+        assignments (pd.DataFrame): The judged sample of nuggets.
+        per_query (pd.DataFrame): Estimated metrics per query.
+        estimates (pd.DataFrame): Overall estimates with confidence intervals, one row per metric.
+        judged (int): Number of nuggets judged.
+        total (int): Number of nuggets in the input.
+    """
+    assignments: pd.DataFrame
+    per_query: pd.DataFrame
+    estimates: pd.DataFrame
+    judged: int
+    total: int
+
+    @property
+    def fraction(self) -> float:
+        return self.judged / self.total if self.total else 0.0
+
+    def half_width(self, metric: str) -> float:
+        return float(self.estimates.set_index("metric").loc[metric, "half_width"])
+
+
+__all__ = [
+    "sample_order",
+    "allocation",
+    "stratum_sizes",
+    "stratified_sample",
+    "inclusion_weights",
+    "estimate_metrics",
+    "ApproxEvaluation",
+]
@@ -0,0 +1,246 @@
+import time
+import heapq
+import itertools
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from pyterrier_nuggetizer.tracing import record
+
+STAGE_PRIORITIES: Dict[str, int] = {
+    "creator": 0,
+    "scorer": 1,
+    "assigner": 2,
+}
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """
+    The HTTP status code carried by a backend exception, if any (e.g. from openai or requests errors).
+    """
+    for attr in ("status_code", "status", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_overload(exc: BaseException) -> bool:
+    """
+    Whether an exception signals that the endpoint is overloaded (rate limited, unavailable or timing out).
+    """
+    if isinstance(exc, TimeoutError):
+        return True
+    code = status_code(exc)
+    if code in (408, 429, 503, 504):
+        return True
+    name = type(exc).__name__
+    return "RateLimit" in name or "Timeout" in name
+
+
+def estimate_tokens(prompts: List[Union[str, List[dict]]]) -> int:
+    total = 0
+    for prompt in prompts:
+        if isinstance(prompt, list):
+            prompt = "".join(str(message.get("content", "")) for message in prompt)
+        total += len(prompt) // 4 + 1
+    return total
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket; ``acquire`` blocks until enough tokens have accumulated.
+
+    Parameters:
+        rate (float): Tokens added per second.
+        capacity (float, optional): Maximum tokens held, defaults to one second's worth.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        assert rate > 0, "rate must be greater than 0"
+        self.rate = rate
+        self.capacity = capacity if capacity else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take ``amount`` tokens, waiting as needed. Requests larger than the capacity wait for a full bucket.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+        needed = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease limit on the number of in-flight calls.
+
+    The limit grows by ``increase / limit`` per successful call (roughly ``increase`` per round trip), and is
+    multiplied by ``decrease`` on an overload error or when a call is slower than ``latency_target``.
+
+    Parameters:
+        initial (float): Starting limit.
+        minimum (float): Lowest limit.
+        maximum (float): Highest limit.
+        increase (float): Additive increase per round trip.
+        decrease (float): Multiplicative decrease factor.
+        latency_target (float, optional): Latency in seconds above which a call counts as congestion.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        minimum: float = 1,
+        maximum: float = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_target: Optional[float] = None,
+    ):
+        assert 0 < minimum <= initial <= maximum, "limits must satisfy 0 < minimum <= initial <= maximum"
+        assert 0 < decrease < 1, "decrease must be in (0, 1)"
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self._limit = float(initial)
+        self._last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return max(int(self._limit), 1)
+
+    def on_success(self, latency: float) -> None:
+        if self.latency_target is not None and latency > self.latency_target:
+            self.on_congestion()
+            return
+        with self.lock:
+            self._limit = min(self.maximum, self._limit + self.increase / self._limit)
+
+    def on_congestion(self) -> None:
+        with self.lock:
+            # a burst of failures from one window of in-flight calls counts as a single congestion event
+            now = time.monotonic()
+            if now - self._last_decrease < 0.1:
+                return
+            self._last_decrease = now
+            self._limit = max(self.minimum, self._limit * self.decrease)
+
+
+class Scheduler:
+    """
+    Client-side scheduler for backend calls, shareable between several ``Nuggetizer`` instances and threads.
+
+    Calls wait for a free in-flight slot, granted in stage priority order (creator calls on the critical path
+    first, bulk assignment last), then for request and token rate budgets. The number of slots adapts to
+    observed latency and overload errors with an ``AIMDController``.
+
+    Parameters:
+        requests_per_second (float, optional): Maximum request rate.
+        tokens_per_second (float, optional): Maximum estimated prompt token rate.
+        controller (AIMDController, optional): Concurrency controller, defaults to ``AIMDController()``.
+        priorities (Dict[str, int], optional): Priority per stage, lower runs first.
+
+    Attributes:
+        stats (Dict[str, Counter]): Per-stage counts of calls, overload errors and seconds spent queueing.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        controller: Optional[AIMDController] = None,
+        priorities: Optional[Dict[str, int]] = None,
+    ):
+        self.requests = TokenBucket(requests_per_second) if requests_per_second else None
+        self.tokens = TokenBucket(tokens_per_second) if tokens_per_second else None
+        self.controller = controller or AIMDController()
+        self.priorities = priorities if priorities is not None else STAGE_PRIORITIES
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _acquire(self, priority: int) -> None:
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            while self._waiting[0] != entry or self._in_flight >= self.controller.limit:
+                self._condition.wait()
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            self._condition.notify_all()
+
+    def _release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def submit(self, fn: Callable[[List[Any]], List[Any]], prompts: List[Any], stage: Optional[str] = None) -> List[Any]:
+        """
+        Run ``fn(prompts)`` once a slot and rate budget are available.
+
+        Parameters:
+            fn (Callable): The backend call, usually ``backend.generate``.
+            prompts (List): The prompts to pass.
+            stage (str, optional): Stage issuing the call, used for priority and stats.
+
+        Returns:
+            List: The result of ``fn``.
+        """
+        stage = stage or "other"
+        priority = self.priorities.get(stage, max(self.priorities.values(), default=0) + 1)
+        queued = time.monotonic()
+        self._acquire(priority)
+        try:
+            if self.requests is not None:
+                self.requests.acquire(1)
+            if self.tokens is not None:
+                self.tokens.acquire(estimate_tokens(prompts))
+            started = time.monotonic()
+            with self._condition:
+                self.stats[stage]["calls"] += 1
+                self.stats[stage]["queue_seconds"] += started - queued
+            record("nuggetizer.queue_seconds", started - queued)
+            try:
+                output = fn(prompts)
+            except Exception as e:
+                if is_overload(e):
+                    with self._condition:
+                        self.stats[stage]["overloaded"] += 1
+                    self.controller.on_congestion()
+                raise
+            self.controller.on_success(time.monotonic() - started)
+            return output
+        finally:
+            self._release()
+
+
+__all__ = ["STAGE_PRIORITIES", "status_code", "is_overload", "TokenBucket", "AIMDController", "Scheduler"]
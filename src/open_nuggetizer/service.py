@@ -0,0 +1,494 @@
+import json
+import time
+import uuid
+import logging
+import threading
+import urllib.request
+from dataclasses import dataclass, field
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
+
+from pyterrier_nuggetizer.tracing import record
+from pyterrier_nuggetizer.metrics import calculate_nugget_scores_frame, calculate_global_metrics_frame
+
+JOB_KINDS = ("create", "score", "assign", "evaluate")
+
+
+@dataclass
+class _Request:
+    prompts: List[Any]
+    arrived: float = field(default_factory=time.monotonic)
+    started: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event)
+    outputs: Optional[List[Any]] = None
+    error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    """
+    A backend wrapper merging concurrent ``generate`` calls into shared batches.
+
+    A batch is sent once it holds ``max_batch_size`` prompts, or ``max_wait`` seconds after its first
+    prompt arrived, whichever is sooner, so a lone call waits at most ``max_wait`` while many concurrent
+    jobs share each backend call. Callers block until their own outputs are ready.
+
+    Parameters:
+        backend (Backend): The backend to call, e.g. a ``VLLMBackend``.
+        max_batch_size (int): Most prompts per backend call. A single call with more prompts is sent alone.
+        max_wait (float): Latency deadline in seconds for filling a batch.
+        workers (int): Number of backend calls in flight at once.
+
+    Attributes:
+        stats (Counter): Counts of requests, prompts, batches and seconds prompts spent waiting for a batch.
+    """
+
+    def __init__(self, backend: Any, max_batch_size: int = 32, max_wait: float = 0.02, workers: int = 1):
+        assert hasattr(backend, "generate"), "backend must have a generate method"
+        assert max_batch_size > 0, "max_batch_size must be greater than 0"
+        assert max_wait >= 0, "max_wait must not be negative"
+        assert workers > 0, "workers must be greater than 0"
+        self.backend = backend
+        self.model_name_or_path = getattr(backend, "model_name_or_path", None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats: Counter = Counter()
+
+        self._pending: List[_Request] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def generate(self, prompts: List[Any]) -> List[Any]:
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        request = _Request(prompts)
+        with self._condition:
+            assert not self._closed, "MicroBatcher is closed"
+            self._pending.append(request)
+            self.stats["requests"] += 1
+            self._condition.notify_all()
+        request.done.wait()
+        if request.started is not None:
+            record("nuggetizer.batch_wait_seconds", request.started - request.arrived)
+        if request.error is not None:
+            raise request.error
+        return request.outputs
+
+    def _size(self) -> int:
+        return sum(len(r.prompts) for r in self._pending)
+
+    def _take(self) -> Optional[List[_Request]]:
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0].arrived + self.max_wait
+            while self._size() < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._pending:
+                    break
+                self._condition.wait(remaining)
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0].prompts) <= self.max_batch_size):
+                request = self._pending.pop(0)
+                batch.append(request)
+                size += len(request.prompts)
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            prompts = [p for request in batch for p in request.prompts]
+            started = time.monotonic()
+            with self._condition:
+                self.stats["batches"] += 1
+                self.stats["prompts"] += len(prompts)
+                self.stats["wait_seconds"] += sum(started - request.arrived for request in batch)
+            for request in batch:
+                request.started = started
+            try:
+                outputs = list(self.backend.generate(prompts))
+                assert len(outputs) == len(prompts), f"backend returned {len(outputs)} outputs for {len(prompts)} prompts"
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+            start = 0
+            for request in batch:
+                request.outputs = outputs[start:start + len(request.prompts)]
+                start += len(request.prompts)
+                request.done.set()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+@dataclass
+class Job:
+    """
+    A job submitted to a ``NuggetService``.
+
+    Attributes:
+        id (str): The job id.
+        kind (str): One of create, score, assign or evaluate.
+        status (str): queued, running, done or failed.
+        total (int): Number of queries in the job.
+        done (int): Number of queries finished.
+        events (List[dict]): Progress events so far, the last being ``done`` or ``failed``.
+        result (List[dict], optional): Output records, once done.
+        error (str, optional): The error, if failed.
+    """
+    id: str
+    kind: str
+    status: str = "queued"
+    total: int = 0
+    done: int = 0
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+    condition: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def emit(self, event: str, status: Optional[str] = None, **kwargs) -> None:
+        with self.condition:
+            # the status changes with its event, so a reader never sees a finished job without its final event
+            if status is not None:
+                self.status = status
+            self.events.append({"event": event, "job": self.id, **kwargs})
+            self.condition.notify_all()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"id": self.id, "kind": self.kind, "status": self.status, "done": self.done,
+                "total": self.total, "error": self.error}
+
+    def iter_events(self, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every event of the job, blocking for new ones until the job finishes.
+        """
+        seen = 0
+        while True:
+            with self.condition:
+                while seen == len(self.events) and not self.finished:
+                    if not self.condition.wait(timeout):
+                        return
+                events = self.events[seen:]
+                finished = self.finished
+            seen += len(events)
+            yield from events
+            if finished and seen == len(self.events):
+                return
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    return json.loads(frame.to_json(orient="records"))
+
+
+class NuggetService:
+    """
+    Runs nuggetization jobs from many clients against one warm ``Nuggetizer``.
+
+    The queries of every running job are processed concurrently on a shared pool, so when the Nuggetizer's
+    backend is a ``MicroBatcher`` their windows are merged into shared backend calls.
+
+    Parameters:
+        nuggetizer (Nuggetizer): The Nuggetizer to run jobs with, usually wrapping a ``MicroBatcher``.
+        max_jobs (int): Jobs run at once; later jobs are queued.
+        max_parallel_queries (int): Queries processed at once across all jobs.
+        max_finished_jobs (int): Finished jobs kept for clients to fetch, oldest dropped first.
+    """
+
+    def __init__(self, nuggetizer, max_jobs: int = 4, max_parallel_queries: int = 32, max_finished_jobs: int = 256):
+        assert max_jobs > 0, "max_jobs must be greater than 0"
+        assert max_parallel_queries > 0, "max_parallel_queries must be greater than 0"
+        self.nuggetizer = nuggetizer
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+        self._jobs = ThreadPoolExecutor(max_jobs, thread_name_prefix="nugget-job")
+        self._queries = ThreadPoolExecutor(max_parallel_queries, thread_name_prefix="nugget-query")
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, kind: str, data: List[Dict[str, Any]], qrels: Optional[List[Dict[str, Any]]] = None) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind (str): create (documents to scored nuggets), score (nuggets to importance), assign (nuggets with
+                answers to assignments) or evaluate (answers and ``qrels`` to per-query and overall metrics).
+            data (List[dict]): The input records, as would be passed to the Nuggetizer as a DataFrame.
+            qrels (List[dict], optional): The nugget qrels, required for evaluate.
+
+        Returns:
+            Job: The queued job.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {JOB_KINDS}, got {kind!r}")
+        if kind == "evaluate" and not qrels:
+            raise ValueError("evaluate jobs need qrels")
+        frame = pd.DataFrame(data)
+        if len(frame) and "qid" not in frame.columns:
+            raise ValueError("data must have a qid field")
+        job = Job(uuid.uuid4().hex, kind, total=frame["qid"].nunique() if len(frame) else 0)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._forget_finished()
+        job.emit("queued", total=job.total)
+        self._jobs.submit(self._run, job, frame, pd.DataFrame(qrels) if qrels else None)
+        return job
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def _run(self, job: Job, frame: pd.DataFrame, qrels: Optional[pd.DataFrame]) -> None:
+        job.emit("running", status="running", total=job.total)
+        started = time.monotonic()
+        try:
+            index = None
+            if job.kind == "evaluate":
+                from pyterrier_nuggetizer.index import NuggetQrelsIndex
+                index = NuggetQrelsIndex(qrels)
+            groups = [group for _, group in frame.groupby("qid", sort=False)] if len(frame) else []
+            futures = [self._queries.submit(self._run_query, job.kind, group, index) for group in groups]
+            outputs = []
+            for group, future in zip(groups, futures):
+                outputs.append(future.result())
+                job.done += 1
+                job.emit("progress", qid=str(group["qid"].iloc[0]), done=job.done, total=job.total)
+            result = pd.concat(outputs, ignore_index=True) if outputs else pd.DataFrame()
+            if job.kind == "evaluate":
+                result = self._metrics(result)
+            job.result = _records(result)
+            job.emit("done", status="done", done=job.done, total=job.total, seconds=time.monotonic() - started)
+        except Exception as e:
+            self.logger.exception(f"Job {job.id} failed")
+            job.error = f"{type(e).__name__}: {e}"
+            job.emit("failed", status="failed", error=job.error)
+
+    def _run_query(self, kind: str, group: pd.DataFrame, index) -> pd.DataFrame:
+        nuggetizer = self.nuggetizer
+        if kind == "create":
+            return nuggetizer.transform(group)
+        if kind == "score":
+            return nuggetizer.score(group)
+        if kind == "assign":
+            return nuggetizer.assign(group)
+        return nuggetizer.assign_to_run(group, index)
+
+    def _metrics(self, assigned: pd.DataFrame) -> pd.DataFrame:
+        nuggetizer = self.nuggetizer
+        assigned = assigned.rename(columns={
+            nuggetizer.importance_field: "importance", nuggetizer.assignment_field: "assignment",
+        })
+        by = ("run_id", "qid") if "run_id" in assigned.columns else ("qid",)
+        scores = calculate_nugget_scores_frame(assigned, by=by)
+        overall = calculate_global_metrics_frame(scores, by=by[:-1])
+        return pd.concat([scores, overall], ignore_index=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def close(self) -> None:
+        self._jobs.shutdown(wait=True)
+        self._queries.shutdown(wait=True)
+
+
+class NuggetServiceServer(ThreadingHTTPServer):
+    """
+    A local HTTP API for a ``NuggetService``.
+
+    Endpoints:
+        POST /jobs: submit ``{"kind": ..., "data": [...], "qrels": [...]}``, returns the job summary (202).
+        GET /jobs/<id>: the job summary.
+        GET /jobs/<id>/events: the job's events as newline-delimited JSON, streamed until it finishes.
+            The final ``done`` event carries the result records.
+        GET /jobs/<id>/result: the result records.
+        GET /health: backend and micro-batching stats.
+
+    Parameters:
+        service (NuggetService): The service to expose.
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 for any free port.
+    """
+    daemon_threads = True
+
+    def __init__(self, service: NuggetService, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _ServiceHandler)
+        self.service = service
+        self._thread = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "NuggetServiceServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    server: NuggetServiceServer
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(format % args)
+
+    def _send(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {"error": {"message": message, "code": status}})
+
+    def _job(self, job_id: str) -> Optional[Job]:
+        job = self.server.service.get(job_id)
+        if job is None:
+            self._error(404, f"no job {job_id}")
+        return job
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._error(404, "not found")
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.service.submit(request.get("kind"), request.get("data", []), request.get("qrels"))
+        except (json.JSONDecodeError, ValueError) as e:
+            return self._error(400, str(e))
+        self._send(202, job.summary())
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["health"]:
+            nuggetizer = self.server.service.nuggetizer
+            batcher = nuggetizer.backend if isinstance(nuggetizer.backend, MicroBatcher) else None
+            return self._send(200, {
+                "model": getattr(nuggetizer.backend, "model_name_or_path", None),
+                "jobs": Counter(job.status for job in list(self.server.service.jobs.values())),
+                "batching": dict(batcher.stats) if batcher is not None else None,
+                "stats": {stage: dict(counter) for stage, counter in nuggetizer.stats.items()},
+            })
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._error(404, "not found")
+        job = self._job(parts[1])
+        if job is None:
+            return
+        if len(parts) == 2:
+            return self._send(200, job.summary())
+        if parts[2:] == ["result"]:
+            if job.status != "done":
+                return self._error(409, f"job is {job.status}")
+            return self._send(200, job.result)
+        if parts[2:] == ["events"]:
+            return self._stream(job)
+        self._error(404, "not found")
+
+    def _stream(self, job: Job) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for event in job.iter_events():
+            if event["event"] == "done":
+                event = {**event, "result": job.result}
+            self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class NuggetServiceClient:
+    """
+    Client for a ``NuggetServiceServer``.
+
+    Parameters:
+        base_url (str): The server's address, e.g. http://127.0.0.1:8100.
+        timeout (float, optional): Socket timeout in seconds.
+    """
+
+    def __init__(self, base_url: str, timeout: Optional[float] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _get(self, path: str):
+        with urllib.request.urlopen(self.base_url + path, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def submit(self, kind: str, data: pd.DataFrame, qrels: Optional[pd.DataFrame] = None) -> str:
+        body = {"kind": kind, "data": _records(data)}
+        if qrels is not None:
+            body["qrels"] = _records(qrels)
+        request = urllib.request.Request(
+            self.base_url + "/jobs",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["id"]
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        return self._get(f"/jobs/{job_id}")
+
+    def events(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        with urllib.request.urlopen(f"{self.base_url}/jobs/{job_id}/events", timeout=self.timeout) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def result(self, job_id: str) -> pd.DataFrame:
+        return pd.DataFrame(self._get(f"/jobs/{job_id}/result"))
+
+    def run(self, kind: str, data: pd.DataFrame, qrels: Optional[pd.DataFrame] = None, progress=None) -> pd.DataFrame:
+        """
+        Submit a job and wait for its result, passing each progress event to ``progress`` if given.
+        """
+        job_id = self.submit(kind, data, qrels)
+        for event in self.events(job_id):
+            if progress is not None:
+                progress(event)
+            if event["event"] == "failed":
+                raise RuntimeError(f"job {job_id} failed: {event['error']}")
+            if event["event"] == "done":
+                return pd.DataFrame(event["result"])
+        return self.result(job_id)
+
+
+__all__ = ["JOB_KINDS", "MicroBatcher", "Job", "NuggetService", "NuggetServiceServer", "NuggetServiceClient"]
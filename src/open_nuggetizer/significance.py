@@ -0,0 +1,164 @@
+from itertools import combinations
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+
+Matrix = Union[pd.DataFrame, np.ndarray]
+
+
+def metric_matrix(
+    scores: pd.DataFrame,
+    metric: str,
+    system: str = "run_id",
+    query: str = "qid",
+) -> pd.DataFrame:
+    """
+    Pivot per-query scores into a systems x queries matrix, keeping only queries scored for every system.
+
+    Args:
+        scores (pd.DataFrame): Long-format scores, e.g. ``calculate_nugget_scores_frame(..., by=("run_id", "qid"))``.
+        metric (str): Column holding the metric to compare, e.g. 'vital_score'.
+        system (str): Column identifying the system.
+        query (str): Column identifying the query.
+
+    Returns:
+        pd.DataFrame: One row per system and one column per query.
+    """
+    scores = scores[scores[query] != "all"]
+    matrix = scores.pivot_table(index=system, columns=query, values=metric, aggfunc="mean", sort=False)
+    return matrix.dropna(axis=1)
+
+
+def _as_array(matrix: Matrix) -> Tuple[np.ndarray, List]:
+    if isinstance(matrix, pd.DataFrame):
+        return matrix.to_numpy(dtype=np.float64), list(matrix.index)
+    values = np.asarray(matrix, dtype=np.float64)
+    return values, list(range(values.shape[0]))
+
+
+def _pairs(systems: List, pairs: Optional[Sequence[Tuple]]) -> List[Tuple[int, int]]:
+    if pairs is None:
+        return list(combinations(range(len(systems)), 2))
+    position = {s: i for i, s in enumerate(systems)}
+    return [(position[a], position[b]) for a, b in pairs]
+
+
+def _batches(n_resamples: int, batch_size: int) -> Iterator[int]:
+    for start in range(0, n_resamples, batch_size):
+        yield min(batch_size, n_resamples - start)
+
+
+def _bootstrap_means(
+    values: np.ndarray,
+    n_resamples: int,
+    rng: np.random.Generator,
+    batch_size: int,
+) -> np.ndarray:
+    # each resample is a vector of per-query counts, so the resampled means of every row are one matmul
+    n_queries = values.shape[1]
+    means = [
+        values @ rng.multinomial(n_queries, np.full(n_queries, 1.0 / n_queries), size=size).T / n_queries
+        for size in _batches(n_resamples, batch_size)
+    ]
+    return np.concatenate(means, axis=1)
+
+
+def bootstrap_intervals(
+    matrix: Matrix,
+    n_resamples: int = 10000,
+    alpha: float = 0.05,
+    seed: Optional[int] = None,
+    batch_size: int = 1000,
+) -> pd.DataFrame:
+    """
+    Percentile bootstrap confidence intervals on the mean score of every system.
+
+    Args:
+        matrix (pd.DataFrame | np.ndarray): Systems x queries scores.
+        n_resamples (int): Number of bootstrap resamples of the queries.
+        alpha (float): Significance level, giving a (1 - alpha) interval.
+        seed (int, optional): Seed for reproducible resampling.
+        batch_size (int): Resamples drawn at once, bounding memory use.
+
+    Returns:
+        pd.DataFrame: system, mean, ci_low and ci_high columns.
+    """
+    assert n_resamples > 0, "n_resamples must be greater than 0"
+    assert 0 < alpha < 1, "alpha must be between 0 and 1"
+    values, systems = _as_array(matrix)
+    rng = np.random.default_rng(seed)
+    means = _bootstrap_means(values, n_resamples, rng, batch_size)
+    low, high = np.quantile(means, [alpha / 2, 1 - alpha / 2], axis=1)
+    return pd.DataFrame({
+        "system": systems,
+        "mean": values.mean(axis=1),
+        "ci_low": low,
+        "ci_high": high,
+    })
+
+
+def paired_tests(
+    matrix: Matrix,
+    pairs: Optional[Sequence[Tuple]] = None,
+    n_resamples: int = 10000,
+    alpha: float = 0.05,
+    seed: Optional[int] = None,
+    batch_size: int = 1000,
+) -> pd.DataFrame:
+    """
+    Paired bootstrap and randomisation (sign-flip) tests between systems, batched over all pairs.
+
+    Every pair is tested on the same resamples, so results are reproducible for a given seed and
+    the cost is one matrix product per batch of resamples rather than a loop per pair.
+
+    Args:
+        matrix (pd.DataFrame | np.ndarray): Systems x queries scores, e.g. from ``metric_matrix``.
+        pairs (Sequence[Tuple], optional): Pairs of systems to compare, all pairs if None.
+        n_resamples (int): Number of resamples for each test.
+        alpha (float): Significance level, giving a (1 - alpha) interval on the difference.
+        seed (int, optional): Seed for reproducible resampling.
+        batch_size (int): Resamples drawn at once, bounding memory use.
+
+    Returns:
+        pd.DataFrame: One row per pair with system_a, system_b, mean_a, mean_b, delta (mean_a - mean_b),
+        ci_low and ci_high (bootstrap interval on delta), p_bootstrap and p_randomization (two-sided).
+    """
+    assert n_resamples > 0, "n_resamples must be greater than 0"
+    assert 0 < alpha < 1, "alpha must be between 0 and 1"
+    values, systems = _as_array(matrix)
+    index = _pairs(systems, pairs)
+    columns = ["system_a", "system_b", "mean_a", "mean_b", "delta", "ci_low", "ci_high", "p_bootstrap", "p_randomization"]
+    if not index:
+        return pd.DataFrame(columns=columns)
+    a, b = np.array(index).T
+    diffs = values[a] - values[b]
+    n_queries = diffs.shape[1]
+    delta = diffs.mean(axis=1)
+    rng = np.random.default_rng(seed)
+
+    boot = _bootstrap_means(diffs, n_resamples, rng, batch_size)
+    low, high = np.quantile(boot, [alpha / 2, 1 - alpha / 2], axis=1)
+    # shift method: how often a resample under the null (centred on 0) is at least as extreme as delta
+    p_bootstrap = (np.abs(boot - delta[:, None]) >= np.abs(delta)[:, None] - 1e-12).mean(axis=1)
+
+    extreme = np.zeros(len(index), dtype=np.int64)
+    for size in _batches(n_resamples, batch_size):
+        signs = rng.integers(0, 2, size=(size, n_queries), dtype=np.int8) * 2 - 1
+        flipped = diffs @ signs.T.astype(np.float64) / n_queries
+        extreme += (np.abs(flipped) >= np.abs(delta)[:, None] - 1e-12).sum(axis=1)
+    p_randomization = (extreme + 1) / (n_resamples + 1)
+
+    return pd.DataFrame({
+        "system_a": [systems[i] for i in a],
+        "system_b": [systems[i] for i in b],
+        "mean_a": values[a].mean(axis=1),
+        "mean_b": values[b].mean(axis=1),
+        "delta": delta,
+        "ci_low": low,
+        "ci_high": high,
+        "p_bootstrap": p_bootstrap,
+        "p_randomization": p_randomization,
+    }, columns=columns)
+
+
+__all__ = ["metric_matrix", "bootstrap_intervals", "paired_tests"]
@@ -0,0 +1,202 @@
+import json
+import bisect
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+
+INDEX_METADATA_KEY = b"pyterrier_nuggetizer.qid_index"
+ESSENTIAL_COLUMNS = ["qid", "nugget_id", "nugget"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for the nugget store, install it with `pip install pyarrow`") from e
+
+
+def _format(path: str, format: Optional[str]) -> str:
+    if format is None:
+        format = "parquet" if str(path).endswith(".parquet") else "arrow"
+    assert format in ("arrow", "parquet"), "format must be arrow or parquet"
+    return format
+
+
+def save_nugget_store(
+    nuggets: pd.DataFrame, file: str, format: Optional[str] = None, row_group_size: int = 10_000
+) -> None:
+    """
+    Save nuggets or qrels to a columnar store, grouped by qid with a qid -> row-range index.
+
+    Arrow IPC files (the default) are uncompressed so they can be memory-mapped; Parquet files are
+    smaller at rest. The qid column is dictionary-encoded and the index is kept in the schema metadata.
+    Unlike ``save_nuggets``, nugget text may contain tabs and newlines, and only the columns of ``nuggets``
+    are stored.
+
+    Args:
+        nuggets (pd.DataFrame): DataFrame containing at least qid, nugget_id and nugget columns.
+        file (str): Path to the output file.
+        format (str, optional): arrow or parquet, inferred from the file extension if None.
+        row_group_size (int): Rows per Parquet row group, the unit read when loading some topics.
+    """
+    pa = _pyarrow()
+    format = _format(file, format)
+    columns = nuggets.columns
+    if any([x not in columns for x in ESSENTIAL_COLUMNS]):
+        raise ValueError(
+            f"Require at least {ESSENTIAL_COLUMNS} columns to save, found {list(columns)}"
+        )
+
+    assert row_group_size > 0, "row_group_size must be greater than 0"
+    nuggets = nuggets.copy()
+    nuggets["qid"] = nuggets["qid"].astype(str)
+    order = {qid: i for i, qid in enumerate(pd.unique(nuggets["qid"]))}
+    nuggets = nuggets.sort_values("qid", key=lambda x: x.map(order), kind="stable").reset_index(drop=True)
+
+    index: Dict[str, Tuple[int, int]] = {}
+    sizes = nuggets.groupby("qid", sort=False).size()
+    start = 0
+    for qid, size in sizes.items():
+        index[qid] = (start, start + int(size))
+        start += int(size)
+
+    table = pa.Table.from_pandas(nuggets, preserve_index=False)
+    position = table.schema.get_field_index("qid")
+    table = table.set_column(position, "qid", table.column("qid").dictionary_encode())
+    metadata = dict(table.schema.metadata or {})
+    metadata[INDEX_METADATA_KEY] = json.dumps(index).encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, file, row_group_size=row_group_size)
+    else:
+        with pa.OSFile(str(file), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+class NuggetStore:
+    """
+    Read-only view over a columnar nugget store written by ``save_nugget_store``.
+
+    Arrow IPC files are memory-mapped, so opening a store and slicing topics out of it does not copy
+    the underlying buffers; only the requested topics are converted to pandas. For Parquet files, only the
+    row groups holding the requested topics are read.
+
+    Parameters:
+        file (str): Path to the store.
+        format (str, optional): arrow or parquet, inferred from the file extension if None.
+    """
+
+    def __init__(self, file: str, format: Optional[str] = None):
+        pa = _pyarrow()
+        self.file = file
+        self.format = _format(file, format)
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+            self._parquet = pq.ParquetFile(file, memory_map=True)
+            schema = self._parquet.schema_arrow
+            metadata = self._parquet.metadata
+            sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+            self._row_group_starts = list(accumulate(sizes, initial=0))
+            self._table = None
+        else:
+            self._source = pa.memory_map(str(file), "r")
+            self._table = pa.ipc.open_file(self._source).read_all()
+            schema = self._table.schema
+        raw = (schema.metadata or {}).get(INDEX_METADATA_KEY)
+        if raw is None:
+            raise ValueError(f"{file} is not a nugget store, missing qid index")
+        self.index: Dict[str, Tuple[int, int]] = {qid: tuple(r) for qid, r in json.loads(raw).items()}
+
+    @property
+    def qids(self) -> List[str]:
+        return list(self.index.keys())
+
+    def __len__(self) -> int:
+        return max((stop for _, stop in self.index.values()), default=0)
+
+    def __contains__(self, qid: str) -> bool:
+        return str(qid) in self.index
+
+    def table(self, qids: Optional[Iterable[str]] = None):
+        """
+        The rows of the requested topics (all topics if None) as a ``pyarrow.Table``.
+        """
+        pa = _pyarrow()
+        if qids is None:
+            return self._parquet.read() if self.format == "parquet" else self._table
+        ranges = [self.index[str(q)] for q in qids if str(q) in self.index]
+        if self.format == "parquet":
+            if not ranges:
+                return self._parquet.schema_arrow.empty_table()
+            table, ranges = self._read_row_groups(ranges)
+        else:
+            table = self._table
+        if not ranges:
+            return table.slice(0, 0)
+        return pa.concat_tables([table.slice(start, stop - start) for start, stop in ranges])
+
+    def _read_row_groups(self, ranges: List[Tuple[int, int]]):
+        """
+        Read the Parquet row groups overlapping ``ranges``, returning them as one table along with
+        ``ranges`` shifted to positions within it.
+        """
+        starts = self._row_group_starts
+        groups = sorted({
+            group for start, stop in ranges
+            for group in range(bisect.bisect_right(starts, start) - 1, bisect.bisect_left(starts, stop))
+        })
+        offsets, position = {}, 0
+        for group in groups:
+            offsets[group] = position - starts[group]
+            position += starts[group + 1] - starts[group]
+        table = self._parquet.read_row_groups(groups)
+        # the groups overlapping one range are consecutive, so a range stays contiguous in the table
+        shifted = []
+        for start, stop in ranges:
+            offset = offsets[bisect.bisect_right(starts, start) - 1]
+            shifted.append((start + offset, stop + offset))
+        return table, shifted
+
+    def load(self, qids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        The rows of the requested topics (all topics if None) as a DataFrame.
+        """
+        frame = self.table(qids).to_pandas()
+        if "qid" in frame.columns:
+            frame["qid"] = frame["qid"].astype(str)
+        return frame
+
+    def close(self) -> None:
+        if self.format == "arrow":
+            self._table = None
+            self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_nugget_store(file: str, qids: Optional[Iterable[str]] = None, format: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load nuggets from a columnar store, optionally only for some topics.
+
+    Args:
+        file (str): Path to the store.
+        qids (Iterable[str], optional): Topics to load, all if None.
+        format (str, optional): arrow or parquet, inferred from the file extension if None.
+
+    Returns:
+        pd.DataFrame: DataFrame containing nuggets.
+    """
+    with NuggetStore(file, format) as store:
+        return store.load(qids)
+
+
+__all__ = ["save_nugget_store", "load_nugget_store", "NuggetStore"]
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import contextlib
+import contextvars
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+SCOPE_NAME = "pyterrier_nuggetizer"
+
+_current: contextvars.ContextVar = contextvars.ContextVar("nuggetizer_span", default=None)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+def prompt_hash(prompt: Any) -> str:
+    """
+    A short stable hash of a prompt (a string or a list of chat messages).
+    """
+    text = prompt if isinstance(prompt, str) else json.dumps(prompt, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _unvalue(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [_unvalue(v) for v in value["arrayValue"].get("values", [])]
+    for key in ("stringValue", "doubleValue", "boolValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+class Span:
+    """
+    A timed operation within a trace, with attributes following the OpenTelemetry data model.
+
+    Attributes:
+        name (str): The span name, e.g. 'nuggetizer.generate'.
+        trace_id (str): 32 hex digits shared by every span of a trace.
+        span_id (str): 16 hex digits.
+        parent_id (str, optional): The span_id of the enclosing span.
+        attributes (Dict[str, Any]): The span attributes.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.error: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def set(self, key: str, value: Any) -> None:
+        if value is not None:
+            with self.lock:
+                self.attributes[key] = value
+
+    def add(self, key: str, value: float) -> None:
+        with self.lock:
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_CLIENT" if self.name.endswith(".generate") else "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end if self.end is not None else time.time_ns()),
+            "attributes": [{"key": k, "value": _value(v)} for k, v in self.attributes.items()],
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_OK"},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, value: float) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def record(key: str, value: float) -> None:
+    """
+    Add ``value`` to attribute ``key`` of the current span, if any (e.g. queue time, retries).
+    """
+    span = _current.get()
+    if span is not None:
+        span.add(key, value)
+
+
+class Tracer:
+    """
+    Records nested spans (run, stage, query and generate) and exports them as JSON lines.
+
+    Each line is an OTLP/JSON ``{"resourceSpans": [...]}`` document holding one finished span, as written by the
+    OpenTelemetry Collector's file exporter, so the file can be replayed into a collector (``otlpjsonfile``
+    receiver) and viewed in Jaeger or Tempo, or read back with ``load_spans``.
+
+    Parameters:
+        path (str, optional): File to append spans to. If None, finished spans are only kept in ``spans``.
+        service_name (str): The ``service.name`` resource attribute.
+        keep (bool): Whether to keep finished spans in memory, in ``spans``.
+    """
+
+    def __init__(self, path: Optional[str] = None, service_name: str = "pyterrier-nuggetizer", keep: bool = None):
+        self.path = path
+        self.service_name = service_name
+        self.keep = keep if keep is not None else path is None
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path is not None else None
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Open a span as a child of the current span (or as a new trace) for the enclosed block.
+        """
+        span = Span(name, _current.get(), {k: v for k, v in attributes.items() if v is not None})
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            span.end = time.time_ns()
+            self._export(span)
+
+    def _export(self, span: Span) -> None:
+        with self.lock:
+            if self.keep:
+                self.spans.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps({"resourceSpans": [{
+                    "resource": {"attributes": [{"key": "service.name", "value": _value(self.service_name)}]},
+                    "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp()]}],
+                }]}) + "\n")
+                self._file.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_spans(path: Union[str, os.PathLike]) -> List[Dict[str, Any]]:
+    """
+    Read the spans of a trace file written by ``Tracer`` (or any OTLP/JSON lines file) into flat records.
+
+    Returns:
+        List[dict]: One record per span with name, trace_id, span_id, parent_id, start and end (ns), duration (s),
+        status and the span attributes.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line).get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    for span in scope.get("spans", []):
+                        start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                        record = {
+                            "name": span["name"],
+                            "trace_id": span["traceId"],
+                            "span_id": span["spanId"],
+                            "parent_id": span.get("parentSpanId"),
+                            "start": start,
+                            "end": end,
+                            "duration": (end - start) / 1e9,
+                            "status": span.get("status", {}).get("code"),
+                        }
+                        record.update({a["key"]: _unvalue(a["value"]) for a in span.get("attributes", [])})
+                        records.append(record)
+    return records
+
+
+__all__ = ["Span", "NOOP_SPAN", "Tracer", "current_span", "record", "prompt_hash", "load_spans"]
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer._types import NuggetAssignMode
+
+
+class GradedBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.prompts = []
+
+    def generate(self, prompts):
+        self.prompts.extend(prompts)
+        outputs = []
+        for prompt in prompts:
+            if "partial_support" in prompt:
+                outputs.append(SimpleNamespace(text='["support", "partial_support", "not_support"]'))
+            else:
+                outputs.append(SimpleNamespace(text='["support", "support", "not_support"]'))
+        return outputs
+
+
+def make_inputs():
+    run = pd.DataFrame({"qid": ["1", "2"], "query": ["q1", "q2"], "qanswer": ["a1", "a2"]})
+    qrels = pd.DataFrame({
+        "qid": ["1", "1", "1", "2", "2", "2"],
+        "nugget_id": ["1_1", "1_2", "1_3", "2_1", "2_2", "2_3"],
+        "nugget": ["n1", "n2", "n3", "n4", "n5", "n6"],
+        "importance": [1, 0, 1, 1, 1, 0],
+    })
+    return run, qrels
+
+
+def test_derive_assignments():
+    labels = np.array([2, 1, 0, -1], dtype=np.int8)
+    assert NuggetAssignMode.SUPPORT_GRADE_2.derive(labels, NuggetAssignMode.SUPPORT_GRADE_3).tolist() == [2, 0, 0, -1]
+    assert NuggetAssignMode.SUPPORT_GRADE_3.derive(labels, NuggetAssignMode.SUPPORT_GRADE_3).tolist() == [2, 1, 0, -1]
+    assert NuggetAssignMode.finest() == NuggetAssignMode.SUPPORT_GRADE_3
+    assert NuggetAssignMode.finest([NuggetAssignMode.SUPPORT_GRADE_2]) == NuggetAssignMode.SUPPORT_GRADE_2
+
+
+def test_assign_modes_judges_once():
+    run, qrels = make_inputs()
+    backend = GradedBackend()
+    nug = Nuggetizer(backend, window_size=10)
+    out = nug.assign_modes(run, qrels)
+    assert len(backend.prompts) == 2
+    assert out["assignment_support_grade_3"].tolist() == [2, 1, 0] * 2
+    assert out["assignment_support_grade_2"].tolist() == [2, 0, 0] * 2
+    assert out["assignment"].tolist() == out["assignment_support_grade_3"].tolist()
+    assert nug.stats["assigner"]["derived"] == 6
+
+
+def test_assign_modes_rejudges_on_request():
+    run, qrels = make_inputs()
+    backend = GradedBackend()
+    nug = Nuggetizer(backend, window_size=10)
+    out = nug.assign_modes(run, qrels, rejudge=True)
+    assert len(backend.prompts) == 4
+    assert sum("partial_support" not in p for p in backend.prompts) == 2
+    assert out["assignment_support_grade_2"].tolist() == [2, 2, 0] * 2
+    # the default assigner is unaffected by the grade-3 assigner built alongside it
+    assert nug.assigner.mode == NuggetAssignMode.SUPPORT_GRADE_2
@@ -1,4 +1,5 @@
 import pytest
+from types import SimpleNamespace
 import pandas as pd
 from pyterrier_nuggetizer import Nuggetizer
 from pyterrier_nuggetizer.nuggetizer import NuggetAssigner
@@ -47,3 +48,42 @@ def test_assigner_grade3(scored_df):
     assigner = NuggetAssigner(nug)
     df_out = assigner.transform(scored_df)
     assert df_out["assignment"].tolist() == [2, 0, 1]
+
+
+class ContainsBackend:
+    """Supports a nugget when it appears in the answer, with one nugget per window."""
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.calls = 0
+
+    def generate(self, prompts):
+        self.calls += 1
+        prompt = prompts[0]
+        answer = prompt.split("Passage: ")[1].split("\n")[0] if "Passage: " in prompt else prompt
+        nugget = prompt.split("Nugget List: [")[-1].split("]")[0].strip("'\"")
+        return [SimpleNamespace(text='["support"]' if nugget in answer else '["not_support"]')]
+
+
+def test_assign_to_run_per_answer():
+    run = pd.DataFrame({
+        "qid": ["Q1", "Q1", "Q2"],
+        "query": ["q1", "q1", "q2"],
+        "qanswer": ["mentions n1", "mentions n2", "mentions n3"],
+        "run_id": ["a", "b", "a"],
+    })
+    qrels = pd.DataFrame({
+        "qid": ["Q1", "Q2", "Q1"],
+        "nugget_id": ["Q1_1", "Q2_1", "Q1_2"],
+        "nugget": ["n1", "n3", "n2"],
+        "importance": [1, 1, 0],
+    })
+    backend = ContainsBackend()
+    nug = Nuggetizer(backend, window_size=1)
+    out = nug.assign_to_run(run, qrels)
+    assert backend.calls == 5
+    assert out["run_id"].tolist() == ["a", "a", "b", "b", "a"]
+    assert out["nugget_id"].tolist() == ["Q1_1", "Q1_2", "Q1_1", "Q1_2", "Q2_1"]
+    assert out["assignment"].tolist() == [2, 0, 0, 2, 2]
+    # merged input gives the same labels through the assigner, one answer at a time
+    merged = run.merge(qrels, on="qid").sort_values(["qid", "run_id"], kind="stable")
+    assert NuggetAssigner(nug).transform(merged)["assignment"].tolist() == [2, 0, 0, 2, 2]
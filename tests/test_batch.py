@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from pyterrier_nuggetizer.batch import NuggetBatch, MISSING_LABEL
+from pyterrier_nuggetizer.index import NuggetQrelsIndex
+
+
+def make_run():
+    return pd.DataFrame({
+        "qid": ["Q1", "Q1", "Q2", "Q3"],
+        "query": ["q1", "q1", "q2", "q3"],
+        "qanswer": ["long answer a" * 100, "long answer b" * 100, "answer c", "no nuggets"],
+        "run_id": ["a", "b", "a", "a"],
+    })
+
+
+def make_qrels():
+    return NuggetQrelsIndex(pd.DataFrame({
+        "qid": ["Q1", "Q2", "Q1"],
+        "nugget_id": ["Q1_1", "Q2_1", "Q1_2"],
+        "nugget": ["n1", "n3", "n2"],
+        "importance": [1, 0, 0],
+    }))
+
+
+def test_from_run():
+    batch = NuggetBatch.from_run(make_run(), make_qrels())
+    assert batch.num_groups == 3
+    assert batch.qids == ["Q1", "Q2"]
+    assert batch.qid_codes.tolist() == [0, 0, 1]
+    assert batch.offsets.tolist() == [0, 2, 4, 5]
+    assert batch.nugget_ids == ["Q1_1", "Q1_2", "Q1_1", "Q1_2", "Q2_1"]
+    assert batch.importance.dtype == np.int8
+    assert (batch.assignment == MISSING_LABEL).all()
+    assert batch.extra["run_id"] == ["a", "b", "a"]
+
+
+def test_to_frame():
+    batch = NuggetBatch.from_run(make_run(), make_qrels())
+    batch = batch.with_assignment(np.array([2, 0, 1, 2, 0]))
+    frame = batch.to_frame()
+    assert frame["run_id"].tolist() == ["a", "a", "b", "b", "a"]
+    assert frame["assignment"].tolist() == [2, 0, 1, 2, 0]
+    assert len(batch.answers) == batch.num_groups
+    assert batch.as_dict_of_dict() == {"Q1": {"Q1_1": 1, "Q1_2": 2}, "Q2": {"Q2_1": 0}}
+
+    again = NuggetBatch.from_frame(frame)
+    assert again.offsets.tolist() == batch.offsets.tolist()
+    assert again.extra["run_id"] == ["a", "b", "a"]
+    pd.testing.assert_frame_equal(again.to_frame(), frame)
+
+
+def test_take():
+    batch = NuggetBatch.from_run(make_run(), make_qrels())
+    second = batch.take([2, 1])
+    assert second.offsets.tolist() == [0, 1, 3]
+    assert second.nugget_ids == ["Q2_1", "Q1_1", "Q1_2"]
+    assert [second.qid(g) for g in second] == ["Q2", "Q1"]
+    assert second.answers[1].startswith("long answer b")
@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.chunked import ChunkWriter, iter_run_chunks, qid_chunks
+from pyterrier_nuggetizer.docstore import DictDocumentStore
+from pyterrier_nuggetizer.index import NuggetQrelsIndex
+
+
+class BatchBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.batches = []
+
+    def generate(self, prompts):
+        self.batches.append(len(prompts))
+        outputs = []
+        for prompt in prompts:
+            if "NuggetizeLLM" in prompt:
+                outputs.append(SimpleNamespace(text='["nugget1", "nugget2"]'))
+            elif "NuggetizeScoreLLM" in prompt:
+                outputs.append(SimpleNamespace(text='["vital", "okay"]'))
+            else:
+                outputs.append(SimpleNamespace(text='["support", "not_support"]'))
+        return outputs
+
+
+def test_qid_chunks_keeps_queries_whole():
+    frames = [
+        pd.DataFrame({"qid": ["1", "1", "2"], "x": [0, 1, 2]}),
+        pd.DataFrame({"qid": ["2", "3"], "x": [3, 4]}),
+        pd.DataFrame({"qid": ["3", "4"], "x": [5, 6]}),
+    ]
+    chunks = list(qid_chunks(frames, chunk_size=2))
+    assert [c["qid"].tolist() for c in chunks] == [["1", "1"], ["2", "2"], ["3", "3"], ["4"]]
+    assert [c["qid"].iloc[0] for c in qid_chunks(frames)] == ["1", "2", "3", "4"]
+    assert pd.concat(chunks)["x"].tolist() == list(range(7))
+    with pytest.raises(ValueError):
+        list(qid_chunks([pd.DataFrame({"qid": ["1", "2"]}), pd.DataFrame({"qid": ["1"]})], chunk_size=1))
+
+
+def test_iter_run_chunks_formats(tmp_path):
+    run = tmp_path / "run.txt"
+    run.write_text("".join(f"{q} Q0 D{q}{r} {r} {10 - r} bm25\n" for q in (1, 2, 3) for r in range(3)))
+    chunks = list(iter_run_chunks(run, chunk_size=4))
+    assert [c["qid"].unique().tolist() for c in chunks] == [["1", "2"], ["3"]]
+    assert chunks[0]["docno"].tolist()[:2] == ["D10", "D11"]
+
+    frame = pd.concat(chunks, ignore_index=True)
+    frame.to_parquet(tmp_path / "run.parquet")
+    frame.to_json(tmp_path / "run.jsonl", orient="records", lines=True)
+    for path in (tmp_path / "run.parquet", tmp_path / "run.jsonl"):
+        chunks = list(iter_run_chunks(path, chunk_size=None))
+        assert [c["qid"].iloc[0] for c in chunks] == ["1", "2", "3"]
+        assert sum(len(c) for c in chunks) == 9
+
+
+def test_transform_chunked_creates_with_batching(tmp_path):
+    run = tmp_path / "run.txt"
+    run.write_text("".join(f"{q} Q0 D{q}{r} {r} {10 - r} bm25\n" for q in range(6) for r in range(2)))
+    topics = pd.DataFrame({"qid": [str(q) for q in range(6)], "query": [f"query {q}" for q in range(6)]})
+    store = DictDocumentStore({f"D{q}{r}": f"text {q} {r}" for q in range(6) for r in range(2)})
+    backend = BatchBackend()
+    nug = Nuggetizer(backend, window_size=2, document_store=store)
+    summary = nug.transform_chunked(
+        str(run), str(tmp_path / "nuggets.parquet"), topics=topics, chunk_size=6, max_wait=0.2,
+    )
+    assert summary == {"chunks": 2, "queries": 6, "rows": 12}
+    assert nug.backend is backend
+    # windows of the queries in a chunk share backend calls
+    assert max(backend.batches) > 1
+
+    nuggets = pd.read_parquet(tmp_path / "nuggets.parquet")
+    assert nuggets["qid"].tolist() == [str(q) for q in range(6) for _ in range(2)]
+    assert nuggets["importance"].tolist() == [1, 0] * 6
+
+
+def test_transform_chunked_assigns_with_saved_index(tmp_path):
+    qrels = pd.DataFrame({
+        "qid": ["1", "1", "2"], "nugget_id": ["1_1", "1_2", "2_1"], "nugget": ["n1", "n2", "n3"],
+        "importance": [1, 0, 1],
+    })
+    NuggetQrelsIndex(qrels).save(tmp_path / "qrels")
+    run = pd.DataFrame({"qid": ["1", "2"], "query": ["q1", "q2"], "qanswer": ["a1", "a2"]})
+    nug = Nuggetizer(BatchBackend(), window_size=2)
+    with ChunkWriter(tmp_path / "assignments.jsonl") as writer:
+        summary = nug.transform_chunked([run], writer, qrels=str(tmp_path / "qrels"), chunk_size=None,
+                                        max_parallel_queries=1)
+    assert summary == {"chunks": 2, "queries": 2, "rows": 3}
+    assigned = pd.read_json(tmp_path / "assignments.jsonl", lines=True, dtype={"qid": str})
+    expected = nug.assign_to_run(run, qrels)
+    assert assigned["assignment"].tolist() == expected["assignment"].tolist()
+
+
+def test_transform_chunked_leaves_shared_instance_alone(tmp_path):
+    import threading
+    run = tmp_path / "run.txt"
+    run.write_text("".join(f"{q} Q0 D{q}{r} {r} {10 - r} bm25\n" for q in range(4) for r in range(2)))
+    topics = pd.DataFrame({"qid": [str(q) for q in range(4)], "query": [f"query {q}" for q in range(4)]})
+    store = DictDocumentStore({f"D{q}{r}": f"text {q} {r}" for q in range(4) for r in range(2)})
+    backend = BatchBackend()
+    nug = Nuggetizer(backend, window_size=2, document_store=store)
+    docs = pd.DataFrame({"qid": ["9"], "query": ["q9"], "docno": ["D00"]})
+    errors, stop = [], threading.Event()
+
+    def other_user():
+        # concurrent use of the same instance must keep working during and after the chunked transform
+        while not stop.is_set():
+            try:
+                nug.create(docs)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=other_user)
+    thread.start()
+    try:
+        nug.transform_chunked(str(run), str(tmp_path / "nuggets.jsonl"), topics=topics, chunk_size=4)
+    finally:
+        stop.set()
+        thread.join()
+    assert errors == []
+    assert nug.backend is backend
+    assert len(nug.create(docs)) == 2
+
+
+def test_tsv_output_refuses_indistinguishable_rows(tmp_path):
+    assigned = pd.DataFrame({
+        "qid": ["1", "1"], "run_id": ["a", "b"], "nugget_id": ["1_1", "1_1"], "nugget": ["n1", "n1"],
+        "importance": [1, 1], "assignment": [2, 0],
+    })
+    with ChunkWriter(tmp_path / "out.tsv") as writer:
+        with pytest.raises(ValueError):
+            writer.write(assigned)
+        with pytest.raises(ValueError):
+            writer.write(assigned.drop(columns=["run_id"]))
+        writer.write(assigned.iloc[:1].drop(columns=["run_id"]))
+    with ChunkWriter(tmp_path / "out.jsonl") as writer:
+        writer.write(assigned)
+    assert pd.read_json(tmp_path / "out.jsonl", lines=True)["run_id"].tolist() == ["a", "b"]
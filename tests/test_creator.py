@@ -28,3 +28,59 @@ def test_creator_basic(simple_df):
     row = df_out.iloc[0]
     assert df_out["nugget"].tolist() == ["alpha", "beta"]
     assert df_out["nugget_id"].tolist() == ["Q1_1", "Q1_2"]
+
+
+class DummyImportanceBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+
+    def generate(self, prompts):
+        return [SimpleNamespace(text='[("alpha", "vital"), ("beta", "okay")]')]
+
+
+def test_creator_with_importance(simple_df):
+    backend = DummyImportanceBackend()
+    nug = Nuggetizer(backend, max_nuggets=2, window_size=1, creator_importance=True)
+    creator = NuggetCreator(nug)
+    df_out = creator.transform(simple_df)
+    assert df_out["nugget"].tolist() == ["alpha", "beta"]
+    assert df_out["importance"].tolist() == [1, 0]
+
+
+class GrowingBackend:
+    """Adds a nugget for documents mentioning 'new', otherwise returns the nugget list unchanged."""
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.calls = 0
+        self.prompts = 0
+
+    def generate(self, prompts):
+        self.calls += 1
+        self.prompts += len(prompts)
+        outputs = []
+        for prompt in prompts:
+            nuggets = eval(prompt.split("Initial Nugget List: ")[1].split("\n")[0])
+            document = prompt.split("[1] ")[1].split("\n")[0]
+            if "new" in document:
+                nuggets = nuggets + [document]
+            outputs.append(SimpleNamespace(text=repr(nuggets)))
+        return outputs
+
+
+def test_creator_speculative_matches_serial():
+    texts = ["d1", "new d2", "d3", "d4", "d5", "new d6"]
+    df = pd.DataFrame([{"qid": "Q1", "query": "test", "text": t} for t in texts])
+
+    serial_backend = GrowingBackend()
+    serial = NuggetCreator(Nuggetizer(serial_backend, max_nuggets=5, window_size=1)).transform(df)
+
+    backend = GrowingBackend()
+    nug = Nuggetizer(backend, max_nuggets=5, window_size=1, speculative_creator=True)
+    speculative = NuggetCreator(nug).transform(df)
+
+    assert speculative["nugget"].tolist() == serial["nugget"].tolist() == ["new d6", "new d2"]
+    assert serial_backend.calls == 6
+    assert backend.calls < serial_backend.calls
+    stats = nug.stats["creator"]
+    assert stats["speculative_hits"] + stats["speculative_misses"] == backend.prompts - backend.calls
+    assert stats["speculative_hits"] > 0 and stats["speculative_misses"] > 0
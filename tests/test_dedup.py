@@ -0,0 +1,87 @@
+import pandas as pd
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.dedup import dedup_documents, cluster_nuggets, nugget_similarity
+
+from types import SimpleNamespace
+
+
+class DummyBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.prompts = []
+
+    def generate(self, prompts):
+        self.prompts.extend(prompts)
+        return [SimpleNamespace(text='["alpha", "beta"]')]
+
+
+BASE = "a high white blood cell count over fifteen thousand is often a sign of an infection in the body"
+
+
+def test_dedup_exact():
+    keep, stats = dedup_documents([BASE, "something else entirely", BASE.upper() + "!"])
+    assert keep == [0, 1]
+    assert stats.removed_exact == 1
+    assert stats.removed_tokens == len(BASE.split())
+
+
+def test_dedup_near():
+    near = BASE + " today"
+    keep, stats = dedup_documents([BASE, near, "something else entirely"], near_duplicate_threshold=0.7)
+    assert keep == [0, 2]
+    assert stats.removed_near == 1
+    keep, _ = dedup_documents([BASE, near, "something else entirely"])
+    assert keep == [0, 1, 2]
+
+
+def test_creator_dedup_reduces_windows():
+    df = pd.DataFrame([
+        {"qid": "Q1", "query": "test", "docno": "d1", "text": BASE},
+        {"qid": "Q1", "query": "test", "docno": "d2", "text": BASE},
+        {"qid": "Q1", "query": "test", "docno": "d3", "text": "something else"},
+    ])
+    backend = DummyBackend()
+    nug = Nuggetizer(backend, window_size=1, dedup_documents=True)
+    nug.create(df)
+    assert len(backend.prompts) == 2
+    assert nug.stats["creator"]["documents_removed"] == 1
+
+
+def test_cluster_nuggets():
+    nuggets = ["High WBC may indicate infection", "High WBCs may indicate an infection", "Sepsis is a concern"]
+    assert cluster_nuggets(nuggets, threshold=0.8) == [[0, 1], [2]]
+
+
+def test_deduplicate_keeps_members():
+    df = pd.DataFrame({
+        "qid": ["Q1", "Q1", "Q1"],
+        "query": ["test"] * 3,
+        "nugget_id": ["Q1_1", "Q1_2", "Q1_3"],
+        "nugget": ["High WBC may indicate infection", "high WBC may indicate infection!", "Sepsis is a concern"],
+    })
+    nug = Nuggetizer(DummyBackend(), nugget_dedup_threshold=0.8)
+    df_out = nug.deduplicate(df)
+    assert df_out["nugget_id"].tolist() == ["Q1_1", "Q1_3"]
+    assert df_out["nugget_members"].tolist() == [["Q1_1", "Q1_2"], ["Q1_3"]]
+    assert nug.stats["deduplicator"]["nuggets_removed"] == 1
+
+
+def test_near_duplicate_threshold_implies_dedup():
+    df = pd.DataFrame([
+        {"qid": "Q1", "query": "test", "docno": "d1", "text": BASE},
+        {"qid": "Q1", "query": "test", "docno": "d2", "text": BASE + " today"},
+        {"qid": "Q1", "query": "test", "docno": "d3", "text": "something else"},
+    ])
+    backend = DummyBackend()
+    nug = Nuggetizer(backend, window_size=1, near_duplicate_threshold=0.7)
+    assert nug.dedup_documents
+    nug.create(df)
+    assert len(backend.prompts) == 2
+    assert nug.stats["creator"]["documents_removed"] == 1
+
+
+def test_cluster_nuggets_agrees_with_nugget_similarity():
+    nuggets = ["High WBC may indicate infection", "High WBCs may indicate an infection", "the", "a", "Sepsis"]
+    for threshold in (0.3, 0.8, 1.0):
+        for cluster in cluster_nuggets(nuggets, threshold):
+            assert all(nugget_similarity(nuggets[cluster[0]], nuggets[i]) >= threshold for i in cluster)
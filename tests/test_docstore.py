@@ -0,0 +1,104 @@
+import gc
+import weakref
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.docstore import BlobDocumentStore, DictDocumentStore, DocumentStore, LazyDocuments
+
+
+class EchoBackend:
+    """Returns the first word of every document in the prompt as nuggets."""
+
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.prompts = []
+
+    def generate(self, prompts):
+        self.prompts.extend(prompts)
+        if "NuggetizeLLM" in prompts[0]:
+            words = sorted(w for w in prompts[0].split() if w.startswith("doc-"))
+            return [SimpleNamespace(text=str(words))]
+        return [SimpleNamespace(text='["vital"]')]
+
+
+class RecordingStore(DictDocumentStore):
+    def __init__(self, documents):
+        super().__init__(documents)
+        self.requests = []
+
+    def get(self, docnos):
+        self.requests.append(list(docnos))
+        return super().get(docnos)
+
+
+def make_docs():
+    return pd.DataFrame({
+        "qid": ["1"] * 5,
+        "query": ["Q1"] * 5,
+        "docno": [f"D{i}" for i in range(5)],
+        "text": [f"doc-{i}" for i in range(5)],
+    })
+
+
+def test_blob_store_round_trip(tmp_path):
+    docs = make_docs()
+    store = BlobDocumentStore.build(docs, tmp_path / "store")
+    assert len(store) == 5
+    assert store.get(["D3", "D0"]) == ["doc-3", "doc-0"]
+    with pytest.raises(KeyError):
+        store.get(["D9"])
+    reopened = BlobDocumentStore(tmp_path / "store")
+    assert reopened.get(["D4"]) == ["doc-4"]
+    assert LazyDocuments(["D1", "D2"], reopened)[0:2] == ["doc-1", "doc-2"]
+
+
+def test_creator_fetches_text_per_window():
+    docs = make_docs()
+    expected = Nuggetizer(EchoBackend(), window_size=2).create(docs)
+
+    store = RecordingStore(docs)
+    backend = EchoBackend()
+    nug = Nuggetizer(backend, window_size=2, document_store=store)
+    nuggets = nug.create(docs.drop(columns=["text"]))
+    pd.testing.assert_frame_equal(nuggets, expected)
+    # one fetch per window, never more than a window of text at a time
+    assert len(store.requests) == 3
+    assert max(len(r) for r in store.requests) == 2
+    assert sorted(d for r in store.requests for d in r) == sorted(docs["docno"])
+
+
+def test_lazy_documents_dedup_by_docno():
+    docs = pd.concat([make_docs(), make_docs().iloc[:2]], ignore_index=True)
+    store = RecordingStore(make_docs())
+    nug = Nuggetizer(EchoBackend(), window_size=10, dedup_documents=True, document_store=store)
+    nug.create(docs.drop(columns=["text"]))
+    assert store.requests == [[f"D{i}" for i in range(5)]]
+    assert nug.stats["creator"]["documents_removed"] == 2
+
+
+class Text(str):
+    pass
+
+
+class FreshStore(DocumentStore):
+    """Builds a new text object on every fetch and keeps only weak references to them."""
+
+    def __init__(self):
+        self.fetched = []
+
+    def get(self, docnos):
+        # text unique to this store, so nothing fetched by other tests can stand in for it
+        texts = [Text(f"doc-{docno[1:]} from store {id(self)}") for docno in docnos]
+        self.fetched.extend(weakref.ref(text) for text in texts)
+        return texts
+
+
+def test_fetched_text_is_released():
+    store = FreshStore()
+    nug = Nuggetizer(EchoBackend(), window_size=2, document_store=store)
+    nuggets = nug.create(make_docs().drop(columns=["text"]))
+    assert len(nuggets) > 0
+    gc.collect()
+    assert len(store.fetched) >= 5
+    assert all(ref() is None for ref in store.fetched)
@@ -0,0 +1,108 @@
+import pandas as pd
+import ir_measures
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.measure._measures import VitalScore, AllScore
+
+
+class CountingBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.calls = 0
+
+    def generate(self, prompts):
+        self.calls += 1
+        return [SimpleNamespace(text='["support"]')]
+
+
+def make_run():
+    return pd.DataFrame({
+        "qid": ["Q1", "Q2"],
+        "query": ["q1", "q2"],
+        "qanswer": ["a1", "a2"],
+    })
+
+
+def make_qrels():
+    return pd.DataFrame({
+        "qid": ["Q1", "Q1", "Q2"],
+        "nugget_id": ["N1", "N2", "N3"],
+        "nugget": ["n1", "n2", "n3"],
+        "importance": [1, 0, 1],
+    })
+
+
+def test_assignments_are_cached():
+    backend = CountingBackend()
+    nug = Nuggetizer(backend, window_size=1)
+    run, qrels = make_run(), make_qrels()
+    nug.make_provider()
+    list(nug.provider.iter_calc([VitalScore], qrels, run))
+    assert backend.calls == 3
+    nug.provider.calc_aggregate([VitalScore, AllScore], qrels, run)
+    list(nug.provider.iter_calc([AllScore(strict=True)], qrels, run.copy()))
+    assert backend.calls == 3
+    assert nug.stats["evaluator"]["cache_hits"] == 2
+    # a different run is assigned again
+    list(nug.provider.iter_calc([VitalScore], qrels, run.assign(qanswer=["b1", "b2"])))
+    assert backend.calls == 6
+
+
+def test_single_default_provider():
+    before = len(ir_measures.DefaultPipeline.providers)
+    first, second = Nuggetizer(CountingBackend()), Nuggetizer(CountingBackend())
+    first.VitalScore
+    second.VitalScore
+    first.AllScore
+    added = len(ir_measures.DefaultPipeline.providers) - before
+    assert added <= 1
+    default = [p for p in ir_measures.DefaultPipeline.providers if p.NAME == "nugget_provider"]
+    assert len(default) == 1
+    assert default[0].nuggetizer_instance is first
+
+
+class GradedBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+        self.prompts = []
+
+    def generate(self, prompts):
+        self.prompts.extend(prompts)
+        # with three grades only n1 is fully supported, the other nuggets partially
+        return [
+            SimpleNamespace(text='["partial_support"]' if "partial_support" in p and "n1" not in p else '["support"]')
+            for p in prompts
+        ]
+
+
+def test_evaluation_judges_in_assigner_mode():
+    from pyterrier_nuggetizer._types import NuggetAssignMode
+    run, qrels = make_run(), make_qrels()
+    measure = AllScore(strict=False)
+    backend = GradedBackend()
+    nug = Nuggetizer(backend, window_size=1)
+    nug.make_provider()
+    assert nug.provider.calc_aggregate([measure], qrels, run)[measure] == 1.0
+    assert len(backend.prompts) == 3 and not any("partial_support" in p for p in backend.prompts)
+
+    # once a run is judged in grade 3, grade 2 is derived from that judgement without further calls
+    backend = GradedBackend()
+    nug = Nuggetizer(backend, window_size=1, assigner_mode=NuggetAssignMode.SUPPORT_GRADE_3)
+    nug.make_provider()
+    grade3 = nug.provider.calc_aggregate([measure], qrels, run)
+    assert len(backend.prompts) == 3 and all("partial_support" in p for p in backend.prompts)
+    nug.assigner_mode = NuggetAssignMode.SUPPORT_GRADE_2
+    grade2 = nug.provider.calc_aggregate([measure], qrels, run)
+    assert len(backend.prompts) == 3
+    assert nug.stats["evaluator"]["derived"] == 3
+    # partial support counts half in grade 3 and not at all once derived to grade 2
+    assert grade3[measure] == 0.375
+    assert grade2[measure] == 0.25
+
+    rejudge = Nuggetizer(GradedBackend(), window_size=1, assigner_mode=NuggetAssignMode.SUPPORT_GRADE_3,
+                         rejudge_assign_modes=True)
+    rejudge.make_provider()
+    rejudge.provider.calc_aggregate([measure], qrels, run)
+    rejudge.assigner_mode = NuggetAssignMode.SUPPORT_GRADE_2
+    assert rejudge.provider.calc_aggregate([measure], qrels, run)[measure] == 1.0
+    assert len(rejudge.backend.prompts) == 6
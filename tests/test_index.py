@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from pyterrier_nuggetizer.index import NuggetQrelsIndex
+from pyterrier_nuggetizer.measure._util import NuggetQrelsConverter, RAGRunConverter
+
+
+def test_qrels_index_from_frame_and_dict():
+    qrels = pd.DataFrame({
+        "qid": ["Q1", "Q2", "Q1"],
+        "nugget_id": ["Q1_1", "Q2_1", "Q1_2"],
+        "nugget": ["n1", "n3", "n2"],
+        "importance": [1, 0, 0],
+    })
+    index = NuggetQrelsIndex(qrels)
+    assert index.qids == ["Q1", "Q2"]
+    assert [r["nugget_id"] for r in index.rows("Q1")] == ["Q1_1", "Q1_2"]
+    assert index.rows("missing") == []
+    assert "Q2" in index and len(index) == 3
+
+    as_dict = {"Q1": {"Q1_1": ("n1", 1), "Q1_2": ("n2", 0)}, "Q2": {"Q2_1": ("n3", 0)}}
+    from_dict = NuggetQrelsIndex(as_dict)
+    assert from_dict.rows("Q1") == index.rows("Q1")
+    pd.testing.assert_frame_equal(from_dict.to_frame(), index.to_frame())
+
+
+def test_qrels_index_save_and_load(tmp_path):
+    qrels = pd.DataFrame({
+        "qid": ["Q1", "Q2", "Q1"],
+        "nugget_id": ["Q1_1", "Q2_1", "Q1_2"],
+        "nugget": ["n1", "névé", "n2"],
+        "importance": [1, 0, 0],
+    })
+    index = NuggetQrelsIndex(qrels)
+    assert index.importance.dtype == np.int8
+    index.save(tmp_path / "qrels")
+    loaded = NuggetQrelsIndex.load(tmp_path / "qrels")
+    assert isinstance(loaded.importance, np.memmap)
+    assert loaded.rows("Q2") == [{"nugget_id": "Q2_1", "nugget": "névé", "importance": 0}]
+    pd.testing.assert_frame_equal(loaded.to_frame(), index.to_frame())
+
+
+def test_run_index_aligns_importance():
+    qrels = NuggetQrelsConverter(pd.DataFrame({
+        "qid": ["Q1", "Q1", "Q2"],
+        "nugget_id": ["N1", "N2", "N3"],
+        "nugget": ["n1", "n2", "n3"],
+        "importance": [1, 0, 1],
+    })).as_index()
+    run = pd.DataFrame({
+        "query_id": ["Q2", "Q1", "Q1", "Q1"],
+        "query": ["q2", "q1", "q1", "q1"],
+        "nugget_id": ["N3", "N1", "N9", "N1"],
+        "nugget": ["n3", "n1", "n9", "n1"],
+        "qanswer": ["a", "b", "b", "c"],
+        "assignment": [2, 0, 1, 2],
+    })
+    index = RAGRunConverter(run).as_index(qrels)
+    assert index.qids == ["Q2", "Q1"]
+    span = index.span("Q1")
+    # N1 keeps its first position and last assignment; N9 is not in the qrels
+    assert index.take_nugget_ids(span) == ["N1", "N9"]
+    assert index.assignment[span].tolist() == [2, 1]
+    assert index.importance[span].tolist() == [1, -1]
+
+    from_dict = RAGRunConverter(RAGRunConverter(run).as_dict_of_dict()).as_index(qrels)
+    assert from_dict.assignment.tolist() == index.assignment.tolist()
@@ -0,0 +1,51 @@
+import json
+import urllib.request
+import urllib.error
+import pytest
+from pyterrier_nuggetizer.mock_server import MockOpenAIServer, MockServerConfig
+from pyterrier_nuggetizer.prompts import SCORER_PROMPT_STRING, CREATOR_PROMPT_STRING
+from pyterrier_nuggetizer.util import extract_list
+
+
+def post(server, path, body):
+    request = urllib.request.Request(
+        server.base_url + path,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def chat(prompt):
+    return {"model": "m", "messages": [{"role": "user", "content": prompt}]}
+
+
+def test_scorer_labels():
+    prompt = SCORER_PROMPT_STRING.render(query="q", nuggets=["a", "b", "c"])
+    with MockOpenAIServer(MockServerConfig(seed=0)) as server:
+        reply = post(server, "/chat/completions", chat(prompt))
+    labels = extract_list(reply["choices"][0]["message"]["content"])
+    assert len(labels) == 3
+    assert set(labels) <= {"vital", "okay"}
+
+
+def test_creator_nuggets_completions():
+    prompt = CREATOR_PROMPT_STRING.render(query="q", context="[1] doc one\n[2] doc two", nuggets=["x"], max_nuggets=2)
+    with MockOpenAIServer() as server:
+        reply = post(server, "/completions", {"model": "m", "prompt": [prompt, prompt]})
+    assert len(reply["choices"]) == 2
+    nuggets = extract_list(reply["choices"][1]["text"])
+    assert len(nuggets) == 2 and nuggets[0] == "x"
+
+
+def test_errors_and_malformed():
+    prompt = SCORER_PROMPT_STRING.render(query="q", nuggets=["a", "b"])
+    with MockOpenAIServer(MockServerConfig(error_rate=1.0)) as server:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            post(server, "/chat/completions", chat(prompt))
+        assert e.value.code == 500
+    with MockOpenAIServer(MockServerConfig(malformed_rate=1.0, seed=0)) as server:
+        reply = post(server, "/chat/completions", chat(prompt))
+        assert server.stats["malformed"] == 1
+    assert extract_list(reply["choices"][0]["message"]["content"]) == []
@@ -52,3 +52,81 @@ def test_full_pipeline(df_docs):
     assert df_out["nugget_id"].nunique() == 2
     # relevance should be 1 or 0
     assert sorted(df_out["importance"].unique()) == [0, 1]
+
+
+class DummyImportanceBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy-model"
+        self.prompts = []
+
+    def generate(self, prompts):
+        self.prompts.extend(prompts)
+        text = prompts[0]
+        if "NuggetizeScoreLLM" in text:
+            return [SimpleNamespace(text='["vital", "okay"]')]
+        if "Labelled Nugget List" in text:
+            return [SimpleNamespace(text='[("nugget1", "okay"), ("nugget2", "vital")]')]
+        return [SimpleNamespace(text='["nugget1", "nugget2"]')]
+
+
+def test_creator_importance_skips_scorer(df_docs):
+    backend = DummyImportanceBackend()
+    nug = Nuggetizer(backend, max_nuggets=2, window_size=1, creator_importance=True)
+    df_out = nug.transform(df_docs)
+    assert df_out["importance"].tolist() == [0, 1]
+    assert not any("NuggetizeScoreLLM" in p for p in backend.prompts)
+
+
+def test_plan_does_not_generate(df_docs):
+    backend = DummyImportanceBackend()
+    nug = Nuggetizer(backend, max_nuggets=2, window_size=1)
+    plan = nug.plan(df_docs).set_index("stage")
+    assert backend.prompts == []
+    assert plan.loc["creator", "calls"] == 2
+    assert plan.loc["creator", "serial_depth"] == 2
+    assert plan.loc["scorer", "calls"] == 2
+    # scorer windows are sent one after another
+    assert plan.loc["scorer", "serial_depth"] == 2
+    assert plan.loc["total", "calls"] == 4
+    assert plan.loc["total", "serial_depth"] == 4
+    assert plan.loc["total", "prompt_tokens"] > 0
+
+
+class PartlyLabellingBackend:
+    """Labels the nuggets of Q1 in the final creator window, but not those of Q2."""
+
+    def __init__(self):
+        self.model_name_or_path = "dummy-model"
+
+    def generate(self, prompts):
+        text = prompts[0]
+        if "NuggetizeScoreLLM" in text:
+            return [SimpleNamespace(text='["vital", "okay"]')]
+        if "Labelled Nugget List" in text and "Q1" in text:
+            return [SimpleNamespace(text='[("high WBC means infection", "vital"), '
+                                         '("high WBC means an infection", "okay"), ("sepsis", "okay")]')]
+        return [SimpleNamespace(text='["high WBC means infection", "high WBC means an infection", "sepsis"]')]
+
+
+def test_dedup_members_kept_for_unlabelled_queries():
+    docs = pd.DataFrame([
+        {"qid": "1", "query": "Q1", "docno": "D1", "text": "DocA"},
+        {"qid": "2", "query": "Q2", "docno": "D2", "text": "DocB"},
+    ])
+    nug = Nuggetizer(PartlyLabellingBackend(), max_nuggets=3, window_size=1, creator_importance=True,
+                     nugget_dedup_threshold=0.6)
+    df_out = nug.transform(docs)
+    members = dict(zip(df_out["nugget_id"], df_out["nugget_members"]))
+    assert members == {"1_1": ["1_1", "1_2"], "1_3": ["1_3"], "2_1": ["2_1", "2_2"], "2_3": ["2_3"]}
+    assert df_out.loc[df_out["qid"] == "1", "importance"].tolist() == [1, 0]
+
+
+def test_plan_assigner_depth_is_per_answer():
+    nug = Nuggetizer(DummyBackend(), window_size=1)
+    inp = pd.DataFrame({
+        "qid": ["1"] * 4, "query": ["Q1"] * 4, "qanswer": ["A1", "A1", "A2", "A2"],
+        "nugget_id": ["1_1", "1_2", "1_1", "1_2"], "nugget": ["n1", "n2", "n1", "n2"], "importance": [1, 0, 1, 0],
+    })
+    plan = nug.plan(inp).set_index("stage")
+    assert plan.loc["assigner", "calls"] == 4
+    assert plan.loc["assigner", "serial_depth"] == 2
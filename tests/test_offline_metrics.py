@@ -0,0 +1,61 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+import pandas as pd
+import pytest
+from pyterrier_nuggetizer.metrics import (
+    calculate_nugget_scores,
+    calculate_nugget_scores_frame,
+    calculate_global_metrics_frame,
+    METRIC_NAMES,
+)
+from pyterrier_nuggetizer.readers import read_assignments
+
+DATA = Path(__file__).parent.parent / "data"
+
+
+def test_frame_matches_reference():
+    records = [
+        {"importance": "vital", "assignment": "support"},
+        {"importance": "vital", "assignment": "partial_support"},
+        {"importance": "okay", "assignment": "support"},
+        {"importance": "okay", "assignment": "not_support"},
+        {"importance": "failed", "assignment": "support"},
+    ]
+    expected = calculate_nugget_scores("Q1", records)
+    frame = calculate_nugget_scores_frame(pd.DataFrame(records).assign(qid="Q1"))
+    assert frame["qid"].tolist() == ["Q1"]
+    for name in METRIC_NAMES:
+        assert frame[name].iloc[0] == getattr(expected, name)
+
+
+def test_frame_by_run():
+    nuggets = pd.DataFrame({
+        "run_id": ["a", "a", "b"],
+        "qid": ["Q1", "Q1", "Q1"],
+        "importance": [1, 0, 1],
+        "assignment": [2, 0, 1],
+    })
+    scores = calculate_nugget_scores_frame(nuggets, by=("run_id", "qid"))
+    assert scores["strict_vital_score"].tolist() == [1.0, 0.0]
+    overall = calculate_global_metrics_frame(scores, by=("run_id",))
+    assert overall["qid"].tolist() == ["all", "all"]
+    assert overall["vital_score"].tolist() == [1.0, 0.5]
+
+
+@pytest.mark.parametrize("run,metrics", [
+    ("baseline_rag24.test_gpt4o_top20.jsonl", "baseline_rag24.test_gpt_4o_top20.jsonl"),
+])
+def test_recomputed_metrics_match_published(run, metrics):
+    expected = [json.loads(line) for line in open(DATA / "metrics" / metrics)]
+    scores = calculate_nugget_scores_frame(read_assignments(str(DATA / "assignments" / run)))
+    overall = calculate_global_metrics_frame(scores)
+    actual = scores.to_dict(orient="records") + overall.to_dict(orient="records")
+    assert actual == expected
+
+
+def test_metrics_do_not_import_pyterrier():
+    code = "import sys, pyterrier_nuggetizer.metrics, pyterrier_nuggetizer.readers; print('pyterrier' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
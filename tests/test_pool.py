@@ -0,0 +1,79 @@
+import pytest
+import pandas as pd
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.pool import BackendPool
+
+from types import SimpleNamespace
+
+
+class EchoBackend:
+    def __init__(self, name, fail=False):
+        self.model_name_or_path = name
+        self.fail = fail
+        self.seen = []
+
+    def generate(self, prompts):
+        if self.fail:
+            raise ConnectionError(self.model_name_or_path)
+        self.seen.extend(prompts)
+        return [SimpleNamespace(text=f"{self.model_name_or_path}:{p}") for p in prompts]
+
+
+def test_pool_spreads_and_preserves_order():
+    a, b = EchoBackend("a"), EchoBackend("b")
+    pool = BackendPool([a, b])
+    outputs = pool.generate([str(i) for i in range(6)])
+    assert [o.text.split(":")[1] for o in outputs] == [str(i) for i in range(6)]
+    assert len(a.seen) == 3 and len(b.seen) == 3
+    assert pool.model_name_or_path == "a"
+    assert sum(s["prompts"] for s in pool.replica_stats()) == 6
+
+
+def test_pool_routes_around_unhealthy_replica():
+    bad, good = EchoBackend("bad", fail=True), EchoBackend("good")
+    pool = BackendPool([bad, good], max_failures=1, cooldown=60)
+    outputs = pool.generate(["x", "y"])
+    assert [o.text for o in outputs] == ["good:x", "good:y"]
+    stats = pool.replica_stats()
+    assert stats[0]["errors"] >= 1 and not stats[0]["healthy"]
+    pool.generate(["z"])
+    assert good.seen[-1] == "z"
+
+
+def test_pool_raises_when_all_fail():
+    pool = BackendPool([EchoBackend("a", fail=True), EchoBackend("b", fail=True)])
+    with pytest.raises(ConnectionError):
+        pool.generate(["x"])
+
+
+def test_pool_as_nuggetizer_backend():
+    class LabelBackend(EchoBackend):
+        def generate(self, prompts):
+            return [SimpleNamespace(text='["vital", "okay"]') for _ in prompts]
+
+    nug = Nuggetizer(BackendPool([LabelBackend("a"), LabelBackend("b")]), window_size=2)
+    df = pd.DataFrame({"qid": ["Q1", "Q1"], "query": ["q", "q"], "nugget_id": ["a", "b"], "nugget": ["n1", "n2"]})
+    assert nug.score(df)["importance"].tolist() == [1, 0]
+
+
+def test_pool_raises_bad_requests_without_failover():
+    class BadRequestBackend(EchoBackend):
+        def generate(self, prompts):
+            self.seen.extend(prompts)
+            raise ValueError("prompt exceeds the context length")
+
+    a, b = BadRequestBackend("a"), BadRequestBackend("b")
+    pool = BackendPool([a, b], max_failures=1)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            pool.generate(["x"])
+    # each bad request went to one replica only, and no replica was marked unhealthy
+    assert len(a.seen) + len(b.seen) == 3
+    assert all(s["healthy"] for s in pool.replica_stats())
+
+
+def test_pool_close_shuts_down_executor():
+    with BackendPool([EchoBackend("a"), EchoBackend("b")]) as pool:
+        pool.generate(["x", "y"])
+    with pytest.raises(RuntimeError):
+        pool.executor.submit(print)
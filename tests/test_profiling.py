@@ -0,0 +1,54 @@
+import time
+import pandas as pd
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.measure._measures import VitalScore
+
+
+class SlowBackend:
+    def __init__(self, delay=0.02):
+        self.model_name_or_path = "dummy"
+        self.delay = delay
+
+    def generate(self, prompts):
+        time.sleep(self.delay)
+        text = prompts[0]
+        if "NuggetizeLLM" in text:
+            return [SimpleNamespace(text='["nugget1", "nugget2"]')]
+        elif "NuggetizeScoreLLM" in text:
+            return [SimpleNamespace(text='["vital", "okay"]')]
+        return [SimpleNamespace(text='["support", "not_support"]')]
+
+
+def make_docs():
+    return pd.DataFrame({
+        "qid": ["1", "1", "2"],
+        "query": ["Q1", "Q1", "Q2"],
+        "docno": ["D1", "D2", "D3"],
+        "text": ["DocA", "DocB", "DocC"],
+    })
+
+
+def test_profile_sampling_writes_per_stage_output(tmp_path):
+    nug = Nuggetizer(SlowBackend(), max_nuggets=2, window_size=2)
+    with nug.profile(tmp_path, interval=0.002) as profiler:
+        nuggets = nug(make_docs())
+    assert nug.profiler is None
+    assert {"creator.collapsed", "scorer.collapsed", "summary.txt"} <= {p.name for p in tmp_path.iterdir()}
+
+    stacks = (tmp_path / "creator.collapsed").read_text().splitlines()
+    assert stacks and all(line.startswith("[creator];create (nuggetizer.py") for line in stacks)
+    assert any("[backend]" in line and "generate (test_profiling.py" in line for line in stacks)
+
+    times = profiler.stage_times().set_index("section")
+    assert times.loc["creator", "calls"] == 1
+    # the backend sleeps, so most of each stage is spent waiting on it
+    assert times.loc["creator", "backend_seconds"] > times.loc["creator", "cpu_seconds"]
+    assert set(profiler.hot_functions(5)["stage"]) >= {"creator", "scorer"}
+
+    run = pd.DataFrame({"qid": ["1"], "query": ["Q1"], "qanswer": ["A1"]})
+    with nug.profile(mode="deterministic") as profiler:
+        nug.make_provider()
+        list(nug.provider.iter_calc([VitalScore], nuggets, run))
+    assert profiler.stats("evaluator") is not None
+    assert {"evaluator", "conversion"} <= set(profiler.stage_times()["section"])
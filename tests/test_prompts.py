@@ -0,0 +1,75 @@
+import threading
+from types import SimpleNamespace
+from jinja2 import Template
+from fastchat.conversation import get_conv_template
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer._types import NuggetAssignMode
+from pyterrier_nuggetizer.prompts import (
+    ASSIGNER_GRADE_2_PROMPT_SOURCE,
+    ASSIGNER_GRADE_3_PROMPT_SOURCE,
+    CREATOR_PROMPT_SOURCE,
+    CREATOR_IMPORTANCE_PROMPT_SOURCE,
+    SCORER_PROMPT_SOURCE,
+    CompiledTemplate,
+    compile_template,
+)
+
+
+class DummyBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+
+    def generate(self, prompts):
+        return [SimpleNamespace(text='["support"]') for _ in prompts]
+
+
+def test_compiled_templates_match_jinja():
+    context = {
+        "query": "what is a nugget?",
+        "context": "[1] it's a \"small\" fact\n[2] {{ not a slot }}",
+        "nuggets": ["it's small", 'a "fact"', "ünïcode"],
+        "max_nuggets": 30,
+    }
+    for source in [
+        ASSIGNER_GRADE_2_PROMPT_SOURCE,
+        ASSIGNER_GRADE_3_PROMPT_SOURCE,
+        CREATOR_PROMPT_SOURCE,
+        CREATOR_IMPORTANCE_PROMPT_SOURCE,
+        SCORER_PROMPT_SOURCE,
+    ]:
+        compiled = compile_template(source)
+        assert isinstance(compiled, CompiledTemplate)
+        assert compiled(**context) == Template(source).render(**context)
+        assert compiled(**{**context, "nuggets": []}) == Template(source).render(**{**context, "nuggets": []})
+
+
+def test_compile_template_falls_back_to_jinja():
+    render = compile_template("{% for n in nuggets %}{{ n }};{% endfor %}")
+    assert not isinstance(render, CompiledTemplate)
+    assert render(nuggets=["a", "b"]) == "a;b;"
+
+
+def test_stages_are_reused_and_rebuilt_on_change():
+    nug = Nuggetizer(DummyBackend(), window_size=2)
+    assert nug.assigner is nug.assigner
+    assigner = nug.assigner
+    nug.assigner_mode = NuggetAssignMode.SUPPORT_GRADE_3
+    assert nug.assigner is not assigner
+    assert nug.assigner.mode == NuggetAssignMode.SUPPORT_GRADE_3
+
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(nug.scorer)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(stage is seen[0] for stage in seen)
+
+
+def test_stages_copy_the_conversation_template():
+    template = get_conv_template("zero_shot")
+    nug = Nuggetizer(DummyBackend(), conversation_template=template)
+    creator, scorer = nug.creator, nug.scorer
+    assert "NuggetizeLLM" in creator.prompt.create_prompt(creator._context("q", ["d"], []))
+    assert "NuggetizeScoreLLM" in scorer.prompt.create_prompt({"query": "q", "nuggets": ["n"]})
+    assert template.system_message == get_conv_template("zero_shot").system_message
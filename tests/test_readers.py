@@ -0,0 +1,57 @@
+import gzip
+import json
+import pytest
+from pyterrier_nuggetizer.readers import read_answers, read_nuggets, read_assignments, iter_answers, iter_nuggets
+
+
+@pytest.fixture
+def answers_file(tmp_path):
+    records = [
+        {"run_id": "r", "topic_id": "Q1", "topic": "q1", "answer": [{"text": "A.", "citations": [0]}, {"text": "B.", "citations": []}]},
+        {"run_id": "r", "topic_id": "Q2", "topic": "q2", "answer": [{"text": "C.", "citations": []}]},
+    ]
+    file = tmp_path / "answers.jsonl.gz"
+    with gzip.open(file, "wt") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return str(file)
+
+
+@pytest.fixture
+def assignments_file(tmp_path):
+    nuggets = [
+        {"text": "n1", "importance": "vital", "assignment": "support"},
+        {"text": "n2", "importance": "okay", "assignment": "partial_support"},
+        {"text": "n3", "importance": "failed", "assignment": "unknown_label"},
+    ]
+    record = {"query": "q1", "qid": "Q1", "answer_text": "A. B.", "run_id": "r", "nuggets": str(nuggets)}
+    file = tmp_path / "assignments.jsonl"
+    file.write_text(json.dumps(record) + "\n")
+    return str(file)
+
+
+def test_read_answers_gzip(answers_file):
+    run = read_answers(answers_file)
+    assert run["qid"].tolist() == ["Q1", "Q2"]
+    assert run["qanswer"].tolist() == ["A. B.", "C."]
+    assert [len(chunk) for chunk in iter_answers(answers_file)] == [1, 1]
+
+
+def test_read_assignments(assignments_file):
+    df = read_assignments(assignments_file)
+    assert df["nugget_id"].tolist() == ["Q1_1", "Q1_2", "Q1_3"]
+    assert df["importance"].tolist() == [1, 0, -1]
+    assert df["assignment"].tolist() == [2, 1, 0]
+    assert df["qanswer"].unique().tolist() == ["A. B."]
+
+
+def test_read_nuggets(tmp_path):
+    file = tmp_path / "nuggets.jsonl"
+    lines = [
+        {"qid": "Q1", "query": "q1", "nuggets": [{"text": "a", "importance": "vital"}, {"text": "b", "importance": "okay"}]},
+        {"qid": "Q2", "query": "q2", "nuggets": [{"text": "c", "importance": "okay"}]},
+    ]
+    file.write_text("\n".join(json.dumps(line) for line in lines))
+    qrels = read_nuggets(str(file))
+    assert qrels["importance"].tolist() == [1, 0, 0]
+    assert [chunk["qid"].unique().tolist() for chunk in iter_nuggets(str(file), chunk_size=2)] == [["Q1"], ["Q2"]]
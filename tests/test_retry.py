@@ -0,0 +1,94 @@
+import time
+import pytest
+import pandas as pd
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.retry import RetryPolicy, HedgePolicy, ResilientCaller
+
+from types import SimpleNamespace
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class FlakyBackend:
+    def __init__(self, failures):
+        self.model_name_or_path = "dummy"
+        self.failures = failures
+        self.calls = 0
+
+    def generate(self, prompts):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ServerError()
+        return [SimpleNamespace(text='["vital", "okay"]')]
+
+
+@pytest.fixture
+def nuggets_df():
+    return pd.DataFrame({"qid": ["Q1", "Q1"], "query": ["q", "q"], "nugget_id": ["a", "b"], "nugget": ["n1", "n2"]})
+
+
+def test_retries_transient_errors(nuggets_df):
+    backend = FlakyBackend(failures=2)
+    nug = Nuggetizer(backend, window_size=2, retry_policy=RetryPolicy(max_retries=3, base_delay=0.001))
+    df_out = nug.score(nuggets_df)
+    assert df_out["importance"].tolist() == [1, 0]
+    assert nug.stats["scorer"]["retries"] == 2
+
+
+def test_gives_up_after_max_retries(nuggets_df):
+    backend = FlakyBackend(failures=5)
+    nug = Nuggetizer(backend, window_size=2, retry_policy=RetryPolicy(max_retries=1, base_delay=0.001))
+    with pytest.raises(ServerError):
+        nug.score(nuggets_df)
+    assert backend.calls == 2
+
+
+def test_does_not_retry_other_errors():
+    caller = ResilientCaller(RetryPolicy(base_delay=0.001))
+    calls = []
+
+    def broken(prompts, stage=None):
+        calls.append(prompts)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        caller.call(broken, ["p"], stage="scorer")
+    assert len(calls) == 1
+
+
+def test_hedges_stragglers():
+    caller = ResilientCaller(hedge=HedgePolicy(percentile=50, min_samples=3))
+    calls = []
+
+    def backend(prompts, stage=None):
+        calls.append(prompts)
+        if len(calls) == 4:
+            time.sleep(0.5)
+            return ["slow"]
+        time.sleep(0.01)
+        return ["fast"]
+
+    for _ in range(3):
+        caller.call(backend, ["p"], stage="assigner")
+    assert caller.call(backend, ["p"], stage="assigner") == ["fast"]
+    assert caller.stats["assigner"]["hedges"] == 1
+    assert caller.stats["assigner"]["hedge_wins"] == 1
+
+
+def test_close_releases_hedge_threads(nuggets_df):
+    import threading
+    before = threading.active_count()
+    nug = Nuggetizer(FlakyBackend(failures=0), window_size=2, hedge_policy=HedgePolicy(min_samples=1))
+    for _ in range(3):
+        nug.score(nuggets_df)
+    assert threading.active_count() > before
+    nug.close()
+    assert nug.caller.executor is None
+    deadline = time.monotonic() + 5
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == before
+    # still usable, without hedging
+    assert nug.score(nuggets_df)["importance"].tolist() == [1, 0]
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer._types import NuggetAssignMode
+from pyterrier_nuggetizer.metrics import calculate_nugget_scores_frame, calculate_global_metrics_frame
+from pyterrier_nuggetizer.sampling import stratified_sample, estimate_metrics, sample_order
+
+
+def make_nuggets(n_queries=20, n_nuggets=30, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for q in range(n_queries):
+        for i in range(n_nuggets):
+            importance = int(i % 3 == 0)
+            rows.append({
+                "qid": f"q{q}",
+                "query": f"query {q}",
+                "qanswer": "an answer",
+                "nugget_id": f"q{q}_{i}",
+                "nugget": f"good nugget {i}" if rng.random() < 0.4 + 0.3 * importance else f"nugget {i}",
+                "importance": importance,
+            })
+    return pd.DataFrame(rows)
+
+
+def test_stratified_sample_is_proportional():
+    nuggets = make_nuggets()
+    sample = stratified_sample(nuggets, 0.2, seed=0)
+    counts = sample.groupby(["qid", "importance"]).size()
+    assert (counts.xs(1, level="importance") == 2).all()
+    assert (counts.xs(0, level="importance") == 4).all()
+    # a larger sample from the same order contains the smaller one
+    larger = stratified_sample(nuggets, 0.5, seed=0)
+    assert set(sample.index) <= set(larger.index)
+    np.testing.assert_array_equal(sample_order(nuggets, seed=1), sample_order(nuggets, seed=1))
+
+
+def test_full_sample_is_exact():
+    nuggets = make_nuggets()
+    nuggets["assignment"] = np.where(nuggets["nugget"].str.startswith("good"), 2, np.arange(len(nuggets)) % 2)
+    per_query, estimates = estimate_metrics(nuggets, nuggets)
+    exact = calculate_global_metrics_frame(calculate_nugget_scores_frame(nuggets)).iloc[0]
+    for row in estimates.itertuples():
+        assert np.isclose(row.estimate, exact[row.metric])
+        assert row.half_width == 0.0
+    assert len(per_query) == 20
+
+
+class SupportBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy-model"
+        self.calls = 0
+
+    def generate(self, prompts):
+        self.calls += 1
+        return [SimpleNamespace(text='["support"]' if "good nugget" in prompts[0] else '["not_support"]')]
+
+
+def test_assign_approx():
+    nuggets = make_nuggets(n_queries=5, n_nuggets=20)
+    backend = SupportBackend()
+    nug = Nuggetizer(backend, assigner_mode=NuggetAssignMode.SUPPORT_GRADE_2, window_size=1)
+    result = nug.assign_approx(nuggets, fraction=0.2, seed=0)
+    assert result.judged == backend.calls == 5 * (2 + 3)
+    assert result.total == 100
+    assert set(result.estimates["metric"]) >= {"vital_score", "weighted_score", "all_score"}
+    assert (result.estimates["ci_low"] <= result.estimates["estimate"]).all()
+
+    backend = SupportBackend()
+    nug = Nuggetizer(backend, assigner_mode=NuggetAssignMode.SUPPORT_GRADE_2, window_size=1)
+    result = nug.assign_approx(nuggets, fraction=0.2, target_half_width=1e-9, seed=0)
+    assert result.judged == result.total == backend.calls
+    assert result.half_width("vital_score") == 0.0
+
+
+def test_provider_samples_qrels():
+    nuggets = make_nuggets(n_queries=2, n_nuggets=10)
+    qrels = {}
+    for row in nuggets.itertuples():
+        qrels.setdefault(row.qid, {})[row.nugget_id] = (row.nugget, row.importance)
+    run = nuggets[["qid", "query", "qanswer"]].drop_duplicates()
+    backend = SupportBackend()
+    nug = Nuggetizer(backend, window_size=1, approx_fraction=0.5, approx_seed=0)
+    assigned = nug._iter_assign_to_run(run, qrels)
+    assert len(assigned) == backend.calls == 2 * (2 + 3)
+
+
+def test_provider_reweights_unequal_strata():
+    from pyterrier_nuggetizer.measure._measures import AllScore, VitalScore, WeightedScore
+    # 2 vital nuggets (all supported) and 18 okay ones (none supported) per query: at fraction 0.2 the
+    # vital stratum is sampled at 1 in 2 and the okay stratum at 4 in 18
+    rows = []
+    for q in range(3):
+        for i in range(20):
+            vital = i < 2
+            rows.append({"qid": f"q{q}", "nugget_id": f"q{q}_{i}",
+                         "nugget": f"good nugget {i}" if vital else f"nugget {i}", "importance": int(vital)})
+    qrels = pd.DataFrame(rows)
+    run = pd.DataFrame({"qid": [f"q{q}" for q in range(3)], "query": ["query"] * 3, "qanswer": ["an answer"] * 3})
+    measures = [AllScore, VitalScore, WeightedScore]
+
+    exact = Nuggetizer(SupportBackend(), window_size=1)
+    exact.make_provider()
+    expected = exact.provider.calc_aggregate(measures, qrels, run)
+    assert np.isclose(expected[AllScore], 0.1)
+
+    backend = SupportBackend()
+    nug = Nuggetizer(backend, window_size=1, approx_fraction=0.2, approx_seed=0)
+    nug.make_provider()
+    evaluator = nug.provider.evaluator(measures, qrels)
+    approx = evaluator.calc_aggregate(run)
+    assert backend.calls == 3 * (1 + 4)
+    for measure in measures:
+        assert np.isclose(approx[measure], expected[measure]), measure
+    assert evaluator.approximation.judged == 15 and evaluator.approximation.total == 60
+    assert np.isclose(evaluator.approximation.estimates.set_index("metric").loc["all_score", "estimate"], 0.1)
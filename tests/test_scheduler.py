@@ -0,0 +1,72 @@
+import time
+import threading
+import pytest
+import pandas as pd
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.scheduler import Scheduler, AIMDController, TokenBucket
+
+from types import SimpleNamespace
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class DummyBackend:
+    def __init__(self):
+        self.model_name_or_path = "dummy"
+
+    def generate(self, prompts):
+        return [SimpleNamespace(text='["vital", "okay"]')]
+
+
+def test_token_bucket_waits():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_aimd_backs_off_and_recovers():
+    scheduler = Scheduler(controller=AIMDController(initial=8, maximum=16))
+
+    def fail(prompts):
+        raise RateLimitError()
+
+    with pytest.raises(RateLimitError):
+        scheduler.submit(fail, ["p"], stage="assigner")
+    assert scheduler.controller.limit == 4
+    assert scheduler.stats["assigner"]["overloaded"] == 1
+    for _ in range(20):
+        scheduler.submit(lambda prompts: prompts, ["p"])
+    assert scheduler.controller.limit > 4
+
+
+def test_priority_order():
+    scheduler = Scheduler(controller=AIMDController(initial=1, maximum=1))
+    release = threading.Event()
+    order = []
+    blocker = threading.Thread(target=scheduler.submit, args=(lambda p: release.wait(), ["p"], "scorer"))
+    blocker.start()
+    while scheduler.in_flight == 0:
+        time.sleep(0.001)
+    threads = []
+    for stage in ["assigner", "creator"]:
+        thread = threading.Thread(target=scheduler.submit, args=(order.append, stage, stage))
+        thread.start()
+        threads.append(thread)
+        while len(scheduler._waiting) < len(threads):
+            time.sleep(0.001)
+    release.set()
+    for thread in [blocker] + threads:
+        thread.join()
+    assert order == ["creator", "assigner"]
+
+
+def test_nuggetizer_uses_scheduler():
+    scheduler = Scheduler(requests_per_second=100)
+    nug = Nuggetizer(DummyBackend(), window_size=2, scheduler=scheduler)
+    df = pd.DataFrame({"qid": ["Q1", "Q1"], "query": ["q", "q"], "nugget_id": ["a", "b"], "nugget": ["n1", "n2"]})
+    nug.score(df)
+    assert scheduler.stats["scorer"]["calls"] == 1
@@ -0,0 +1,100 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.service import MicroBatcher, NuggetService, NuggetServiceServer, NuggetServiceClient
+
+
+class BatchBackend:
+    def __init__(self, delay=0.0):
+        self.model_name_or_path = "dummy"
+        self.batches = []
+        self.delay = delay
+
+    def generate(self, prompts):
+        self.batches.append(len(prompts))
+        time.sleep(self.delay)
+        outputs = []
+        for prompt in prompts:
+            if "NuggetizeLLM" in prompt:
+                outputs.append(SimpleNamespace(text='["nugget1", "nugget2"]'))
+            elif "NuggetizeScoreLLM" in prompt:
+                outputs.append(SimpleNamespace(text='["vital", "okay"]'))
+            else:
+                outputs.append(SimpleNamespace(text='["support", "not_support"]'))
+        return outputs
+
+
+class FailingBackend:
+    def generate(self, prompts):
+        raise RuntimeError("boom")
+
+
+def test_micro_batcher_merges_concurrent_calls():
+    backend = BatchBackend()
+    batcher = MicroBatcher(backend, max_batch_size=8, max_wait=0.5)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.generate([f"p{i}a", f"p{i}b"])))
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+    # four callers of two prompts fill one batch of eight before the deadline
+    assert backend.batches == [8]
+    assert all(len(outputs) == 2 for outputs in results.values())
+    assert batcher.stats["requests"] == 4 and batcher.stats["batches"] == 1
+
+
+def test_micro_batcher_deadline_and_errors():
+    backend = BatchBackend()
+    batcher = MicroBatcher(backend, max_batch_size=64, max_wait=0.01)
+    started = time.monotonic()
+    assert len(batcher.generate(["a"])) == 1
+    assert time.monotonic() - started < 1.0
+    batcher.close()
+
+    failing = MicroBatcher(FailingBackend(), max_wait=0.0)
+    with pytest.raises(RuntimeError):
+        failing.generate(["a"])
+    failing.close()
+
+
+def test_service_jobs_over_http():
+    backend = BatchBackend(delay=0.01)
+    batcher = MicroBatcher(backend, max_batch_size=16, max_wait=0.05)
+    nug = Nuggetizer(batcher, max_nuggets=2, window_size=2)
+    service = NuggetService(nug, max_jobs=2, max_parallel_queries=8)
+    docs = pd.DataFrame({
+        "qid": [f"Q{i}" for i in range(4) for _ in range(2)],
+        "query": [f"q{i}" for i in range(4) for _ in range(2)],
+        "docno": [f"D{j}" for j in range(8)],
+        "text": [f"doc {j}" for j in range(8)],
+    })
+    with NuggetServiceServer(service) as server:
+        client = NuggetServiceClient(server.base_url, timeout=30)
+        events = []
+        nuggets = client.run("create", docs, progress=events.append)
+        assert sorted(nuggets["qid"].unique()) == ["Q0", "Q1", "Q2", "Q3"]
+        assert set(nuggets["importance"]) == {0, 1}
+        assert [e["event"] for e in events if e["event"] != "progress"] == ["queued", "running", "done"]
+        assert [e["done"] for e in events if e["event"] == "progress"] == [1, 2, 3, 4]
+
+        run = pd.DataFrame({"qid": ["Q0", "Q1"], "query": ["q0", "q1"], "qanswer": ["a0", "a1"]})
+        metrics = client.run("evaluate", run, qrels=nuggets[["qid", "nugget_id", "nugget", "importance"]])
+        assert metrics["qid"].tolist() == ["Q0", "Q1", "all"]
+        assert metrics["strict_vital_score"].tolist() == [1.0, 1.0, 1.0]
+
+        job_id = client.submit("score", nuggets.drop(columns=["importance"]))
+        list(client.events(job_id))
+        assert client.status(job_id)["status"] == "done"
+        assert len(client.result(job_id)) == len(nuggets)
+    service.close()
+    batcher.close()
+    # the queries of a job share backend calls
+    assert max(backend.batches) > 1
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from pyterrier_nuggetizer.significance import metric_matrix, bootstrap_intervals, paired_tests
+
+
+def make_scores(seed=0, n_queries=50):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0, 1, n_queries)
+    rows = []
+    for run, shift in [("a", 0.0), ("b", 0.0), ("c", 0.3)]:
+        for i, value in enumerate(base + shift + rng.normal(0, 0.05, n_queries)):
+            rows.append({"run_id": run, "qid": f"q{i}", "vital_score": value})
+    rows.append({"run_id": "a", "qid": "only_a", "vital_score": 1.0})
+    return pd.DataFrame(rows)
+
+
+def test_metric_matrix_keeps_common_queries():
+    matrix = metric_matrix(make_scores(), "vital_score")
+    assert list(matrix.index) == ["a", "b", "c"]
+    assert "only_a" not in matrix.columns
+    assert matrix.shape == (3, 50)
+
+
+def test_paired_tests():
+    matrix = metric_matrix(make_scores(), "vital_score")
+    result = paired_tests(matrix, n_resamples=2000, seed=42)
+    assert list(zip(result["system_a"], result["system_b"])) == [("a", "b"), ("a", "c"), ("b", "c")]
+    same, different = result.iloc[0], result.iloc[1]
+    assert same["p_randomization"] > 0.05
+    assert same["ci_low"] < 0 < same["ci_high"]
+    assert different["p_randomization"] < 0.01 and different["p_bootstrap"] < 0.01
+    assert different["ci_high"] < 0
+    assert np.isclose(different["delta"], different["mean_a"] - different["mean_b"])
+    # seeded resampling is reproducible
+    again = paired_tests(matrix, n_resamples=2000, seed=42)
+    pd.testing.assert_frame_equal(result, again)
+
+
+def test_paired_tests_selected_pairs():
+    matrix = metric_matrix(make_scores(), "vital_score")
+    result = paired_tests(matrix, pairs=[("c", "a")], n_resamples=100, seed=0)
+    assert len(result) == 1
+    assert result["delta"].iloc[0] > 0
+
+
+def test_bootstrap_intervals():
+    matrix = metric_matrix(make_scores(), "vital_score")
+    intervals = bootstrap_intervals(matrix, n_resamples=1000, seed=0, batch_size=300)
+    assert (intervals["ci_low"] <= intervals["mean"]).all()
+    assert (intervals["mean"] <= intervals["ci_high"]).all()
@@ -0,0 +1,57 @@
+import pytest
+import pandas as pd
+
+pytest.importorskip("pyarrow")
+
+from pyterrier_nuggetizer.store import save_nugget_store, load_nugget_store, NuggetStore
+
+
+@pytest.fixture
+def nuggets_df():
+    return pd.DataFrame(
+        {
+            "qid": ["Q2", "Q1", "Q2", "Q3"],
+            "nugget_id": ["Q2_1", "Q1_1", "Q2_2", "Q3_1"],
+            "nugget": ["tab\there", "new\nline", "plain", "q3"],
+            "importance": [1, 0, 1, 0],
+        }
+    )
+
+
+@pytest.mark.parametrize("suffix", [".arrow", ".parquet"])
+def test_store_round_trip(tmp_path, nuggets_df, suffix):
+    file = str(tmp_path / f"nuggets{suffix}")
+    save_nugget_store(nuggets_df, file)
+    loaded = load_nugget_store(file)
+    assert loaded["nugget_id"].tolist() == ["Q2_1", "Q2_2", "Q1_1", "Q3_1"]
+    assert loaded["nugget"].tolist() == ["tab\there", "plain", "new\nline", "q3"]
+    assert loaded.columns.tolist() == ["qid", "nugget_id", "nugget", "importance"]
+
+    subset = load_nugget_store(file, qids=["Q1", "Q3", "missing"])
+    assert sorted(subset["nugget_id"].tolist()) == ["Q1_1", "Q3_1"]
+    assert subset["qid"].tolist()[0] in {"Q1", "Q3"}
+
+
+def test_store_index(tmp_path, nuggets_df):
+    file = str(tmp_path / "nuggets.arrow")
+    save_nugget_store(nuggets_df, file)
+    with NuggetStore(file) as store:
+        assert store.qids == ["Q2", "Q1", "Q3"]
+        assert store.index["Q2"] == (0, 2)
+        assert len(store) == 4
+        assert "Q1" in store
+        assert store.table(["Q3"]).num_rows == 1
+
+
+def test_parquet_reads_only_needed_row_groups(tmp_path, nuggets_df):
+    file = str(tmp_path / "nuggets.parquet")
+    save_nugget_store(nuggets_df, file, row_group_size=1)
+    with NuggetStore(file) as store:
+        read = []
+        read_row_groups = store._parquet.read_row_groups
+        store._parquet.read_row_groups = lambda groups: read.append(groups) or read_row_groups(groups)
+        assert store.load(["Q3", "Q2"])["nugget_id"].tolist() == ["Q3_1", "Q2_1", "Q2_2"]
+        assert read == [[0, 1, 3]]
+        assert store.load(["Q1"])["nugget"].tolist() == ["new\nline"]
+        assert read[-1] == [2]
+        assert len(store.load(["missing"])) == 0
@@ -0,0 +1,97 @@
+import json
+import pandas as pd
+from types import SimpleNamespace
+from pyterrier_nuggetizer import Nuggetizer
+from pyterrier_nuggetizer.retry import RetryPolicy
+from pyterrier_nuggetizer.scheduler import Scheduler
+from pyterrier_nuggetizer.tracing import Tracer, load_spans
+
+
+class FlakyBackend:
+    def __init__(self, failures=0):
+        self.model_name_or_path = "dummy"
+        self.failures = failures
+
+    def generate(self, prompts):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("reset")
+        text = prompts[0]
+        if "NuggetizeLLM" in text:
+            return [SimpleNamespace(text='["nugget1", "nugget2"]')]
+        elif "NuggetizeScoreLLM" in text:
+            return [SimpleNamespace(text='["vital"]')]
+        return [SimpleNamespace(text='["support", "not_support"]')]
+
+
+def make_docs():
+    return pd.DataFrame({
+        "qid": ["1", "1", "1", "2"],
+        "query": ["Q1", "Q1", "Q1", "Q2"],
+        "docno": ["D1", "D2", "D3", "D4"],
+        "text": ["DocA", "DocB", "DocC", "DocD"],
+    })
+
+
+def test_trace_nests_generate_spans_under_query_and_run(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    nug = Nuggetizer(FlakyBackend(failures=1), window_size=2, scheduler=Scheduler(),
+                     retry_policy=RetryPolicy(base_delay=0.0))
+    with nug.trace(str(path)) as tracer:
+        nug(make_docs())
+    assert nug.tracer is None and tracer._file is None
+
+    lines = path.read_text().splitlines()
+    assert "resourceSpans" in json.loads(lines[0])
+    spans = load_spans(path)
+    by_id = {span["span_id"]: span for span in spans}
+    assert len({span["trace_id"] for span in spans}) == 1
+
+    generate = [span for span in spans if span["name"] == "nuggetizer.generate"]
+    # two creator windows for query 1, one for query 2, then one scorer window per query
+    assert [(s["nuggetizer.stage"], s["nuggetizer.qid"]) for s in generate].count(("creator", "1")) == 2
+    assert len(generate) == 5
+    for span in generate:
+        assert len(span["nuggetizer.prompt_hash"]) == 1
+        assert span["nuggetizer.prompt_tokens"] > 0 and span["nuggetizer.output_tokens"] > 0
+        assert span["nuggetizer.queue_seconds"] >= 0 and span["nuggetizer.service_seconds"] >= 0
+        query = by_id[span["parent_id"]]
+        assert query["name"] == "nuggetizer.query" and query["nuggetizer.qid"] == span["nuggetizer.qid"]
+        stage = by_id[query["parent_id"]]
+        assert stage["name"] == f"nuggetizer.{span['nuggetizer.stage']}"
+        assert by_id[stage["parent_id"]]["name"] == "nuggetizer.run"
+    assert sum(span.get("nuggetizer.retries", 0) for span in generate) == 1
+    # the scorer returns one label for two nuggets
+    assert {s["nuggetizer.parse"] for s in generate if s["nuggetizer.stage"] == "scorer"} == {"malformed"}
+    assert {s["nuggetizer.parse"] for s in generate if s["nuggetizer.stage"] == "creator"} == {"ok"}
+
+
+def test_trace_in_memory_and_assign_spans():
+    nug = Nuggetizer(FlakyBackend(), window_size=2)
+    qrels = pd.DataFrame({
+        "qid": ["1", "1"], "nugget_id": ["1_1", "1_2"], "nugget": ["n1", "n2"], "importance": [1, 0],
+    })
+    run = pd.DataFrame({"qid": ["1"], "query": ["Q1"], "qanswer": ["A1"]})
+    with nug.trace() as tracer:
+        nug.assign_to_run(run, qrels)
+    names = [span.name for span in tracer.spans]
+    assert names[-1] == "nuggetizer.run"
+    generate = [span for span in tracer.spans if span.name == "nuggetizer.generate"]
+    assert len(generate) == 1
+    assert generate[0].attributes["nuggetizer.stage"] == "assigner"
+    assert generate[0].attributes["nuggetizer.window"] == 0
+    assert generate[0].attributes["nuggetizer.parse"] == "ok"
+
+
+def test_tracer_marks_errors():
+    tracer = Tracer()
+    try:
+        with tracer.span("outer"):
+            with tracer.span("inner", key="value"):
+                raise ValueError("bad")
+    except ValueError:
+        pass
+    inner, outer = tracer.spans
+    assert inner.parent_id == outer.span_id and inner.trace_id == outer.trace_id
+    assert inner.to_otlp()["status"]["code"] == "STATUS_CODE_ERROR"
+    assert inner.attributes == {"key": "value"}